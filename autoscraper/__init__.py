@@ -1 +1,6 @@
 from autoscraper.auto_scraper import AutoScraper
+from autoscraper.aio import AsyncFetcher
+from autoscraper.stats import ScrapeStats
+from autoscraper.group import ScraperGroup
+from autoscraper.cache import PageCache
+from autoscraper.result_cache import ResultCache
@@ -0,0 +1,68 @@
+"""
+Command line scraping of archives with a saved model:
+
+    python -m autoscraper model.json crawl.warc.gz results.jsonl --workers 8 \
+        --checkpoint results.ckpt --resume
+"""
+import argparse
+import json
+
+from autoscraper.archive import ARCHIVE_FORMATS, OUTPUT_FORMATS, report_progress
+from autoscraper.auto_scraper import AutoScraper
+from autoscraper.backends import BACKENDS
+from autoscraper.batch import BATCH_METHODS
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(
+        prog='autoscraper',
+        description='Scrapes the HTML records of a WARC or JSONL archive with a saved model.')
+    parser.add_argument('model', help='path of a model saved with AutoScraper.save')
+    parser.add_argument('archive', help='WARC or JSONL archive, optionally gzipped')
+    parser.add_argument('output', help='JSONL or CSV file of the results')
+    parser.add_argument('--name', help='name of the model in a file holding several models')
+    parser.add_argument('--backend', default='bs4', choices=sorted(BACKENDS))
+    parser.add_argument('--workers', type=int, help='number of worker processes')
+    parser.add_argument('--method', default='similar', choices=sorted(BATCH_METHODS))
+    parser.add_argument('--group-by-alias', action='store_true')
+    parser.add_argument('--grouped', action='store_true')
+    parser.add_argument('--unique', action='store_true', default=None)
+    parser.add_argument('--attr-fuzz-ratio', type=float, default=1.0)
+    parser.add_argument('--archive-format', choices=ARCHIVE_FORMATS)
+    parser.add_argument('--output-format', choices=OUTPUT_FORMATS)
+    parser.add_argument('--url-key', default='url', help='url key of the JSONL records')
+    parser.add_argument('--html-key', default='html', help='HTML key of the JSONL records')
+    parser.add_argument('--checkpoint', help='file saving the offset to resume from')
+    parser.add_argument('--checkpoint-every', type=int, default=1000,
+                        help='number of records between two checkpoints')
+    parser.add_argument('--resume', action='store_true',
+                        help='resume from the checkpoint, appending to the output')
+    parser.add_argument('--max-pending', type=int,
+                        help='maximum number of records in flight')
+    parser.add_argument('--progress-every', type=float, default=10.0,
+                        help='seconds between two progress reports')
+    parser.add_argument('--quiet', action='store_true', help="don't report the progress")
+    return parser
+
+
+def main(argv=None):
+    args = get_parser().parse_args(argv)
+
+    scraper = AutoScraper(backend=args.backend)
+    scraper.load(args.model, name=args.name)
+
+    kwargs = dict(grouped=args.grouped, group_by_alias=args.group_by_alias, unique=args.unique,
+                  attr_fuzz_ratio=args.attr_fuzz_ratio)
+    stats = scraper.scrape_archive(
+        args.archive, args.output, workers=args.workers, method=args.method,
+        checkpoint_path=args.checkpoint, resume=args.resume,
+        checkpoint_every=args.checkpoint_every, max_pending=args.max_pending,
+        archive_format=args.archive_format, output_format=args.output_format,
+        url_key=args.url_key, html_key=args.html_key,
+        progress=None if args.quiet else report_progress,
+        progress_every=args.progress_every, **kwargs)
+    print(json.dumps(stats))
+
+
+if __name__ == '__main__':
+    main()
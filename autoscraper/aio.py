@@ -0,0 +1,76 @@
+import asyncio
+import os
+import weakref
+
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class AsyncFetcher(object):
+    """
+    Pooled HTTP client used by the async AutoScraper methods.
+    Connections are kept alive and reused by a shared requests Session. Blocking requests
+    and HTML parsing run in a thread pool so the event loop is never blocked.
+
+    Parameters
+    ----------
+    max_connections: int, optional, defaults to 10
+        Maximum number of requests in flight at once.
+    max_connections_per_host: int, optional, defaults to 4
+        Maximum number of requests in flight to the same host.
+    executor: concurrent.futures.Executor, optional
+        Executor used for the requests and the parsing.
+            Defaults to a thread pool with a thread per connection and per CPU.
+    """
+
+    def __init__(self, max_connections=10, max_connections_per_host=4, executor=None):
+        self.max_connections = max_connections
+        self.max_connections_per_host = max_connections_per_host
+        self.executor = executor or ThreadPoolExecutor(max_connections + (os.cpu_count() or 1))
+        self._own_executor = executor is None
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_connections,
+                              pool_maxsize=max_connections_per_host)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        # asyncio primitives are bound to a loop, so they are kept per running loop
+        self._limits = weakref.WeakKeyDictionary()
+
+    def _get_limits(self, host):
+        loop = asyncio.get_running_loop()
+        if loop not in self._limits:
+            self._limits[loop] = (asyncio.Semaphore(self.max_connections), {})
+
+        total, per_host = self._limits[loop]
+        if host not in per_host:
+            per_host[host] = asyncio.Semaphore(self.max_connections_per_host)
+        return total, per_host[host]
+
+    async def run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+
+    def _get(self, url, request_args):
+        return self.session.get(url, **request_args).text
+
+    async def fetch(self, url, request_args):
+        total, host = self._get_limits(urlparse(url).netloc)
+        async with host:
+            async with total:
+                return await self.run(self._get, url, request_args)
+
+    def close(self):
+        self.session.close()
+        if self._own_executor:
+            self.executor.shutdown(wait=False)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
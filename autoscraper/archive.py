@@ -0,0 +1,387 @@
+"""
+Scraping of the HTML records of crawl archives: WARC files and JSONL files with one page per
+line, both optionally gzipped. Records are read one at a time and scraped by the workers of
+a batch, see autoscraper.batch, so only the pages being scraped are held in memory.
+
+Offsets of the records are positions in the uncompressed archive. The offset of the record
+following the last written result is saved to a checkpoint file, from which an interrupted
+run is resumed.
+"""
+import csv
+import gzip
+import json
+import os
+import sys
+import time
+import zlib
+
+from autoscraper.batch import iter_batch
+
+ARCHIVE_FORMATS = ('warc', 'jsonl')
+OUTPUT_FORMATS = ('jsonl', 'csv')
+
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml')
+
+
+class ArchiveRecord(object):
+    """
+    An HTML page of an archive.
+
+    Attributes
+    ----------
+    offset: int
+        Position of the record in the uncompressed archive.
+    next_offset: int
+        Position following the record, where reading resumes after it.
+    url: str
+        URL of the page, or None.
+    html: str or bytes
+        Content of the page. Bytes are decoded as in AutoScraper._parse_html.
+    """
+
+    __slots__ = ('offset', 'next_offset', 'url', 'html')
+
+    def __init__(self, offset, next_offset, url, html):
+        self.offset = offset
+        self.next_offset = next_offset
+        self.url = url
+        self.html = html
+
+    def __repr__(self):
+        return 'ArchiveRecord(offset=%r, url=%r)' % (self.offset, self.url)
+
+
+def get_archive_format(path):
+    name = os.fspath(path).lower()
+    if name.endswith('.gz'):
+        name = name[:-3]
+    if name.endswith(('.warc', '.arc')):
+        return 'warc'
+    if name.endswith(('.jsonl', '.json', '.ndjson')):
+        return 'jsonl'
+    raise ValueError('Unknown archive format of %s, it must be one of %s'
+                     % (path, ', '.join(ARCHIVE_FORMATS)))
+
+
+def get_output_format(path):
+    name = os.fspath(path).lower()
+    if name.endswith('.csv'):
+        return 'csv'
+    return 'jsonl'
+
+
+def _open_archive(path):
+    # gzip files may hold a member per record, they are read as a single stream
+    if os.fspath(path).lower().endswith('.gz'):
+        return gzip.open(path, 'rb')
+    return open(path, 'rb')
+
+
+def _read_headers(f):
+    headers = {}
+    while True:
+        line = f.readline()
+        if not line or not line.strip():
+            return headers
+        name, _, value = line.decode('utf-8', 'replace').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+
+def _parse_content_type(value):
+    mime_type, _, params = (value or '').partition(';')
+    charset = None
+    for param in params.split(';'):
+        key, _, param_value = param.partition('=')
+        if key.strip().lower() == 'charset':
+            charset = param_value.strip().strip('"\'') or None
+    return mime_type.strip().lower(), charset
+
+
+def _dechunk(body):
+    chunks = []
+    position = 0
+    while True:
+        end = body.find(b'\r\n', position)
+        if end < 0:
+            break
+        try:
+            size = int(body[position:end].split(b';')[0], 16)
+        except ValueError:
+            break
+        if not size:
+            break
+        chunks.append(body[end + 2:end + 2 + size])
+        position = end + 4 + size
+    return b''.join(chunks)
+
+
+def _decode_body(body, http_headers):
+    if 'chunked' in http_headers.get('transfer-encoding', '').lower():
+        body = _dechunk(body)
+
+    encoding = http_headers.get('content-encoding', '').lower()
+    if encoding in ('gzip', 'x-gzip', 'deflate'):
+        try:
+            # deflate bodies may lack the zlib header
+            wbits = 16 + zlib.MAX_WBITS if 'gzip' in encoding else -zlib.MAX_WBITS
+            if encoding == 'deflate' and body[:1] == b'\x78':
+                wbits = zlib.MAX_WBITS
+            body = zlib.decompress(body, wbits)
+        except zlib.error:
+            return None
+    elif encoding not in ('', 'identity'):
+        return None
+    return body
+
+
+def _get_warc_html(headers, block):
+    warc_type = headers.get('warc-type')
+    content_type, charset = _parse_content_type(headers.get('content-type'))
+
+    if warc_type == 'resource':
+        if content_type not in HTML_CONTENT_TYPES:
+            return None
+        body = block
+    elif warc_type == 'response' and content_type.startswith('application/http'):
+        separator = block.find(b'\r\n\r\n')
+        size = 4
+        if separator < 0:
+            separator, size = block.find(b'\n\n'), 2
+        if separator < 0:
+            return None
+
+        lines = block[:separator].decode('iso-8859-1').splitlines()[1:]
+        http_headers = {}
+        for line in lines:
+            name, _, value = line.partition(':')
+            http_headers[name.strip().lower()] = value.strip()
+
+        content_type, charset = _parse_content_type(http_headers.get('content-type'))
+        if content_type and content_type not in HTML_CONTENT_TYPES:
+            return None
+        body = _decode_body(block[separator + size:], http_headers)
+        if body is None:
+            return None
+    else:
+        return None
+
+    if charset:
+        try:
+            return body.decode(charset, 'replace')
+        except LookupError:
+            pass
+    return body
+
+
+def _iter_warc(f):
+    while True:
+        offset = f.tell()
+        line = f.readline()
+        if not line:
+            return
+        # records are separated by blank lines
+        if not line.strip():
+            continue
+        if not line.startswith((b'WARC/', b'warc/')):
+            raise ValueError('Invalid WARC record at offset %d' % offset)
+
+        headers = _read_headers(f)
+        block = f.read(int(headers.get('content-length', 0)))
+        html = _get_warc_html(headers, block)
+        if html:
+            yield ArchiveRecord(offset, f.tell(), headers.get('warc-target-uri'), html)
+
+
+def _iter_jsonl(f, url_key, html_key):
+    while True:
+        offset = f.tell()
+        line = f.readline()
+        if not line:
+            return
+        if not line.strip():
+            continue
+
+        data = json.loads(line)
+        html = data.get(html_key)
+        if html:
+            yield ArchiveRecord(offset, f.tell(), data.get(url_key), html)
+
+
+def iter_archive(path, format=None, offset=0, url_key='url', html_key='html'):
+    """
+    Yields the HTML records of an archive.
+
+    Parameters:
+    ----------
+    path: str
+        Path of a WARC or JSONL archive, which may be gzipped.
+
+    format: str, optional
+        'warc' or 'jsonl'. Detected from the file name by default.
+
+    offset: int, optional, defaults to 0
+        Position in the uncompressed archive to start reading from, e.g. the next_offset
+            of the last record read.
+
+    url_key: str, optional, defaults to 'url'
+        Key of the url in the lines of a JSONL archive.
+
+    html_key: str, optional, defaults to 'html'
+        Key of the HTML in the lines of a JSONL archive. Lines without it are skipped.
+
+    Returns:
+    --------
+    Generator of ArchiveRecord objects. Records other than HTML pages are skipped.
+    """
+
+    format = format or get_archive_format(path)
+    if format not in ARCHIVE_FORMATS:
+        raise ValueError('format must be one of %s' % ', '.join(ARCHIVE_FORMATS))
+
+    with _open_archive(path) as f:
+        if offset:
+            f.seek(offset)
+        if format == 'warc':
+            yield from _iter_warc(f)
+        else:
+            yield from _iter_jsonl(f, url_key, html_key)
+
+
+def _iter_rows(result, key=''):
+    # (key, value) rows of a result, keys being aliases or stack_ids of grouped results
+    if isinstance(result, tuple):
+        for kind, part in zip(('similar', 'exact'), result):
+            yield from _iter_rows(part, '%s:%s' % (kind, key) if key else kind)
+    elif isinstance(result, dict):
+        for name, values in result.items():
+            yield from _iter_rows(values, '%s:%s' % (key, name) if key else name)
+    elif isinstance(result, list):
+        for value in result:
+            yield key, value
+    else:
+        yield key, result
+
+
+class _JsonlWriter(object):
+    def __init__(self, f):
+        self.f = f
+
+    def write(self, record, result, error):
+        data = dict(offset=record.offset, url=record.url)
+        if error is None:
+            data['result'] = result
+        else:
+            data['error'] = error
+        self.f.write(json.dumps(data, ensure_ascii=False) + '\n')
+
+
+class _CsvWriter(object):
+    fields = ('offset', 'url', 'key', 'value', 'error')
+
+    def __init__(self, f):
+        self.f = f
+        self.writer = csv.writer(f)
+        if not f.tell():
+            self.writer.writerow(self.fields)
+
+    def write(self, record, result, error):
+        if error is not None:
+            self.writer.writerow((record.offset, record.url, '', '', error))
+            return
+        for key, value in _iter_rows(result):
+            self.writer.writerow((record.offset, record.url, key, value, ''))
+
+
+def _read_checkpoint(checkpoint_path):
+    try:
+        with open(checkpoint_path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_checkpoint(checkpoint_path, checkpoint):
+    with open(checkpoint_path + '.tmp', 'w') as f:
+        json.dump(checkpoint, f)
+    os.replace(checkpoint_path + '.tmp', checkpoint_path)
+
+
+def report_progress(stats):
+    """Prints the progress of scrape_archive to stderr."""
+
+    print('%(records)d pages, %(errors)d errors, %(pages_per_second).1f pages/s, '
+          'offset %(offset)d' % stats, file=sys.stderr)
+
+
+def scrape_archive(scraper, archive_path, output_path, archive_format=None, output_format=None,
+                   workers=None, method='similar', checkpoint_path=None, resume=False,
+                   checkpoint_every=1000, max_pending=None, url_key='url', html_key='html',
+                   progress=None, progress_every=10.0, kwargs=None):
+    format = output_format or get_output_format(output_path)
+    if format not in OUTPUT_FORMATS:
+        raise ValueError('output_format must be one of %s' % ', '.join(OUTPUT_FORMATS))
+
+    checkpoint = None
+    if resume and checkpoint_path:
+        checkpoint = _read_checkpoint(checkpoint_path)
+    if checkpoint is None:
+        checkpoint = dict(offset=0, records=0, errors=0, output_size=0)
+
+    # results written after the last checkpoint are written again
+    mode = 'r+' if checkpoint['output_size'] and os.path.exists(output_path) else 'w'
+    f = open(output_path, mode, encoding='utf-8', newline='')
+    try:
+        f.seek(checkpoint['output_size'])
+        f.truncate()
+        writer = _JsonlWriter(f) if format == 'jsonl' else _CsvWriter(f)
+
+        records = {}
+
+        def iter_pages():
+            for index, record in enumerate(iter_archive(
+                    archive_path, archive_format, checkpoint['offset'], url_key, html_key)):
+                records[index] = record
+                yield record.url, record.html
+
+        stats = dict(records=checkpoint['records'], errors=checkpoint['errors'],
+                     offset=checkpoint['offset'], seconds=0.0, pages_per_second=0.0)
+        start = last_progress = time.perf_counter()
+        done = 0
+
+        def update_stats():
+            stats['seconds'] = time.perf_counter() - start
+            stats['pages_per_second'] = done / stats['seconds'] if stats['seconds'] else 0.0
+
+        def save_checkpoint():
+            f.flush()
+            checkpoint.update(offset=stats['offset'], records=stats['records'],
+                              errors=stats['errors'], output_size=f.tell())
+            _write_checkpoint(checkpoint_path, checkpoint)
+
+        # results come in the order of the records, so that the checkpoint offset follows
+        # every result written. pages are never fetched from their url
+        for result in iter_batch(scraper, iter_pages(), workers, method, True, max_pending,
+                                 kwargs or {}, fetch=False):
+            record = records.pop(result.index)
+            writer.write(record, result.result, result.error)
+            done += 1
+            stats['records'] += 1
+            stats['errors'] += result.error is not None
+            stats['offset'] = record.next_offset
+
+            if checkpoint_path and done % checkpoint_every == 0:
+                save_checkpoint()
+            if progress is not None and time.perf_counter() - last_progress >= progress_every:
+                update_stats()
+                progress(dict(stats))
+                last_progress = time.perf_counter()
+
+        update_stats()
+        if checkpoint_path:
+            save_checkpoint()
+    finally:
+        f.close()
+
+    if progress is not None:
+        progress(dict(stats))
+    return stats
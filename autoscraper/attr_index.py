@@ -0,0 +1,101 @@
+import weakref
+
+from autoscraper.backends import _matches
+from autoscraper.rule_trie import _freeze
+
+# attributes the rules are learned with, see AutoScraper._get_valid_attrs
+INDEXED_ATTRS = ('class', 'style')
+
+# attribute indexes of the documents alive, by document id
+_attr_indexes = {}
+
+
+class AttrIndex(object):
+    """
+    Children of the elements of a document grouped by tag, with the values of their class
+    and style attributes, for the fuzzy matching of the rules.
+
+    The children of an element are indexed the first time a rule step looks them up.
+    Whether a fuzzy step matches is decided once per distinct pair of attribute values
+    in the document, rather than for every element and every rule having the step.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        # parent id: (parent, {tag: (children, keys of their values)}). parents are kept
+        # alive while their ids are used
+        self._children = {}
+        # values of the attributes by key
+        self._values = {}
+        # step id: (step attrs, {key of values: matched})
+        self._matches = {}
+
+    def _index(self, parent):
+        backend = self.backend
+        by_tag = {}
+        for child in backend.get_children(parent):
+            attrs = backend.get_attrs(child)
+            values = tuple(attrs.get(x) for x in INDEXED_ATTRS)
+            key = _freeze(values)
+            if key not in self._values:
+                self._values[key] = values
+
+            children, keys = by_tag.setdefault(backend.get_name(child), ([], []))
+            children.append(child)
+            keys.append(key)
+
+        self._children[id(parent)] = (parent, by_tag)
+        return by_tag
+
+    def find_all(self, parent, tag, attrs):
+        """
+        Returns the children of parent with the tag whose class and style attributes match
+            attrs, as backend.find_all does. attrs must only have these keys.
+        """
+
+        item = self._children.get(id(parent))
+        by_tag = item[1] if item is not None else self._index(parent)
+        entry = by_tag.get(tag)
+        if entry is None:
+            return []
+
+        matches = self._matches.get(id(attrs))
+        if matches is None:
+            matches = self._matches[id(attrs)] = (attrs, {})
+        matches = matches[1]
+
+        found = []
+        for child, key in zip(*entry):
+            matched = matches.get(key)
+            if matched is None:
+                values = self._values[key]
+                matched = matches[key] = all(
+                    _matches(value, attrs[name]) for name, value in zip(INDEXED_ATTRS, values))
+            if matched:
+                found.append(child)
+        return found
+
+
+def get_attr_index(backend, document):
+    """
+    Returns the attribute index of the document, which is freed with the document.
+
+    Parameters:
+    ----------
+    backend: SoupBackend or LxmlBackend
+        Backend of the document.
+
+    document: BeautifulSoup or LxmlDocument
+        A document parsed by the backend.
+
+    Returns:
+    --------
+    AttrIndex of the document
+    """
+
+    key = id(document)
+    attr_index = _attr_indexes.get(key)
+    if attr_index is None or attr_index.backend is not backend:
+        attr_index = _attr_indexes[key] = AttrIndex(backend)
+        weakref.finalize(document, _attr_indexes.pop, key, None)
+    return attr_index
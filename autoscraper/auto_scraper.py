@@ -1,15 +1,34 @@
+import asyncio
+import codecs
 import hashlib
+import heapq
 import json
+import time
 
 from collections import defaultdict
+from functools import partial
 from html import unescape
 from urllib.parse import urljoin, urlparse
 
 import requests
-from bs4 import BeautifulSoup
 
+from autoscraper.aio import AsyncFetcher
+from autoscraper.archive import scrape_archive
+from autoscraper.attr_index import INDEXED_ATTRS, get_attr_index
+from autoscraper.backends import get_backend
+from autoscraper.build_index import BuildIndex
+from autoscraper.batch import BatchResult, iter_batch, iter_build, scrape_page
+from autoscraper.model_file import ModelFile, is_model_file, save_models
+from autoscraper.optimizer import optimize_rules
+from autoscraper.partial import PathFilter
+from autoscraper.rule import to_rules
+from autoscraper.rule_trie import RuleTrie, _freeze
+from autoscraper.streaming import StreamMatcher, get_stream_value, iter_normalized_chunks, \
+    iter_text_chunks
+from autoscraper.text_cache import get_text_cache
+from autoscraper.xpath import RuleXPaths
 from autoscraper.utils import get_random_str, unique_hashable, unique_stack_list, \
-    ResultItem, FuzzyText, get_non_rec_text, text_match, normalize
+    ResultItem, FuzzyText, SeenSet, text_match, normalize
 
 
 class AutoScraper(object):
@@ -21,17 +40,54 @@ class AutoScraper(object):
     Attributes
     ----------
     stack_list: list
-        List of rules learned by AutoScraper
+        List of rules learned by AutoScraper. Each rule is a Rule object, a dict whose steps
+            share their attributes with the equal steps of other rules.
+
+    backend: str or backend object, defaults to 'bs4'
+        Parser backend used to build and evaluate the rules. 'bs4' uses BeautifulSoup trees,
+            'lxml' works directly on lxml elements and is faster. Both give the same results.
+
+    cache: PageCache, optional
+        Cache of the pages fetched from a url, so that successive calls on the same url
+            don't download and parse the page again. Pages passed as html are not cached.
+
+    partial_parse: bool, defaults to False
+        If True, pages scraped with the get_result* methods are parsed partially: only the
+            elements the rules can reach, and the subtrees of the elements they select, are
+            built. Results are the same, the texts of other elements are not available.
+            build() and repair_rules() always parse whole pages. Only the bs4 backend parses
+            partially, lxml builds whole trees faster.
+
+    result_cache: ResultCache, optional
+        Cache of the results of the get_result* methods, so that pages scraped again while
+            they and the rules are unchanged are not scraped twice. Results of pages passed
+            as soup are not cached.
 
     Methods
     -------
     build() - Learns a set of rules represented as stack_list based on the wanted_list,
         which can be reused for scraping similar elements from other web pages in the future.
+    build_many() - Learns the rules of several sample pages in parallel worker processes.
     get_result_similar() - Gets similar results based on the previously learned rules.
     get_result_exact() - Gets exact results based on the previously learned rules.
     get_results() - Gets exact and similar results based on the previously learned rules.
-    save() - Serializes the stack_list as JSON and saves it to disk.
-    load() - De-serializes the JSON representation of the stack_list and loads it back.
+    iter_result_similar(), iter_result_exact() - Yield the results one by one in the order
+        of the page, without building the lists of results.
+    stream_result_similar() - Gets similar results while a large page is being parsed.
+    add_hook() - Adds a function receiving the timings and counters of each scraping step.
+    get_results_batch() - Scrapes many pages in parallel worker processes.
+    scrape_archive() - Scrapes the pages of a WARC or JSONL archive to a JSONL or CSV file.
+    aget_result_similar(), aget_result_exact(), aget_result() - Async versions of the
+        get_result* methods.
+    aget_results_batch() - Scrapes many urls concurrently with pooled connections.
+    aclose(), close() - Release the connections and threads of the async methods.
+    save() - Serializes the stack_list as JSON or in the binary format and saves it to disk.
+    load() - De-serializes the saved stack_list and loads it back.
+    save_models() - Saves several models to a single file in the binary format.
+    load_models() - Loads the models of a file in the binary format.
+    compile() - Exports the learned rules as XPath expressions.
+    repair_rules() - Re-learns the rules which broke on a new version of a page.
+    optimize() - Removes the rules which are unmatched or redundant on sample pages.
     remove_rules() - Removes one or more learned rule[s] from the stack_list.
     keep_rules() - Keeps only the specified learned rules in the stack_list and removes the others.
     """
@@ -41,58 +97,148 @@ class AutoScraper(object):
             (KHTML, like Gecko) Chrome/84.0.4147.135 Safari/537.36'
     }
 
-    def __init__(self, stack_list=None):
-        self.stack_list = stack_list or []
-
-    def save(self, file_path):
+    def __init__(self, stack_list=None, backend='bs4', cache=None, partial_parse=False,
+                 result_cache=None):
+        self._stack_list_loader = None
+        self.stack_list = to_rules(stack_list or [])
+        self.backend = get_backend(backend)
+        self.cache = cache
+        self.partial_parse = partial_parse
+        self.result_cache = result_cache
+        self._path_filter = None
+        self._rule_trie = None
+        self._rule_xpaths = None
+        self._single_rules = {}
+        self._fuzzy_steps = {}
+        self._async_fetcher = None
+        self._hooks = ()
+
+    @property
+    def stack_list(self):
+        # rules loaded from a binary file are decoded on first use
+        if self._stack_list_loader is not None:
+            self._stack_list = self._stack_list_loader()
+            self._stack_list_loader = None
+        return self._stack_list
+
+    @stack_list.setter
+    def stack_list(self, stack_list):
+        self._stack_list = stack_list
+        self._stack_list_loader = None
+
+    def save(self, file_path, format='json'):
         """
-        Serializes the stack_list as JSON and saves it to the disk.
+        Serializes the stack_list and saves it to the disk.
 
         Parameters
         ----------
         file_path: str
-            Path of the JSON output
+            Path of the output
+
+        format: str, optional, defaults to 'json'
+            'json', or 'binary' for the binary format, which is faster to load.
 
         Returns
         -------
         None
         """
 
+        if format == 'binary':
+            save_models(file_path, {'': self})
+            return
+        if format != 'json':
+            raise ValueError("format must be 'json' or 'binary'")
+
         data = dict(stack_list=self.stack_list)
         with open(file_path, 'w') as f:
             json.dump(data, f)
 
-    def load(self, file_path):
+    def load(self, file_path, name=None):
         """
-        De-serializes the JSON representation of the stack_list and loads it back.
+        De-serializes the saved stack_list and loads it back. The format of the file, JSON or
+            binary, is detected. Rules of a binary file are decoded on their first use.
 
         Parameters
         ----------
         file_path: str
-            Path of the JSON file to load stack_list from.
+            Path of the file to load stack_list from.
+
+        name: str, optional
+            Name of the model to load from a binary file holding several models.
 
         Returns
         -------
         None
         """
 
+        if is_model_file(file_path):
+            model_file = ModelFile(file_path)
+            # unknown names raise here rather than on first use
+            name = model_file.get_name(name)
+            self._stack_list_loader = partial(model_file.get_stack_list, name)
+            return
+
         with open(file_path, 'r') as f:
             data = json.load(f)
 
         # for backward compatibility
         if isinstance(data, list):
-            self.stack_list = data
-            return
+            self.stack_list = to_rules(data)
+        else:
+            self.stack_list = to_rules(data['stack_list'])
+
+        self._compile_rules()
+
+    @staticmethod
+    def save_models(file_path, models):
+        """
+        Saves several models to a single file in the binary format. Strings and rule steps
+            shared by the models are stored once.
+
+        Parameters
+        ----------
+        file_path: str
+            Path of the output
+
+        models: dict
+            Dict of AutoScraper objects by model name
+
+        Returns
+        -------
+        None
+        """
 
-        self.stack_list = data['stack_list']
+        save_models(file_path, models)
 
     @classmethod
-    def _get_soup(cls, url=None, html=None, request_args=None):
-        request_args = request_args or {}
+    def load_models(cls, file_path, backend='bs4'):
+        """
+        Loads the models of a file in the binary format. Only the names of the models are
+            read, the rules of each model are decoded on its first use.
 
-        if html:
-            html = normalize(unescape(html))
-            return BeautifulSoup(html, 'lxml')
+        Parameters
+        ----------
+        file_path: str
+            Path of a file saved with save_models or save(format='binary')
+
+        backend: str or backend object, optional, defaults to 'bs4'
+            Parser backend of the models
+
+        Returns
+        -------
+        Dict of AutoScraper objects by model name
+        """
+
+        model_file = ModelFile(file_path)
+        models = {}
+        for name in model_file.names:
+            scraper = models[name] = cls(backend=backend)
+            scraper._stack_list_loader = partial(model_file.get_stack_list, name)
+        return models
+
+    @classmethod
+    def _get_request_args(cls, url, request_args=None):
+        request_args = dict(request_args or {})
 
         headers = dict(cls.request_headers)
         if url:
@@ -100,16 +246,70 @@ class AutoScraper(object):
 
         user_headers = request_args.pop('headers', {})
         headers.update(user_headers)
-        html = requests.get(url, headers=headers, **request_args).text
-        html = normalize(unescape(html))
+        request_args['headers'] = headers
+        return request_args
 
-        return BeautifulSoup(html, 'lxml')
+    @classmethod
+    def _fetch_response(cls, url, request_args=None):
+        request_args = cls._get_request_args(url, request_args)
+        return requests.get(url, **request_args)
 
-    @staticmethod
-    def _get_valid_attrs(item):
+    @classmethod
+    def _fetch_html(cls, url, request_args=None):
+        return cls._fetch_response(url, request_args).text
+
+    @classmethod
+    def _stream_html(cls, url, request_args=None, chunk_size=1 << 16):
+        request_args = cls._get_request_args(url, request_args)
+        with requests.get(url, stream=True, **request_args) as response:
+            # the encoding can't be guessed from the whole body as response.text does
+            decoder = codecs.getincrementaldecoder(response.encoding or 'utf-8')(errors='replace')
+            for chunk in response.iter_content(chunk_size):
+                yield decoder.decode(chunk)
+            yield decoder.decode(b'', final=True)
+
+    def _parse_html(self, html, path_filter=None):
+        # documents are only parsed partially if asked for, backends may not support it
+        args = () if path_filter is None else (path_filter,)
+        if not isinstance(html, str):
+            # bytes, files and buffers are decoded, unescaped and normalized by chunks while
+            # they are parsed, rather than copied whole at each step
+            chunks = iter_normalized_chunks(iter_text_chunks(html, 1 << 20))
+            return self._run_step('parse', self.backend.parse_chunks, chunks, *args)
+
+        html = self._run_step('normalize', lambda: normalize(unescape(html)))
+        return self._run_step('parse', self.backend.parse, html, *args)
+
+    def _get_soup(self, url=None, html=None, request_args=None, path_filter=None):
+        if not html and self.cache is not None:
+            return self.cache.get_document(self, url, request_args, path_filter)
+
+        if not html:
+            html = self._run_step('fetch', self._fetch_html, url, request_args)
+
+        return self._parse_html(html, path_filter)
+
+    def _get_path_filter(self, attr_fuzz_ratio):
+        # pages scraped with the rules are parsed partially if partial_parse is set
+        if not self.partial_parse:
+            return None
+        return self._build_path_filter(attr_fuzz_ratio)
+
+    def _build_path_filter(self, attr_fuzz_ratio):
+        trie = self._get_rule_trie()
+        key = (trie, attr_fuzz_ratio)
+        if self._path_filter is None or self._path_filter[0] != key:
+            get_attrs = None
+            if attr_fuzz_ratio < 1:
+                get_attrs = partial(self._get_fuzzy_attrs, attr_fuzz_ratio=attr_fuzz_ratio)
+            self._path_filter = (key, PathFilter(trie, get_attrs))
+        return self._path_filter[1]
+
+    def _get_valid_attrs(self, item):
         key_attrs = {'class', 'style'}
         attrs = {
-            k: v if v != [] else '' for k, v in item.attrs.items() if k in key_attrs
+            k: v if v != [] else ''
+            for k, v in self.backend.get_attrs(item).items() if k in key_attrs
         }
 
         for attr in key_attrs:
@@ -117,44 +317,53 @@ class AutoScraper(object):
                 attrs[attr] = ''
         return attrs
 
-    @staticmethod
-    def _child_has_text(child, text, url, text_fuzz_ratio):
-        child_text = child.getText().strip()
+    def _child_has_text(self, child, text, url, text_fuzz_ratio, texts):
+        """Returns the marks describing how the child contains the text, or None."""
 
-        if text_match(text, child_text, text_fuzz_ratio):
-            parent_text = child.parent.getText().strip()
+        backend = self.backend
+        matchers = texts.fuzzy_matchers
+        child_text = texts.get_text(child).strip()
+
+        if text_match(text, child_text, text_fuzz_ratio, matchers):
+            parent_text = texts.get_text(backend.get_parent(child)).strip()
             if child_text == parent_text:
-                return False
+                return None
 
-            child.wanted_attr = None
-            return True
+            return dict(wanted_attr=None)
 
-        if text_match(text, get_non_rec_text(child), text_fuzz_ratio):
-            child.is_non_rec_text = True
-            child.wanted_attr = None
-            return True
+        if text_match(text, texts.get_non_rec_text(child), text_fuzz_ratio, matchers):
+            return dict(is_non_rec_text=True, wanted_attr=None)
 
-        for key, value in child.attrs.items():
+        for key, value in backend.get_attrs(child).items():
             if not isinstance(value, str):
                 continue
 
             value = value.strip()
-            if text_match(text, value, text_fuzz_ratio):
-                child.wanted_attr = key
-                return True
+            if text_match(text, value, text_fuzz_ratio, matchers):
+                return dict(wanted_attr=key)
 
             if key in {'href', 'src'}:
                 full_url = urljoin(url, value)
                 if text == full_url:
-                    child.wanted_attr = key
-                    child.is_full_url = True
-                    return True
+                    return dict(wanted_attr=key, is_full_url=True)
+
+        return None
+
+    def _get_children(self, elements, text, url, text_fuzz_ratio, marks, texts, index=None):
+        if index is not None and index.is_indexable(text, text_fuzz_ratio):
+            candidates = [elements[i] for i in index.get_candidates(text)]
+        else:
+            candidates = reversed(elements)
 
-        return False
+        # marks of an element are kept across the wanted items of a build
+        children = []
+        for child in candidates:
+            child_marks = self._child_has_text(child, text, url, text_fuzz_ratio, texts)
+            if child_marks is None:
+                continue
 
-    def _get_children(self, soup, text, url, text_fuzz_ratio):
-        children = reversed(soup.findChildren())
-        children = [x for x in children if self._child_has_text(x, text, url, text_fuzz_ratio)]
+            marks.setdefault(id(child), {}).update(child_marks)
+            children.append(child)
         return children
 
     def build(self, url=None, wanted_list=None, wanted_dict=None, html=None, request_args=None,
@@ -178,8 +387,9 @@ class AutoScraper(object):
                 or compiled regular expressions.
                 AutoScraper learns a set of rules to scrape these targets and sets its aliases.
 
-        html: str, optional
-            An HTML string can also be passed instead of URL.
+        html: str, bytes, file object or PathLike, optional
+            An HTML string can also be passed instead of URL, or the page as bytes or a
+                buffer such as an mmap, a file object or the path of a file.
                 You should either pass url or html or both.
 
         request_args: dict, optional
@@ -199,6 +409,14 @@ class AutoScraper(object):
         """
 
         soup = self._get_soup(url=url, html=html, request_args=request_args)
+        elements = self.backend.iter_elements(soup)
+        # the texts of all elements are looked at to find the wanted items
+        texts = get_text_cache(self.backend, soup)
+        texts.compute_all()
+        marks = {}
+        sibling_indexes = {}
+        evaluated = set()
+        index = None
 
         result_list = []
 
@@ -215,46 +433,118 @@ class AutoScraper(object):
             wanted_list += wanted_items
 
             for wanted in wanted_items:
-                children = self._get_children(soup, wanted, url, text_fuzz_ratio)
+                # exact items are looked up in an index built once for the whole document,
+                # regular expressions and fuzzy items are searched in every element
+                if index is None and BuildIndex.is_indexable(wanted, text_fuzz_ratio):
+                    index = BuildIndex(self.backend, texts, elements, url)
+
+                children = self._get_children(elements, wanted, url, text_fuzz_ratio, marks,
+                                              texts, index)
 
                 for child in children:
-                    result, stack = self._get_result_for_child(child, soup, url)
+                    result, stack = self._get_result_for_child(child, soup, url,
+                                                               marks[id(child)],
+                                                               sibling_indexes, evaluated)
                     stack['alias'] = alias
+                    # kept to re-learn the rule if it breaks, see repair_rules
+                    if isinstance(wanted, str):
+                        stack['sample'] = wanted
                     result_list += result
                     self.stack_list.append(stack)
 
         result_list = [item.text for item in result_list]
         result_list = unique_hashable(result_list)
 
-        self.stack_list = unique_stack_list(self.stack_list)
+        self.stack_list = to_rules(unique_stack_list(self.stack_list))
+        self._compile_rules()
         return result_list
 
-    @classmethod
-    def _build_stack(cls, child, url):
-        content = [(child.name, cls._get_valid_attrs(child))]
+    def build_many(self, samples, workers=None, update=False, request_args=None,
+                   text_fuzz_ratio=1.0):
+        """
+        Learns the rules of several sample pages in parallel worker processes. The stack_list
+            is the same as calling build on each sample in order with update=True, the rules
+            of the samples being merged and deduplicated by their hash.
+
+        Parameters:
+        ----------
+        samples: iterable
+            Iterable of (page, wanted) pairs. page is a (url, html) pair, html may be None to
+                fetch the page from url, or the path of an HTML file. wanted is a wanted_list,
+                or a wanted_dict if it is a dict, see build.
+
+        workers: int, optional, defaults to the number of CPUs
+            Number of worker processes. If set to 1, samples are built in the current process.
+
+        update: bool, optional, defaults to False
+            If True, the learned rules will be added to the previous ones.
+            If False, all previously learned rules will be removed.
+
+        request_args: dict, optional
+            A dictionary used to specify a set of additional request parameters used by requests
+                module. You can specify proxy URLs, custom headers etc.
+
+        text_fuzz_ratio: float in range [0, 1], optional, defaults to 1.0
+            The fuzziness ratio threshold for matching the wanted contents.
+
+        Returns:
+        --------
+        List of the similar results of each sample
+        """
+
+        kwargs = dict(request_args=request_args, text_fuzz_ratio=text_fuzz_ratio)
+        stack_list = list(self.stack_list) if update else []
+        result_lists = []
+        for result_list, sample_stack_list in iter_build(self, samples, workers, kwargs):
+            for stack in sample_stack_list:
+                # forked workers share the state of the random generator
+                stack['stack_id'] = 'rule_' + get_random_str(4)
+            stack_list += sample_stack_list
+            result_lists.append(result_list)
+
+        self.stack_list = to_rules(unique_stack_list(stack_list))
+        self._compile_rules()
+        return result_lists
+
+    def _get_sibling_index(self, grand_parent, parent, sibling_indexes):
+        backend = self.backend
+        name, attrs = backend.get_name(parent), self._get_valid_attrs(parent)
+        key = (id(grand_parent), name, _freeze(attrs))
+        entry = sibling_indexes.get(key)
+        if entry is None:
+            children = backend.find_all(grand_parent, name, attrs)
+            # the parent and the children are kept alive, so that their ids are not reused
+            positions = {id(c): i for i, c in enumerate(children)}
+            entry = sibling_indexes[key] = (grand_parent, children, positions)
+        return entry[2].get(id(parent))
+
+    def _build_stack(self, child, url, marks, sibling_indexes=None):
+        backend = self.backend
+        content = [(backend.get_name(child), self._get_valid_attrs(child))]
+        # indexes of the matching siblings by parent, shared by the stacks of a build
+        if sibling_indexes is None:
+            sibling_indexes = {}
 
         parent = child
         while True:
-            grand_parent = parent.findParent()
-            if not grand_parent:
+            grand_parent = backend.get_parent(parent)
+            if grand_parent is None:
                 break
 
-            children = grand_parent.findAll(parent.name, cls._get_valid_attrs(parent),
-                                                         recursive=False)
-            for i, c in enumerate(children):
-                if c == parent:
-                    content.insert(
-                        0, (grand_parent.name, cls._get_valid_attrs(grand_parent), i))
-                    break
+            i = self._get_sibling_index(grand_parent, parent, sibling_indexes)
+            if i is not None:
+                content.insert(
+                    0, (backend.get_name(grand_parent), self._get_valid_attrs(grand_parent), i))
 
-            if grand_parent.name == 'html':
+            if backend.get_name(grand_parent) == 'html':
                 break
 
             parent = grand_parent
 
-        wanted_attr = getattr(child, 'wanted_attr', None)
-        is_full_url = getattr(child, 'is_full_url', False)
-        is_non_rec_text = getattr(child, 'is_non_rec_text', False)
+        # unset marks are None rather than False, as in the rules learned so far
+        wanted_attr = marks.get('wanted_attr')
+        is_full_url = marks.get('is_full_url')
+        is_non_rec_text = marks.get('is_non_rec_text')
         stack = dict(content=content, wanted_attr=wanted_attr, is_full_url=is_full_url,
                      is_non_rec_text=is_non_rec_text)
         stack['url'] = url if is_full_url else ''
@@ -262,25 +552,43 @@ class AutoScraper(object):
         stack['stack_id'] = 'rule_' + get_random_str(4)
         return stack
 
-    def _get_result_for_child(self, child, soup, url):
-        stack = self._build_stack(child, url)
-        result = self._get_result_with_stack(stack, soup, url, 1.0)
-        return result, stack
-
     @staticmethod
-    def _fetch_result_from_child(child, wanted_attr, is_full_url, url, is_non_rec_text):
+    def _get_similar_key(stack):
+        # stacks with the same key have the same similar results, e.g. the stacks of the rows
+        # of a list, which only differ by the sibling indexes of their ancestors
+        content = stack['content']
+        return (tuple((item[0], _freeze(item[1])) for item in content),
+                content[-2][2] if len(content) > 1 else None,
+                stack['wanted_attr'], stack['is_full_url'], stack.get('is_non_rec_text'))
+
+    def _get_result_for_child(self, child, soup, url, marks, sibling_indexes=None,
+                              evaluated=None):
+        stack = self._build_stack(child, url, marks, sibling_indexes)
+        if evaluated is None:
+            return self._get_result_with_stack(stack, soup, url, 1.0), stack
+
+        # build keeps unique results, those of an evaluated key are already among them
+        key = self._get_similar_key(stack)
+        if key in evaluated:
+            return [], stack
+        evaluated.add(key)
+        return self._get_result_with_stack(stack, soup, url, 1.0), stack
+
+    def _fetch_result_from_child(self, child, wanted_attr, is_full_url, url, is_non_rec_text,
+                                 texts):
         if wanted_attr is None:
             if is_non_rec_text:
-                return get_non_rec_text(child)
-            return child.getText().strip()
+                return texts.get_non_rec_text(child)
+            return texts.get_text(child).strip()
 
-        if wanted_attr not in child.attrs:
+        attrs = self.backend.get_attrs(child)
+        if wanted_attr not in attrs:
             return None
 
         if is_full_url:
-            return urljoin(url, child.attrs[wanted_attr])
+            return urljoin(url, attrs[wanted_attr])
 
-        return child.attrs[wanted_attr]
+        return attrs[wanted_attr]
 
     @staticmethod
     def _get_fuzzy_attrs(attrs, attr_fuzz_ratio):
@@ -305,7 +613,7 @@ class AutoScraper(object):
                 if attr_fuzz_ratio < 1.0:
                     attrs = self._get_fuzzy_attrs(attrs, attr_fuzz_ratio)
 
-                found = parent.findAll(item[0], attrs, recursive=False)
+                found = self.backend.find_all(parent, item[0], attrs)
                 if not found:
                     continue
 
@@ -317,53 +625,145 @@ class AutoScraper(object):
 
             parents = children
 
+        return self._get_result_items(stack, parents, url, get_text_cache(self.backend, soup))
+
+    def _compile_rules(self):
+        self._rule_trie = RuleTrie(self.stack_list)
+        self._single_rules = {}
+        self._fuzzy_steps = {}
+        return self._rule_trie
+
+    def _get_single_rule(self, compiler, stack):
+        # rules compiled on their own are evaluated one by one while instrumented
+        key = (compiler, RuleTrie.get_signature([stack]))
+        compiled = self._single_rules.get(key)
+        if compiled is None:
+            compiled = self._single_rules[key] = compiler([stack])
+        return compiled
+
+    def _get_rule_trie(self, stack=None):
+        if stack is not None:
+            return self._get_single_rule(RuleTrie, stack)
+
+        trie = self._rule_trie
+        if trie is None or trie.signature != RuleTrie.get_signature(self.stack_list):
+            trie = self._compile_rules()
+        return trie
+
+    def _get_rule_xpaths(self, stack=None):
+        if stack is not None:
+            return self._get_single_rule(RuleXPaths, stack)
+
+        xpaths = self._rule_xpaths
+        if xpaths is None or xpaths.signature != RuleTrie.get_signature(self.stack_list):
+            xpaths = self._rule_xpaths = RuleXPaths(self.stack_list)
+        return xpaths
+
+    def _get_fuzzy_step(self, attrs, attr_fuzz_ratio):
+        # fuzzy attributes of the compiled rules are built once, the entries keep the
+        # attributes alive so that their ids are not reused
+        key = (id(attrs), attr_fuzz_ratio)
+        entry = self._fuzzy_steps.get(key)
+        if entry is None:
+            entry = self._fuzzy_steps[key] = (
+                attrs, self._get_fuzzy_attrs(attrs, attr_fuzz_ratio))
+        return entry[1]
+
+    def _get_find_all(self, attr_fuzz_ratio, counters=None, soup=None):
+        backend_find_all = self.backend.find_all
+
+        if attr_fuzz_ratio >= 1.0:
+            find_all = backend_find_all
+        else:
+            # fuzzy steps on class and style only are matched once per distinct value
+            attr_index = get_attr_index(self.backend, soup) if soup is not None else None
+            indexed_attrs = set(INDEXED_ATTRS)
+
+            def find_all(parent, tag, attrs):
+                fuzzy_attrs = self._get_fuzzy_step(attrs, attr_fuzz_ratio)
+                if attr_index is not None and attrs.keys() == indexed_attrs:
+                    return attr_index.find_all(parent, tag, fuzzy_attrs)
+                return backend_find_all(parent, tag, fuzzy_attrs)
+
+        if counters is None:
+            return find_all
+
+        count_children = self.backend.count_children
+
+        def counted_find_all(parent, tag, attrs):
+            counters['find_all_calls'] += 1
+            counters['nodes_visited'] += count_children(parent)
+            return find_all(parent, tag, attrs)
+
+        return counted_find_all
+
+    def _get_result_items(self, stack, elements, url, texts, child_indexes=None):
+        child_indexes = child_indexes or {}
         wanted_attr = stack['wanted_attr']
         is_full_url = stack['is_full_url']
         is_non_rec_text = stack.get('is_non_rec_text', False)
         result = [ResultItem(self._fetch_result_from_child(i, wanted_attr,
-                              is_full_url, url, is_non_rec_text),
-                              getattr(i, 'child_index', 0)) for i in parents]
+                              is_full_url, url, is_non_rec_text, texts),
+                              child_indexes.get(id(i), 0)) for i in elements]
         result = [x for x in result if x.text]
         return result
 
-    def _get_result_with_stack_index_based(self, stack, soup, url, attr_fuzz_ratio, **kwargs):
-        p = soup.findChildren(recursive=False)[0]
-        stack_content = stack['content']
-        for index, item in enumerate(stack_content[:-1]):
-            content = stack_content[index + 1]
-            attrs = content[1]
-            if attr_fuzz_ratio < 1.0:
-                attrs = self._get_fuzzy_attrs(attrs, attr_fuzz_ratio)
-            p = p.findAll(content[0], attrs, recursive=False)
-            if not p:
-                return []
-            idx = min(len(p) - 1, item[2])
-            p = p[idx]
-
-        result = [ResultItem(self._fetch_result_from_child(
-            p, stack['wanted_attr'], stack['is_full_url'], url, stack['is_non_rec_text']),
-            getattr(p, 'child_index', 0))]
-        result = [x for x in result if x.text]
-        return result
+    def _get_result_with_stack_list(self, soup, url, attr_fuzz_ratio, stack=None, counters=None,
+                                    **kwargs):
+        contain_sibling_leaves = kwargs.get('contain_sibling_leaves', False)
+        if attr_fuzz_ratio >= 1.0 and self.backend.supports_xpath(soup):
+            mode = 'similar_with_leaves' if contain_sibling_leaves else 'similar'
+            return self._get_rule_xpaths(stack).evaluate(soup.root, mode)
+
+        find_all = self._get_find_all(attr_fuzz_ratio, counters, soup)
+        return self._get_rule_trie(stack).evaluate_similar(soup, find_all, contain_sibling_leaves)
+
+    def _get_result_with_stack_list_index_based(self, soup, url, attr_fuzz_ratio, stack=None,
+                                                counters=None, **kwargs):
+        if attr_fuzz_ratio >= 1.0 and self.backend.supports_xpath(soup):
+            return self._get_rule_xpaths(stack).evaluate(soup.root, 'exact')
+
+        root = self.backend.get_root(soup)
+        find_all = self._get_find_all(attr_fuzz_ratio, counters, soup)
+        elements = self._get_rule_trie(stack).evaluate_exact(root, find_all)
+        return [[x] if x is not None else [] for x in elements]
+
+    def _profile_rules(self, func, soup, url, attr_fuzz_ratio, **kwargs):
+        # the rules are evaluated one by one, so that the time of each one is known
+        counters = dict(find_all_calls=0, nodes_visited=0)
+        elements_list = []
+        rule_times = []
+        start = time.perf_counter()
+        for stack in self.stack_list:
+            rule_start = time.perf_counter()
+            elements_list += func(soup, url, attr_fuzz_ratio, stack=stack, counters=counters,
+                                  **kwargs)
+            rule_times.append(time.perf_counter() - rule_start)
 
-    def _get_result_by_func(self, func, url, html, soup, request_args, grouped,
-                            group_by_alias, unique, attr_fuzz_ratio, **kwargs):
-        if not soup:
-            soup = self._get_soup(url=url, html=html, request_args=request_args)
+        self._emit('rules', time.perf_counter() - start, **counters)
+        return elements_list, rule_times
 
-        keep_order = kwargs.get('keep_order', False)
+    def _get_child_indexes(self, soup):
+        # the elements list keeps the indexed elements alive while their ids are used
+        elements = self.backend.iter_elements(soup)
+        return elements, {id(child): index for index, child in enumerate(elements)}
 
-        if group_by_alias or (keep_order and not grouped):
-            for index, child in enumerate(soup.findChildren()):
-                setattr(child, 'child_index', index)
+    def _collect_results(self, elements_list, soup, url, child_indexes, grouped, group_by_alias,
+                         unique, keep_order, rule_times=None):
+        texts = get_text_cache(self.backend, soup)
 
         result_list = []
         grouped_result = defaultdict(list)
-        for stack in self.stack_list:
+        for position, (stack, stack_elements) in enumerate(zip(self.stack_list, elements_list)):
             if not url:
                 url = stack.get('url', '')
 
-            result = func(stack, soup, url, attr_fuzz_ratio, **kwargs)
+            start = time.perf_counter() if rule_times else 0
+            result = self._get_result_items(stack, stack_elements, url, texts, child_indexes)
+            if rule_times:
+                self._emit('rule', rule_times[position] + time.perf_counter() - start,
+                           stack_id=stack['stack_id'], elements=len(stack_elements),
+                           matches=len(result))
 
             if not grouped and not group_by_alias:
                 result_list += result
@@ -372,8 +772,41 @@ class AutoScraper(object):
             group_id = stack.get('alias', '') if group_by_alias else stack['stack_id']
             grouped_result[group_id] += result
 
-        return self._clean_result(result_list, grouped_result, grouped, group_by_alias,
-                                  unique, keep_order)
+        return self._run_step('clean', self._clean_result, result_list, grouped_result, grouped,
+                              group_by_alias, unique, keep_order)
+
+    def _get_result_by_func(self, func, url, html, soup, request_args, grouped,
+                            group_by_alias, unique, attr_fuzz_ratio, **kwargs):
+        if soup is None and self.result_cache is not None:
+            options = dict(kwargs, grouped=grouped, group_by_alias=group_by_alias,
+                           unique=unique, attr_fuzz_ratio=attr_fuzz_ratio)
+            get_result = partial(self._get_result_by_func, func, url, None,
+                                 request_args=request_args, grouped=grouped,
+                                 group_by_alias=group_by_alias, unique=unique,
+                                 attr_fuzz_ratio=attr_fuzz_ratio, **kwargs)
+            return self.result_cache.get_result(self, func.__name__, url, html, request_args,
+                                                options, get_result)
+
+        if not soup:
+            soup = self._get_soup(url=url, html=html, request_args=request_args,
+                                  path_filter=self._get_path_filter(attr_fuzz_ratio))
+
+        keep_order = kwargs.get('keep_order', False)
+
+        elements = child_indexes = None
+        if group_by_alias or (keep_order and not grouped):
+            elements, child_indexes = self._run_step('index', self._get_child_indexes, soup)
+
+        rule_times = None
+        if self._hooks:
+            elements_list, rule_times = self._profile_rules(func, soup, url, attr_fuzz_ratio,
+                                                            **kwargs)
+        else:
+            # all rules are evaluated at once on the compiled stack_list
+            elements_list = func(soup, url, attr_fuzz_ratio, **kwargs)
+
+        return self._collect_results(elements_list, soup, url, child_indexes, grouped,
+                                     group_by_alias, unique, keep_order, rule_times)
 
     @staticmethod
     def _clean_result(result_list, grouped_result, grouped, grouped_by_alias, unique, keep_order):
@@ -408,8 +841,9 @@ class AutoScraper(object):
         url: str, optional
             URL of the target web page. You should either pass url or html or both.
 
-        html: str, optional
-            An HTML string can also be passed instead of URL.
+        html: str, bytes, file object or PathLike, optional
+            An HTML string can also be passed instead of URL, or the page as bytes or a
+                buffer such as an mmap, a file object or the path of a file.
                 You should either pass url or html or both.
 
         request_args: dict, optional
@@ -443,7 +877,7 @@ class AutoScraper(object):
         Dictionary if grouped=True or group_by_alias=True.
         """
 
-        func = self._get_result_with_stack
+        func = self._get_result_with_stack_list
         return self._get_result_by_func(func, url, html, soup, request_args, grouped,
                                          group_by_alias, unique, attr_fuzz_ratio,
                                          keep_order=keep_order,
@@ -459,8 +893,9 @@ class AutoScraper(object):
         url: str, optional
             URL of the target web page. You should either pass url or html or both.
 
-        html: str, optional
-            An HTML string can also be passed instead of URL.
+        html: str, bytes, file object or PathLike, optional
+            An HTML string can also be passed instead of URL, or the page as bytes or a
+                buffer such as an mmap, a file object or the path of a file.
                 You should either pass url or html or both.
 
         request_args: dict, optional
@@ -488,7 +923,7 @@ class AutoScraper(object):
         Dictionary if grouped=True or group_by_alias=True.
         """
 
-        func = self._get_result_with_stack_index_based
+        func = self._get_result_with_stack_list_index_based
         return self._get_result_by_func(func, url, html, soup, request_args, grouped,
                                         group_by_alias, unique, attr_fuzz_ratio)
 
@@ -502,8 +937,9 @@ class AutoScraper(object):
         url: str, optional
             URL of the target web page. You should either pass url or html or both.
 
-        html: str, optional
-            An HTML string can also be passed instead of URL.
+        html: str, bytes, file object or PathLike, optional
+            An HTML string can also be passed instead of URL, or the page as bytes or a
+                buffer such as an mmap, a file object or the path of a file.
                 You should either pass url or html or both.
 
         request_args: dict, optional
@@ -531,13 +967,746 @@ class AutoScraper(object):
         See get_result_similar and get_result_exact methods.
         """
 
-        soup = self._get_soup(url=url, html=html, request_args=request_args)
+        if self.result_cache is not None:
+            options = dict(grouped=grouped, group_by_alias=group_by_alias, unique=unique,
+                           attr_fuzz_ratio=attr_fuzz_ratio)
+            get_result = partial(self._get_result_pair, url, **options)
+            return self.result_cache.get_result(self, 'get_result', url, html, request_args,
+                                                options, get_result)
+
+        soup = self._get_soup(url=url, html=html, request_args=request_args,
+                              path_filter=self._get_path_filter(attr_fuzz_ratio))
+        return self._get_result_pair(url, soup, grouped, group_by_alias, unique,
+                                     attr_fuzz_ratio)
+
+    def _get_result_pair(self, url, soup, grouped, group_by_alias, unique, attr_fuzz_ratio):
         args = dict(url=url, soup=soup, grouped=grouped, group_by_alias=group_by_alias,
                                         unique=unique, attr_fuzz_ratio=attr_fuzz_ratio)
         similar = self.get_result_similar(**args)
         exact = self.get_result_exact(**args)
         return similar, exact
 
+    def _iter_result_by_func(self, func, url, html, soup, request_args, unique,
+                             attr_fuzz_ratio, max_seen, **kwargs):
+        if not soup:
+            soup = self._get_soup(url=url, html=html, request_args=request_args,
+                                  path_filter=self._get_path_filter(attr_fuzz_ratio))
+
+        elements, child_indexes = self._run_step('index', self._get_child_indexes, soup)
+        if self._hooks:
+            elements_list, _ = self._profile_rules(func, soup, url, attr_fuzz_ratio, **kwargs)
+        else:
+            elements_list = func(soup, url, attr_fuzz_ratio, **kwargs)
+
+        stack_list = self.stack_list
+        # same url for each rule as in get_result_similar
+        urls = []
+        for stack in stack_list:
+            if not url:
+                url = stack.get('url', '')
+            urls.append(url)
+
+        def iter_elements(position, stack_elements):
+            # the elements of a rule are in the order of the page
+            for element in stack_elements:
+                yield child_indexes.get(id(element), 0), position, element
+
+        texts = get_text_cache(self.backend, soup)
+        seen = SeenSet(max_seen) if unique else None
+        # results of all rules are merged in the order of the page, results of an element
+        # matched by several rules in the order of the rules
+        merged = heapq.merge(*[iter_elements(position, x) for position, x in
+                               enumerate(elements_list)], key=lambda x: x[0])
+        for _, position, element in merged:
+            stack = stack_list[position]
+            value = self._fetch_result_from_child(
+                element, stack['wanted_attr'], stack['is_full_url'], urls[position],
+                stack.get('is_non_rec_text', False), texts)
+            if not value:
+                continue
+            if seen is not None and not seen.add(value):
+                continue
+            yield stack.get('alias', ''), stack['stack_id'], value
+
+    def iter_result_similar(self, url=None, html=None, soup=None, request_args=None,
+                            unique=True, attr_fuzz_ratio=1.0, contain_sibling_leaves=False,
+                            max_seen=None):
+        """
+        Yields similar results based on the previously learned rules one by one, in the order
+            they are present on the web page. The results are not collected into lists, so
+            the first ones come before the values of the others are extracted.
+
+        Parameters:
+        ----------
+        url: str, optional
+            URL of the target web page. You should either pass url or html or both.
+
+        html: str, bytes, file object or PathLike, optional
+            An HTML string can also be passed instead of URL, or the page as bytes or a
+                buffer such as an mmap, a file object or the path of a file.
+                You should either pass url or html or both.
+
+        request_args: dict, optional
+            A dictionary used to specify a set of additional request parameters used by requests
+                module. You can specify proxy URLs, custom headers etc.
+
+        unique: bool, optional, defaults to True
+            If set to True, values yielded before, by any rule, are not yielded again.
+                The hashes of the values seen are kept in memory.
+
+        attr_fuzz_ratio: float in range [0, 1], optional, defaults to 1.0
+            The fuzziness ratio threshold for matching html tag attributes.
+
+        contain_sibling_leaves: bool, optional, defaults to False
+            If set to True, the results will also contain the sibling leaves of the wanted elements.
+
+        max_seen: int, optional
+            If set, only the max_seen values yielded most recently are remembered to remove
+                duplicates, bounding the memory used on pages with many results.
+
+        Returns:
+        --------
+        Generator of (alias, rule_id, value) tuples.
+        With unique=True, the values are the ones of get_result_similar(keep_order=True).
+        """
+
+        func = self._get_result_with_stack_list
+        return self._iter_result_by_func(func, url, html, soup, request_args, unique,
+                                         attr_fuzz_ratio, max_seen,
+                                         contain_sibling_leaves=contain_sibling_leaves)
+
+    def iter_result_exact(self, url=None, html=None, soup=None, request_args=None, unique=True,
+                          attr_fuzz_ratio=1.0, max_seen=None):
+        """
+        Yields exact results based on the previously learned rules one by one, in the order
+            they are present on the web page.
+
+        Parameters:
+        ----------
+        url: str, optional
+            URL of the target web page. You should either pass url or html or both.
+
+        html: str, bytes, file object or PathLike, optional
+            An HTML string can also be passed instead of URL, or the page as bytes or a
+                buffer such as an mmap, a file object or the path of a file.
+                You should either pass url or html or both.
+
+        request_args: dict, optional
+            A dictionary used to specify a set of additional request parameters used by requests
+                module. You can specify proxy URLs, custom headers etc.
+
+        unique: bool, optional, defaults to True
+            If set to True, values yielded before, by any rule, are not yielded again.
+
+        attr_fuzz_ratio: float in range [0, 1], optional, defaults to 1.0
+            The fuzziness ratio threshold for matching html tag attributes.
+
+        max_seen: int, optional
+            If set, only the max_seen values yielded most recently are remembered to remove
+                duplicates.
+
+        Returns:
+        --------
+        Generator of (alias, rule_id, value) tuples.
+        """
+
+        func = self._get_result_with_stack_list_index_based
+        return self._iter_result_by_func(func, url, html, soup, request_args, unique,
+                                         attr_fuzz_ratio, max_seen)
+
+    def stream_result_similar(self, url=None, html=None, request_args=None, grouped=False,
+                              group_by_alias=False, unique=False, attr_fuzz_ratio=1.0,
+                              contain_sibling_leaves=False, chunk_size=1 << 16):
+        """
+        Gets similar results based on the previously learned rules while the page is being
+            downloaded and parsed, for pages too large to be kept in memory as a whole.
+            Finished parts of the page are dropped as soon as no rule needs them.
+            The page is always parsed with lxml, whatever the backend.
+
+        Parameters:
+        ----------
+        url: str, optional
+            URL of the target web page. You should either pass url or html or both.
+
+        html: str, bytes, file object or PathLike, optional
+            An HTML string, bytes or a buffer such as an mmap, a file object opened in text
+                or binary mode or the path of a file can also be passed instead of URL.
+
+        request_args: dict, optional
+            A dictionary used to specify a set of additional request parameters used by requests
+                module. You can specify proxy URLs, custom headers etc.
+
+        grouped: bool, optional, defaults to False
+            If set to True, (rule_id, result) pairs are yielded.
+
+        group_by_alias: bool, optional, defaults to False
+            If set to True, (alias, result) pairs are yielded.
+
+        unique: bool, optional, defaults to False
+            If set to True, duplicate results are not yielded again.
+                The results yielded so far are then kept in memory.
+
+        attr_fuzz_ratio: float in range [0, 1], optional, defaults to 1.0
+            The fuzziness ratio threshold for matching html tag attributes.
+
+        contain_sibling_leaves: bool, optional, defaults to False
+            If set to True, the results will also contain the sibling leaves of the wanted elements.
+
+        chunk_size: int, optional, defaults to 65536
+            Number of bytes or characters read at once.
+
+        Returns:
+        --------
+        Generator of the similar results, yielded as soon as they are found on the web page.
+        """
+
+        if html is None or (isinstance(html, str) and not html):
+            chunks = self._stream_html(url, request_args, chunk_size)
+        else:
+            chunks = iter_text_chunks(html, chunk_size)
+
+        stack_list = self.stack_list
+        # same url for each rule as in get_result_similar
+        urls = []
+        for stack in stack_list:
+            if not url:
+                url = stack.get('url', '')
+            urls.append(url)
+
+        def get_value(position, element):
+            return get_stream_value(element, stack_list[position], urls[position])
+
+        get_attrs = None
+        if attr_fuzz_ratio < 1.0:
+            get_attrs = partial(self._get_fuzzy_attrs, attr_fuzz_ratio=attr_fuzz_ratio)
+
+        matcher = StreamMatcher(self._get_rule_trie(), get_value, get_attrs,
+                                contain_sibling_leaves)
+        seen = set()
+        for position, result in matcher.iter_results(iter_normalized_chunks(chunks)):
+            if not result:
+                continue
+
+            if grouped:
+                result = (stack_list[position]['stack_id'], result)
+            elif group_by_alias:
+                result = (stack_list[position].get('alias', ''), result)
+
+            if unique:
+                if result in seen:
+                    continue
+                seen.add(result)
+
+            yield result
+
+    def get_results_batch(self, pages, workers=None, method='similar', ordered=True,
+                          max_pending=None, **kwargs):
+        """
+        Scrapes many pages with the previously learned rules using a pool of worker processes.
+            The stack_list is sent to each worker once, not with every page.
+
+        Parameters:
+        ----------
+        pages: iterable
+            Iterable of (url, html) pairs or paths of HTML files.
+                html may be None to fetch the page from url.
+
+        workers: int, optional, defaults to the number of CPUs
+            Number of worker processes. If set to 1, pages are scraped in the current process.
+
+        method: str, optional, defaults to 'similar'
+            'similar', 'exact' or 'both' to use get_result_similar, get_result_exact
+                or get_result respectively.
+
+        ordered: bool, optional, defaults to True
+            If set to True, results are yielded in the input order.
+                Otherwise they are yielded as soon as they are ready.
+
+        max_pending: int, optional, defaults to 4 * workers
+            Maximum number of pages being processed or waiting to be yielded at once.
+
+        **kwargs:
+            Other parameters of the chosen get_result* method, e.g. group_by_alias.
+
+        Returns:
+        --------
+        Generator of BatchResult objects with index, source, result and error attributes.
+            A page raising an error yields a BatchResult with the error and result=None.
+        """
+
+        return iter_batch(self, pages, workers, method, ordered, max_pending, kwargs)
+
+    def scrape_archive(self, archive_path, output_path, workers=None, method='similar',
+                       checkpoint_path=None, resume=False, checkpoint_every=1000,
+                       max_pending=None, archive_format=None, output_format=None, url_key='url',
+                       html_key='html', progress=None, progress_every=10.0, **kwargs):
+        """
+        Scrapes the HTML records of a WARC or JSONL archive with worker processes and writes
+            the results to a JSONL or CSV file. Records are read as the workers are ready for
+            them, so memory use doesn't grow with the size of the archive. Records without
+            content are skipped, pages are never downloaded from their url.
+
+        Parameters:
+        ----------
+        archive_path: str
+            Path of a WARC file, or of a JSONL file with a page per line. Both may be gzipped.
+
+        output_path: str
+            Path of the output. CSV files have a row per value, other files get a JSON
+                object per record with its offset, url and result or error.
+
+        workers: int, optional, defaults to the number of CPUs
+            Number of worker processes. If set to 1, records are scraped in the current process.
+
+        method: str, optional, defaults to 'similar'
+            'similar', 'exact' or 'both', see get_results_batch.
+
+        checkpoint_path: str, optional
+            Path of a file where the offset of the next record to scrape is saved.
+
+        resume: bool, optional, defaults to False
+            If True and the checkpoint file exists, scraping resumes from its offset and the
+                output is appended to. Otherwise the output is overwritten.
+
+        checkpoint_every: int, optional, defaults to 1000
+            Number of records between two checkpoints.
+
+        max_pending: int, optional, defaults to 4 * workers
+            Maximum number of records being scraped or waiting to be written at once.
+
+        archive_format: str, optional
+            'warc' or 'jsonl'. Detected from the file name by default.
+
+        output_format: str, optional
+            'jsonl' or 'csv'. Detected from the file name by default.
+
+        url_key, html_key: str, optional, default to 'url' and 'html'
+            Keys of the url and of the HTML in the lines of a JSONL archive.
+
+        progress: function, optional
+            Called with the statistics of the run every progress_every seconds and at the
+                end, e.g. autoscraper.archive.report_progress.
+
+        progress_every: float, optional, defaults to 10.0
+            Number of seconds between two calls of progress.
+
+        **kwargs:
+            Other parameters of the chosen get_result* method, e.g. group_by_alias.
+
+        Returns:
+        --------
+        Dict with the number of records scraped ('records') and of errors ('errors'), the
+            offset to resume from ('offset'), the duration of the run ('seconds') and its
+            throughput ('pages_per_second'). Counts include the runs resumed from.
+        """
+
+        return scrape_archive(self, archive_path, output_path, archive_format=archive_format,
+                              output_format=output_format, workers=workers, method=method,
+                              checkpoint_path=checkpoint_path, resume=resume,
+                              checkpoint_every=checkpoint_every, max_pending=max_pending,
+                              url_key=url_key, html_key=html_key, progress=progress,
+                              progress_every=progress_every, kwargs=kwargs)
+
+    def _get_async_fetcher(self, fetcher=None):
+        if fetcher is not None:
+            return fetcher
+
+        if self._async_fetcher is None:
+            self._async_fetcher = AsyncFetcher()
+        return self._async_fetcher
+
+    async def _aget_html(self, fetcher, url, html, request_args):
+        if html:
+            return html
+
+        request_args = self._get_request_args(url, request_args)
+        start = time.perf_counter()
+        html = await fetcher.fetch(url, request_args)
+        if self._hooks:
+            self._emit('fetch', time.perf_counter() - start)
+        return html
+
+    async def _aprepare_page(self, fetcher, url, html, request_args, kwargs):
+        # pages of the PageCache are read through it in the worker thread, as the blocking
+        # methods do, rather than downloaded by the fetcher
+        if not html and self.cache is not None:
+            return html, dict(kwargs, request_args=request_args)
+        return await self._aget_html(fetcher, url, html, request_args), kwargs
+
+    async def _arun(self, method, url, html, request_args, fetcher, kwargs):
+        fetcher = self._get_async_fetcher(fetcher)
+        html, kwargs = await self._aprepare_page(fetcher, url, html, request_args, kwargs)
+        return await fetcher.run(partial(method, url=url, html=html, **kwargs))
+
+    async def aget_result_similar(self, url=None, html=None, request_args=None, fetcher=None,
+                                  **kwargs):
+        """
+        Async version of get_result_similar. The page is downloaded with a pooled connection
+            and parsed in a worker thread, so the event loop is not blocked. If the scraper
+            has a PageCache, pages fetched from their url are read through the cache in the
+            worker thread instead, and downloaded without the pool of the fetcher.
+
+        Parameters:
+        ----------
+        url, html, request_args:
+            Same as get_result_similar.
+
+        fetcher: AsyncFetcher, optional
+            Pooled HTTP client to use. Defaults to one shared by this AutoScraper object,
+                which is released by aclose().
+
+        **kwargs:
+            Other parameters of get_result_similar.
+
+        Returns:
+        --------
+        Same as get_result_similar.
+        """
+
+        return await self._arun(self.get_result_similar, url, html, request_args, fetcher,
+                                kwargs)
+
+    async def aget_result_exact(self, url=None, html=None, request_args=None, fetcher=None,
+                                **kwargs):
+        """
+        Async version of get_result_exact. See aget_result_similar.
+        """
+
+        return await self._arun(self.get_result_exact, url, html, request_args, fetcher,
+                                kwargs)
+
+    async def aget_result(self, url=None, html=None, request_args=None, fetcher=None, **kwargs):
+        """
+        Async version of get_result. See aget_result_similar.
+        """
+
+        return await self._arun(self.get_result, url, html, request_args, fetcher, kwargs)
+
+    async def _ascrape_page(self, fetcher, method, index, page, request_args, kwargs):
+        url, html = (page, None) if isinstance(page, str) else page
+        try:
+            html, kwargs = await self._aprepare_page(fetcher, url, html, request_args, kwargs)
+        except Exception as e:
+            return BatchResult(index, url, error='%s: %s' % (type(e).__name__, e))
+
+        return await fetcher.run(scrape_page, self, method, index, (url, html), kwargs)
+
+    async def aget_results_batch(self, pages, method='similar', ordered=True, request_args=None,
+                                 fetcher=None, max_pending=None, **kwargs):
+        """
+        Scrapes many pages concurrently with the previously learned rules.
+            Downloads share the connection pool and the limits of the fetcher.
+
+        Parameters:
+        ----------
+        pages: iterable
+            Iterable of urls or (url, html) pairs.
+
+        method: str, optional, defaults to 'similar'
+            'similar', 'exact' or 'both' to use get_result_similar, get_result_exact
+                or get_result respectively.
+
+        ordered: bool, optional, defaults to True
+            If set to True, results are yielded in the input order.
+                Otherwise they are yielded as soon as they are ready.
+
+        request_args: dict, optional
+            Additional request parameters used for every download.
+
+        fetcher: AsyncFetcher, optional
+            Pooled HTTP client to use. Defaults to one shared by this AutoScraper object,
+                which is released by aclose().
+
+        max_pending: int, optional, defaults to 2 * fetcher.max_connections
+            Maximum number of pages being processed or waiting to be yielded at once.
+
+        **kwargs:
+            Other parameters of the chosen get_result* method, e.g. group_by_alias.
+
+        Returns:
+        --------
+        Async generator of BatchResult objects. See get_results_batch.
+        """
+
+        fetcher = self._get_async_fetcher(fetcher)
+        max_pending = max_pending or fetcher.max_connections * 2
+        pages = enumerate(pages)
+
+        pending = set()
+        done_results = {}
+        next_index = 0
+        exhausted = False
+        try:
+            while pending or not exhausted:
+                while not exhausted and len(pending) + len(done_results) < max_pending:
+                    item = next(pages, None)
+                    if item is None:
+                        exhausted = True
+                        break
+                    index, page = item
+                    pending.add(asyncio.ensure_future(self._ascrape_page(
+                        fetcher, method, index, page, request_args, kwargs)))
+
+                if not pending:
+                    break
+
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    result = task.result()
+                    if not ordered:
+                        yield result
+                        continue
+                    done_results[result.index] = result
+
+                while next_index in done_results:
+                    yield done_results.pop(next_index)
+                    next_index += 1
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def close(self):
+        """
+        Closes the AsyncFetcher the async methods created when no fetcher was given, along
+            with its connections and thread pool. A new one is created if they are used again.
+        """
+
+        if self._async_fetcher is not None:
+            self._async_fetcher.close()
+            self._async_fetcher = None
+
+    async def aclose(self):
+        """
+        Async version of close.
+        """
+
+        self.close()
+
+    def add_hook(self, hook):
+        """
+        Adds an instrumentation hook. Once a hook is added, the steps of the get_result* calls
+            and the fetching and parsing of build() are timed, and each hook is called as
+            hook(phase, seconds, info) after each step. Without hooks, nothing is measured.
+
+        Phases are 'fetch', 'normalize' (unescaping and unicode normalization), 'parse',
+            'index', 'rules', 'rule' and 'clean' (grouping and deduplication of the results).
+            'rules' is the evaluation of all rules, its info has the number of find_all_calls
+            and of nodes_visited by them, which are not counted for the rules evaluated with
+            XPath. 'rule' is the evaluation of one rule, its info has the stack_id, the number
+            of matched elements and the number of matches giving a result. While instrumented,
+            rules are evaluated one by one rather than sharing their common steps.
+            'fingerprint' is the hashing of the page by the result_cache.
+
+        Hooks are not called in the worker processes of get_results_batch, nor by
+            stream_result_similar.
+
+        Parameters:
+        ----------
+        hook: function
+            Function called with the phase name, its duration in seconds and a dict of info,
+                e.g. an autoscraper.ScrapeStats object aggregating the events.
+
+        Returns:
+        --------
+        The hook
+        """
+
+        self._hooks += (hook,)
+        return hook
+
+    def remove_hook(self, hook):
+        """
+        Removes a hook added with add_hook.
+
+        Parameters:
+        ----------
+        hook: function
+            The hook to remove
+
+        Returns:
+        --------
+        None
+        """
+
+        self._hooks = tuple(x for x in self._hooks if x is not hook)
+
+    def _emit(self, phase, seconds, **info):
+        for hook in self._hooks:
+            hook(phase, seconds, info)
+
+    def _run_step(self, phase, func, *args):
+        if not self._hooks:
+            return func(*args)
+
+        start = time.perf_counter()
+        result = func(*args)
+        self._emit(phase, time.perf_counter() - start)
+        return result
+
+    def compile(self, format='xpath'):
+        """
+        Exports the learned rules as queries which can be run without AutoScraper.
+
+        Parameters:
+        ----------
+        format: str, optional, defaults to 'xpath'
+            Format of the queries. Only 'xpath' is supported.
+
+        Returns:
+        --------
+        List of dicts, one per rule, with the stack_id, alias and wanted attribute of the rule
+            and its XPath expressions: 'similar', 'similar_with_leaves' (for
+            contain_sibling_leaves=True) and 'exact'. The expressions select the elements,
+            the result is their text or the wanted attribute.
+        """
+
+        if format != 'xpath':
+            raise ValueError('Only the xpath format is supported')
+
+        compiled = []
+        for stack, expressions in zip(self.stack_list, self._get_rule_xpaths().expressions):
+            item = dict(stack_id=stack['stack_id'], alias=stack.get('alias', ''),
+                        wanted_attr=stack['wanted_attr'], is_full_url=stack['is_full_url'],
+                        is_non_rec_text=stack.get('is_non_rec_text', False))
+            item.update(expressions)
+            compiled.append(item)
+        return compiled
+
+    def _relearn_stack(self, stack, sample, soup, url, text_fuzz_ratio, context):
+        if 'texts' not in context:
+            # the whole document is only scanned if some rule must be re-learned
+            context['elements'] = self.backend.iter_elements(soup)
+            context['texts'] = get_text_cache(self.backend, soup)
+            context['texts'].compute_all()
+            context.update(marks={}, sibling_indexes={}, index=None)
+
+        if context['index'] is None and BuildIndex.is_indexable(sample, text_fuzz_ratio):
+            context['index'] = BuildIndex(self.backend, context['texts'], context['elements'],
+                                          url)
+
+        marks = context['marks']
+        children = self._get_children(context['elements'], sample, url, text_fuzz_ratio, marks,
+                                      context['texts'], context['index'])
+        stacks = [self._build_stack(x, url, marks[id(x)], context['sibling_indexes'])
+                  for x in children]
+        if not stacks:
+            return None
+
+        # a new rule getting the same attribute is preferred
+        same_kind = [x for x in stacks if x['wanted_attr'] == stack['wanted_attr']]
+        return (same_kind or stacks)[0]
+
+    def repair_rules(self, url=None, html=None, request_args=None, samples=None,
+                     text_fuzz_ratio=1.0):
+        """
+        Re-learns the rules which broke on a new version of a page, keeping their stack_id and
+            alias. A rule is broken if it gives no similar result on the page, or if a sample
+            of its expected result is given and isn't among its results. Broken rules are
+            re-learned from their sample, and the page is only scanned for their samples.
+
+        Parameters:
+        ----------
+        url: str, optional
+            URL of the target web page. You should either pass url or html or both.
+
+        html: str, bytes, file object or PathLike, optional
+            An HTML string can also be passed instead of URL, or the page as bytes or a
+                buffer such as an mmap, a file object or the path of a file.
+                You should either pass url or html or both.
+
+        request_args: dict, optional
+            A dictionary used to specify a set of additional request parameters used by requests
+                module. You can specify proxy URLs, custom headers etc.
+
+        samples: dict, optional
+            Expected results on the page by stack_id. Rules without a given sample are
+                re-learned from the wanted item they were built from, if they are broken.
+
+        text_fuzz_ratio: float in range [0, 1], optional, defaults to 1.0
+            The fuzziness ratio threshold for matching the samples.
+
+        Returns:
+        --------
+        Dict with the stack_ids as keys and 'ok', 'repaired' or 'broken' as values.
+            'broken' rules could not be re-learned and are left unchanged.
+        """
+
+        samples = {k: normalize(v) for k, v in (samples or {}).items()}
+        soup = self._get_soup(url=url, html=html, request_args=request_args)
+        results = self.get_result_similar(url=url, soup=soup, grouped=True)
+
+        status = {}
+        context = {}
+        for position, stack in enumerate(self.stack_list):
+            stack_id = stack['stack_id']
+            values = results.get(stack_id)
+            expected = samples.get(stack_id)
+            if values and (expected is None or expected in values):
+                status[stack_id] = 'ok'
+                continue
+
+            sample = expected if expected is not None else stack.get('sample')
+            page_url = url or stack.get('url', '')
+            new_stack = None
+            if sample is not None:
+                new_stack = self._relearn_stack(stack, sample, soup, page_url,
+                                                text_fuzz_ratio, context)
+            if new_stack is None:
+                status[stack_id] = 'broken'
+                continue
+
+            new_stack.update(stack_id=stack_id, alias=stack.get('alias', ''), sample=sample)
+            self.stack_list[position] = to_rules([new_stack])[0]
+            status[stack_id] = 'repaired'
+
+        self._compile_rules()
+        return status
+
+    def optimize(self, pages, request_args=None, attr_fuzz_ratio=1.0, remove_unmatched=True,
+                 repeat=3):
+        """
+        Removes the rules which are not needed on a set of sample pages: rules matching
+            nothing, and rules whose elements are all selected by other rules giving the same
+            alias and attribute, both as similar and as exact results. Afterwards, the unique
+            results on the sample pages are the same, ungrouped or grouped by alias, except
+            for the order of ungrouped results which aren't requested with keep_order.
+            Results grouped by rule lose the removed rules, and results with duplicates,
+            e.g. grouped results with unique left to None, may hold fewer repeated values.
+
+        Parameters:
+        ----------
+        pages: iterable
+            Sample pages, as (url, html) pairs or paths of HTML files, see get_results_batch.
+                html can be None to fetch the url.
+
+        request_args: dict, optional
+            A dictionary used to specify a set of additional request parameters used by requests
+                module. You can specify proxy URLs, custom headers etc.
+
+        attr_fuzz_ratio: float in range [0, 1], optional, defaults to 1.0
+            The fuzziness ratio threshold for matching html tag attributes, as it is
+                used when scraping.
+
+        remove_unmatched: bool, optional, defaults to True
+            Whether to remove the rules matching nothing on all sample pages.
+
+        repeat: int, optional, defaults to 3
+            Number of timed runs before and after, the fastest is reported.
+
+        Returns:
+        --------
+        Dict with the number of rules before and after ('rules_before', 'rules_after'),
+            the reason each rule was removed by stack_id ('removed'), the time of scraping
+            the sample pages before and after in seconds ('time_before', 'time_after')
+            and their ratio ('speedup').
+        """
+
+        report = optimize_rules(self, pages, request_args=request_args,
+                                attr_fuzz_ratio=attr_fuzz_ratio,
+                                remove_unmatched=remove_unmatched, repeat=repeat)
+        self._compile_rules()
+        return report
+
     def remove_rules(self, rules):
         """
         Removes a list of learned rules from stack_list.
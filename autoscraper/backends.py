@@ -0,0 +1,430 @@
+import re
+
+from bs4 import BeautifulSoup
+from bs4.element import Tag
+from bs4.builder import HTMLTreeBuilder
+from bs4.builder._lxml import LXMLTreeBuilder
+from lxml import etree
+
+from autoscraper.utils import get_non_rec_text
+
+# bs4 conventions, kept so that both backends see the same attributes and texts
+CDATA_LIST_ATTRIBUTES = HTMLTreeBuilder.DEFAULT_CDATA_LIST_ATTRIBUTES
+STRING_CONTAINERS = frozenset(HTMLTreeBuilder.DEFAULT_STRING_CONTAINERS)
+PRESERVE_WHITESPACE_TAGS = frozenset(HTMLTreeBuilder.DEFAULT_PRESERVE_WHITESPACE_TAGS)
+ASCII_SPACES = BeautifulSoup.ASCII_SPACES
+
+# events of the document walks used by autoscraper.text_cache
+START, STRING, END = 'start', 'string', 'end'
+
+nonwhitespace_re = re.compile(r'\S+')
+# whitespace splitting class names which XPath normalize-space doesn't handle,
+# documents containing it are not evaluated with XPath. see autoscraper.xpath
+XPATH_UNSAFE_WHITESPACE = ''.join(
+    c for c in map(chr, range(0x3001)) if nonwhitespace_re.match(c) is None and c not in ' \t\n\r')
+xpath_unsafe_re = re.compile('[%s]' % re.escape(XPATH_UNSAFE_WHITESPACE))
+
+
+class SoupBackend(object):
+    """
+    Default backend. Documents are BeautifulSoup objects built with the lxml parser.
+    """
+
+    name = 'bs4'
+    # tags are kept alive by their document, so their ids don't change
+    stable_ids = True
+
+    @staticmethod
+    def parse(html, path_filter=None):
+        if path_filter is not None:
+            return BeautifulSoup(html, builder=_PartialTreeBuilder(path_filter))
+        return BeautifulSoup(html, 'lxml')
+
+    @classmethod
+    def parse_chunks(cls, chunks, path_filter=None):
+        return cls.parse(''.join(chunks), path_filter)
+
+    @staticmethod
+    def is_document(document):
+        return isinstance(document, BeautifulSoup)
+
+    @staticmethod
+    def get_root(document):
+        return document.findChildren(recursive=False)[0]
+
+    @staticmethod
+    def supports_xpath(document):
+        return False
+
+    @staticmethod
+    def iter_elements(document):
+        return document.findChildren()
+
+    @staticmethod
+    def find_all(parent, tag, attrs):
+        return parent.findAll(tag, attrs, recursive=False)
+
+    @staticmethod
+    def count_children(parent):
+        return len(parent.contents)
+
+    @staticmethod
+    def get_children(parent):
+        return [x for x in parent.contents if isinstance(x, Tag)]
+
+    @staticmethod
+    def get_parent(element):
+        return element.findParent()
+
+    @staticmethod
+    def get_name(element):
+        return element.name
+
+    @staticmethod
+    def get_attrs(element):
+        return element.attrs
+
+    @staticmethod
+    def get_text(element):
+        return element.getText()
+
+    @staticmethod
+    def get_non_rec_text(element):
+        return get_non_rec_text(element)
+
+    @staticmethod
+    def walk(document):
+        """
+        Yields the (event, node, key) of the document in order: START and END of every tag
+            with the string types of its text as key, and every string with its type as key.
+        """
+
+        yield START, document, document.interesting_string_types
+        stack = [(document, iter(document.contents))]
+        while stack:
+            node, contents = stack[-1]
+            child = next(contents, None)
+            if child is None:
+                stack.pop()
+                yield END, node, None
+            elif isinstance(child, Tag):
+                yield START, child, child.interesting_string_types
+                stack.append((child, iter(child.contents)))
+            else:
+                yield STRING, child, type(child)
+
+
+class _PartialTreeBuilder(LXMLTreeBuilder):
+    # tree builder of bs4 skipping the elements a PathFilter finds unneeded
+    def __init__(self, path_filter, **kwargs):
+        super().__init__(**kwargs)
+        self.path_filter = path_filter
+        self._states = []
+        self._skipped = 0
+
+    def start(self, name, attrs, nsmap={}):
+        if self._skipped:
+            self._skipped += 1
+            return
+
+        if self._states:
+            state = self.path_filter.get_state(self._states[-1], name, attrs)
+            if state is None:
+                self._skipped = 1
+                return
+        else:
+            state = self.path_filter.get_root_state(name, attrs)
+
+        self._states.append(state)
+        super().start(name, attrs, nsmap)
+
+    def end(self, name):
+        if self._skipped:
+            self._skipped -= 1
+            return
+
+        self._states.pop()
+        super().end(name)
+
+    def data(self, content):
+        if not self._skipped:
+            super().data(content)
+
+    def comment(self, content):
+        if not self._skipped:
+            super().comment(content)
+
+    def pi(self, target, data):
+        if not self._skipped:
+            super().pi(target, data)
+
+
+class LxmlDocument(object):
+    """
+    Document node of a tree parsed by LxmlBackend, the parent of the <html> element.
+    """
+
+    __slots__ = ('root', 'xpath_safe', '__weakref__')
+
+    tag = '[document]'
+    text = None
+    tail = None
+
+    def __init__(self, root, xpath_safe=False):
+        self.root = root
+        self.xpath_safe = xpath_safe
+
+    def __iter__(self):
+        if self.root is not None:
+            yield self.root
+
+
+def _matches(markup, match_against):
+    # same semantics as bs4 SoupStrainer._matches for the values used in the rules
+    if isinstance(markup, (list, tuple)):
+        for item in markup:
+            if _matches(item, match_against):
+                return True
+        return _matches(' '.join(markup), match_against)
+
+    if markup is None:
+        return not match_against
+
+    if isinstance(match_against, str):
+        return markup == match_against
+
+    if isinstance(match_against, (list, tuple)):
+        return any(_matches(markup, item) for item in match_against)
+
+    if hasattr(match_against, 'search'):
+        return bool(match_against.search(markup))
+
+    return False
+
+
+def _is_element(node):
+    return isinstance(node.tag, str)
+
+
+def _clean_string(text, preserve_whitespace):
+    if not preserve_whitespace and not text.strip(ASCII_SPACES):
+        return '\n' if '\n' in text else ' '
+    return text
+
+
+class LxmlBackend(object):
+    """
+    Backend working directly on lxml elements, without building a BeautifulSoup tree.
+    Attribute matching, texts and multi-valued attributes follow bs4, so both backends
+    give the same results.
+    """
+
+    name = 'lxml'
+    # elements are proxies which may be recreated with another id once released
+    stable_ids = False
+
+    @staticmethod
+    def parse(html, path_filter=None):
+        # libxml2 builds the whole tree faster than it could be filtered while parsing,
+        # so documents are never parsed partially
+        parser = etree.HTMLParser(recover=True, strip_cdata=False)
+        parser.feed(html)
+        return LxmlDocument(parser.close(), xpath_safe=not xpath_unsafe_re.search(html))
+
+    @staticmethod
+    def parse_chunks(chunks, path_filter=None):
+        # the chunks are fed as they come, the whole text is never held in memory
+        parser = etree.HTMLParser(recover=True, strip_cdata=False)
+        # an empty document is parsed as by parse, rather than raising
+        parser.feed('')
+        xpath_safe = True
+        for chunk in chunks:
+            xpath_safe = xpath_safe and not xpath_unsafe_re.search(chunk)
+            parser.feed(chunk)
+        return LxmlDocument(parser.close(), xpath_safe=xpath_safe)
+
+    @staticmethod
+    def is_document(document):
+        return isinstance(document, LxmlDocument)
+
+    @staticmethod
+    def get_root(document):
+        return list(document)[0]
+
+    @staticmethod
+    def supports_xpath(document):
+        return document.xpath_safe and document.root is not None
+
+    @staticmethod
+    def iter_elements(document):
+        if document.root is None:
+            return []
+        return [x for x in document.root.iter() if _is_element(x)]
+
+    @classmethod
+    def find_all(cls, parent, tag, attrs):
+        return [child for child in parent if child.tag == tag and cls.matches_attrs(child, attrs)]
+
+    @staticmethod
+    def count_children(parent):
+        if isinstance(parent, LxmlDocument):
+            return int(parent.root is not None)
+        return len(parent)
+
+    @staticmethod
+    def get_children(parent):
+        return [x for x in parent if _is_element(x)]
+
+    @classmethod
+    def matches_attrs(cls, element, attrs):
+        for key, match_against in attrs.items():
+            if not _matches(cls.get_attr(element, key), match_against):
+                return False
+        return True
+
+    @staticmethod
+    def get_parent(element):
+        if isinstance(element, LxmlDocument):
+            return None
+        parent = element.getparent()
+        if parent is None:
+            return LxmlDocument(element)
+        return parent
+
+    @staticmethod
+    def get_name(element):
+        return element.tag
+
+    @staticmethod
+    def _is_cdata_list(tag, key):
+        return key in CDATA_LIST_ATTRIBUTES['*'] or key in CDATA_LIST_ATTRIBUTES.get(tag, ())
+
+    @classmethod
+    def split_attr(cls, tag, key, value):
+        """Returns the value of an attribute as parsed, split if it has multiple values."""
+
+        if value is not None and cls._is_cdata_list(tag, key):
+            return nonwhitespace_re.findall(value)
+        return value
+
+    @classmethod
+    def get_attr(cls, element, key):
+        return cls.split_attr(element.tag, key, element.get(key))
+
+    @classmethod
+    def get_attrs(cls, element):
+        if isinstance(element, LxmlDocument):
+            return {}
+        attrs = dict(element.attrib)
+        for key, value in attrs.items():
+            if cls._is_cdata_list(element.tag, key):
+                attrs[key] = nonwhitespace_re.findall(value)
+        return attrs
+
+    @staticmethod
+    def _get_context(element):
+        # innermost string container and whitespace preservation around the element
+        container = None
+        preserve = False
+        parent = element.getparent()
+        while parent is not None:
+            if container is None and parent.tag in STRING_CONTAINERS:
+                container = parent.tag
+            preserve = preserve or parent.tag in PRESERVE_WHITESPACE_TAGS
+            parent = parent.getparent()
+        return container, preserve
+
+    @classmethod
+    def get_text(cls, element):
+        if isinstance(element, LxmlDocument):
+            element = element.root
+            if element is None:
+                return ''
+
+        # bs4 only keeps the strings of the same container type as the element itself,
+        # e.g. scripts are not part of the text of their parents
+        wanted = element.tag if element.tag in STRING_CONTAINERS else None
+        container, preserve = cls._get_context(element)
+        strings = []
+
+        def walk(node, container, preserve):
+            if node.tag in STRING_CONTAINERS:
+                container = node.tag
+            preserve = preserve or node.tag in PRESERVE_WHITESPACE_TAGS
+            keep = container == wanted
+            if node.text and keep:
+                strings.append(_clean_string(node.text, preserve))
+            for child in node:
+                if _is_element(child):
+                    walk(child, container, preserve)
+                if child.tail and keep:
+                    strings.append(_clean_string(child.tail, preserve))
+
+        walk(element, container, preserve)
+        return ''.join(strings)
+
+    @classmethod
+    def get_non_rec_text(cls, element):
+        _, preserve = cls._get_context(element)
+        preserve = preserve or element.tag in PRESERVE_WHITESPACE_TAGS
+        strings = [element.text]
+        for child in element:
+            if not _is_element(child):
+                text = child.text
+                if isinstance(child, etree._ProcessingInstruction):
+                    text = child.target + ' ' + (text or '')
+                strings.append(text)
+            strings.append(child.tail)
+        return ''.join(_clean_string(x, preserve) for x in strings if x).strip()
+
+    @staticmethod
+    def walk(document):
+        """
+        Yields the (event, node, key) of the document in order, as SoupBackend.walk does.
+            Keys are tuples of string containers, None standing for no container.
+        """
+
+        yield START, document, (None,)
+        stack = [(document, iter(document), None, False)]
+        while stack:
+            element, children, container, preserve = stack[-1]
+            child = next(children, None)
+            if child is None:
+                stack.pop()
+                yield END, element, None
+            elif _is_element(child):
+                key = child.tag if child.tag in STRING_CONTAINERS else None
+                container = key or container
+                preserve = preserve or child.tag in PRESERVE_WHITESPACE_TAGS
+                yield START, child, (key,)
+                if child.text:
+                    yield STRING, _clean_string(child.text, preserve), container
+                stack.append((child, iter(child), container, preserve))
+                continue
+            else:
+                # comments and processing instructions are only part of non recursive texts
+                text = child.text or ''
+                if isinstance(child, etree._ProcessingInstruction):
+                    text = child.target + ' ' + text
+                if text:
+                    yield STRING, _clean_string(text, preserve), child.tag
+
+            # the tail of a node is a string of its parent
+            node = child if child is not None else element
+            if node.tail and len(stack) > 1:
+                _, _, container, preserve = stack[-1]
+                yield STRING, _clean_string(node.tail, preserve), container
+
+
+BACKENDS = {
+    SoupBackend.name: SoupBackend,
+    LxmlBackend.name: LxmlBackend,
+}
+
+
+def get_backend(backend):
+    if isinstance(backend, str):
+        if backend not in BACKENDS:
+            raise ValueError('backend must be one of %s' % ', '.join(sorted(BACKENDS)))
+        return BACKENDS[backend]()
+    return backend
@@ -0,0 +1,166 @@
+import os
+
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+BATCH_METHODS = {
+    'similar': 'get_result_similar',
+    'exact': 'get_result_exact',
+    'both': 'get_result',
+}
+
+_worker_scraper = None
+
+
+class BatchResult(object):
+    """
+    Result of scraping one page of a batch.
+
+    Attributes
+    ----------
+    index: int
+        Position of the page in the input iterable.
+    source: str
+        URL of the page, or its file path if it was read from disk.
+    result: list, dict or tuple
+        Same value as the corresponding get_result* method. None if an error occurred.
+    error: str
+        Description of the error raised while scraping the page, or None.
+    """
+
+    def __init__(self, index, source, result=None, error=None):
+        self.index = index
+        self.source = source
+        self.result = result
+        self.error = error
+
+    def __repr__(self):
+        return 'BatchResult(index=%r, source=%r, error=%r)' % (self.index, self.source, self.error)
+
+
+def _split_page(page):
+    if isinstance(page, (str, os.PathLike)):
+        return None, None, os.fspath(page)
+    url, html = page
+    return url, html, None
+
+
+def _read_html(path):
+    # pages are decoded when they are parsed, from their BOM or declared encoding
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def load_page(page):
+    """Returns the (url, html) of a page of a batch, reading it from disk if needed."""
+
+    url, html, path = _split_page(page)
+    if path:
+        html = _read_html(path)
+    return url, html
+
+
+def scrape_page(scraper, method, index, page, kwargs, fetch=True):
+    source = None
+    try:
+        url, html, path = _split_page(page)
+        source = path or url
+        if path:
+            html = _read_html(path)
+        # pages without html are fetched from their url, unless only given pages are scraped
+        if not fetch and not html:
+            raise ValueError('the page has no html')
+        result = getattr(scraper, BATCH_METHODS[method])(url=url, html=html, **kwargs)
+        return BatchResult(index, source, result=result)
+    except Exception as e:
+        return BatchResult(index, source, error='%s: %s' % (type(e).__name__, e))
+
+
+def _init_worker(scraper_class, stack_list, backend, partial_parse=False):
+    global _worker_scraper
+    _worker_scraper = scraper_class(stack_list, backend=backend, partial_parse=partial_parse)
+
+
+def _scrape_in_worker(method, index, page, kwargs, fetch):
+    return scrape_page(_worker_scraper, method, index, page, kwargs, fetch)
+
+
+def _split_sample(sample):
+    page, wanted = sample
+    url, html = load_page(page)
+    if isinstance(wanted, dict):
+        return url, html, dict(wanted_dict=wanted)
+    return url, html, dict(wanted_list=wanted)
+
+
+def _build_in_worker(scraper_class, backend, sample, kwargs):
+    scraper = scraper_class(backend=backend)
+    url, html, wanted = _split_sample(sample)
+    result = scraper.build(url=url, html=html, **wanted, **kwargs)
+    return result, scraper.stack_list
+
+
+def iter_build(scraper, samples, workers, kwargs):
+    """
+    Builds a separate stack_list on each sample, yielding (result, stack_list) in the order
+        of the samples.
+    """
+
+    workers = workers or os.cpu_count() or 1
+    scraper_class, backend = type(scraper), scraper.backend
+    if workers == 1:
+        for sample in samples:
+            yield _build_in_worker(scraper_class, backend, sample, kwargs)
+        return
+
+    with ProcessPoolExecutor(workers) as executor:
+        futures = [executor.submit(_build_in_worker, scraper_class, backend, sample, kwargs)
+                   for sample in samples]
+        for future in futures:
+            yield future.result()
+
+
+def iter_batch(scraper, pages, workers, method, ordered, max_pending, kwargs, fetch=True):
+    if method not in BATCH_METHODS:
+        raise ValueError('method must be one of %s' % ', '.join(sorted(BATCH_METHODS)))
+
+    if workers == 1:
+        for index, page in enumerate(pages):
+            yield scrape_page(scraper, method, index, page, kwargs, fetch)
+        return
+
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or workers * 4
+    pages = enumerate(pages)
+
+    # the stack_list is sent to every worker once, tasks only carry the pages
+    initargs = (type(scraper), scraper.stack_list, scraper.backend, scraper.partial_parse)
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=initargs) as executor:
+        pending = set()
+        done_results = {}
+        next_index = 0
+        exhausted = False
+        while pending or not exhausted:
+            # results waiting for an earlier page count against the window as well
+            while not exhausted and len(pending) + len(done_results) < max_pending:
+                item = next(pages, None)
+                if item is None:
+                    exhausted = True
+                    break
+                index, page = item
+                pending.add(executor.submit(_scrape_in_worker, method, index, page, kwargs,
+                                             fetch))
+
+            if not pending:
+                break
+
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                if not ordered:
+                    yield result
+                    continue
+                done_results[result.index] = result
+
+            while next_index in done_results:
+                yield done_results.pop(next_index)
+                next_index += 1
@@ -0,0 +1,44 @@
+from collections import defaultdict
+from urllib.parse import urljoin
+
+
+class BuildIndex(object):
+    """
+    Index of the texts, non recursive texts and attribute values (and full urls of href and
+    src attributes) of all elements of a document, computed in a single pass.
+    Used by build() to find the elements which may contain an exact wanted text without
+    scanning the whole document for each wanted item.
+
+    Values are indexed by their hash to keep the index small, so the candidates must still
+    be checked with AutoScraper._child_has_text.
+    """
+
+    def __init__(self, backend, texts, elements, url):
+        self._positions = defaultdict(list)
+
+        for position, element in enumerate(elements):
+            self._add(texts.get_text(element).strip(), position)
+            self._add(texts.get_non_rec_text(element), position)
+
+            for key, value in backend.get_attrs(element).items():
+                if not isinstance(value, str):
+                    continue
+
+                value = value.strip()
+                self._add(value, position)
+                if key in {'href', 'src'}:
+                    self._add(urljoin(url, value), position)
+
+    def _add(self, value, position):
+        positions = self._positions[hash(value)]
+        if not positions or positions[-1] != position:
+            positions.append(position)
+
+    @staticmethod
+    def is_indexable(text, text_fuzz_ratio):
+        return text_fuzz_ratio >= 1 and isinstance(text, str)
+
+    def get_candidates(self, text):
+        """Returns the positions of the elements which may contain the text, last ones first."""
+
+        return self._positions.get(hash(text), [])[::-1]
@@ -0,0 +1,175 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from collections import OrderedDict
+
+
+def get_cache_key(url, request_args=None):
+    """Returns a key of the page at url requested with request_args."""
+
+    args = json.dumps(request_args or {}, sort_keys=True, default=repr)
+    return hashlib.sha1((url + '\n' + args).encode('utf-8')).hexdigest()
+
+
+class PageCache(object):
+    """
+    Cache of the pages fetched by AutoScraper from their url.
+
+    Parsed documents are kept in memory, the least recently used ones being dropped beyond
+        max_bytes. Responses can also be saved to a directory. Saved responses which have an
+        ETag or Last-Modified header are re-fetched conditionally once expired, and reused if
+        they were not modified. Error responses are neither kept nor saved.
+
+    Parameters
+    ----------
+    max_bytes: int, optional, defaults to 64 MB
+        Size budget of the parsed documents kept in memory, approximated by the size of
+            their HTML. 0 disables the memory cache.
+
+    ttl: float, optional, defaults to None
+        Number of seconds a page is used without contacting the server.
+            If None, pages never expire.
+
+    directory: str, optional
+        Directory of the response cache on disk. If None, responses are not saved.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, ttl=None, directory=None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.directory = directory
+        self.size = 0
+        self._documents = OrderedDict()
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _is_fresh(self, fetched_at):
+        return self.ttl is None or time.time() - fetched_at < self.ttl
+
+    def get_document(self, scraper, url, request_args=None, path_filter=None):
+        """
+        Returns the parsed document of the page, fetching and parsing it if needed.
+
+        Parameters:
+        ----------
+        scraper: AutoScraper
+            Scraper fetching and parsing the page.
+
+        url: str
+            URL of the page.
+
+        request_args: dict, optional
+            Request parameters, see AutoScraper.get_result_similar.
+
+        path_filter: PathFilter, optional
+            Filter of a partial parse of the page, see AutoScraper.partial_parse.
+
+        Returns:
+        --------
+        A document parsed by the backend of the scraper
+        """
+
+        key = get_cache_key(url, request_args)
+        # documents of different backends or parsed partially for other rules are different
+        memory_key = (key, scraper.backend.name,
+                      path_filter.signature if path_filter is not None else None)
+        with self._lock:
+            item = self._documents.get(memory_key)
+            if item is not None:
+                document, _, fetched_at = item
+                if self._is_fresh(fetched_at):
+                    self._documents.move_to_end(memory_key)
+                    return document
+                self._discard(memory_key)
+
+        html, fetched_at, ok = self._get_html(scraper, key, url, request_args)
+        document = scraper._parse_html(html, path_filter)
+        # error pages are returned but not kept, so that the next call requests them again
+        if ok:
+            self._add(memory_key, document, len(html), fetched_at)
+        return document
+
+    def _add(self, memory_key, document, size, fetched_at):
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            self._discard(memory_key)
+            self._documents[memory_key] = (document, size, fetched_at)
+            self.size += size
+            while self.size > self.max_bytes:
+                self._discard(next(iter(self._documents)))
+
+    def _discard(self, memory_key):
+        item = self._documents.pop(memory_key, None)
+        if item is not None:
+            self.size -= item[1]
+
+    def _get_paths(self, key):
+        path = os.path.join(self.directory, key)
+        return path + '.json', path + '.html'
+
+    def _read_response(self, key):
+        meta_path, html_path = self._get_paths(key)
+        try:
+            with open(meta_path, 'r') as f:
+                meta = json.load(f)
+            with open(html_path, 'r', encoding='utf-8') as f:
+                html = f.read()
+        except (OSError, ValueError):
+            return None, None
+        return meta, html
+
+    def _write_response(self, key, meta, html=None):
+        meta_path, html_path = self._get_paths(key)
+        if html is not None:
+            with open(html_path + '.tmp', 'w', encoding='utf-8') as f:
+                f.write(html)
+            os.replace(html_path + '.tmp', html_path)
+        with open(meta_path + '.tmp', 'w') as f:
+            json.dump(meta, f)
+        os.replace(meta_path + '.tmp', meta_path)
+
+    def _get_html(self, scraper, key, url, request_args):
+        # returns the html, the time it was fetched and whether it can be cached
+        if not self.directory:
+            response = scraper._run_step('fetch', scraper._fetch_response, url, request_args)
+            return response.text, time.time(), response.ok
+
+        meta, html = self._read_response(key)
+        if meta is not None and self._is_fresh(meta['fetched_at']):
+            return html, meta['fetched_at'], True
+
+        request_args = dict(request_args or {})
+        headers = dict(request_args.get('headers') or {})
+        if meta is not None:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+        request_args['headers'] = headers
+
+        response = scraper._run_step('fetch', scraper._fetch_response, url, request_args)
+        fetched_at = time.time()
+        if response.status_code == 304 and meta is not None:
+            meta['fetched_at'] = fetched_at
+            self._write_response(key, meta)
+            return html, fetched_at, True
+
+        html = response.text
+        if response.ok:
+            meta = dict(url=url, fetched_at=fetched_at, etag=response.headers.get('ETag'),
+                        last_modified=response.headers.get('Last-Modified'))
+            self._write_response(key, meta, html)
+        return html, fetched_at, response.ok
+
+    def clear(self):
+        """Removes all pages from the memory cache. Saved responses are kept."""
+
+        with self._lock:
+            self._documents.clear()
+            self.size = 0
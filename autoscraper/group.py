@@ -0,0 +1,148 @@
+import os
+
+from collections import OrderedDict
+
+from autoscraper.auto_scraper import AutoScraper
+from autoscraper.backends import get_backend
+from autoscraper.rule_trie import RuleTrie
+
+
+def _load_model(model):
+    if isinstance(model, AutoScraper):
+        return model
+    scraper = AutoScraper()
+    scraper.load(model)
+    return scraper
+
+
+class ScraperGroup(object):
+    """
+    Runs the rules of several AutoScraper models over the same pages. Each page is parsed
+        and indexed once, and the rules of all models are evaluated together, so the steps
+        they have in common are evaluated once.
+
+    Parameters
+    ----------
+    models: dict or iterable
+        Dict of AutoScraper objects or paths of saved models by name, or an iterable of
+            paths of saved models, named after their file names without extension.
+
+    backend: str or backend object, optional, defaults to 'bs4'
+        Parser backend of the pages, see AutoScraper.
+
+    Example
+    -------
+    group = ScraperGroup({'prices': prices_scraper, 'reviews': 'reviews.json'})
+    group.get_result_similar(url)
+    # {'prices': [...], 'reviews': [...]}
+    """
+
+    def __init__(self, models, backend='bs4'):
+        if not isinstance(models, dict):
+            models = OrderedDict(
+                (os.path.splitext(os.path.basename(os.fspath(x)))[0], x) for x in models)
+
+        self.models = OrderedDict((name, _load_model(x)) for name, x in models.items())
+        self.backend = get_backend(backend)
+        self._signature = None
+        self._scraper = None
+        self._model_scrapers = None
+
+    def _get_scrapers(self):
+        # rebuilt when the rules of a model change
+        signature = tuple(RuleTrie.get_signature(x.stack_list) for x in self.models.values())
+        if signature != self._signature:
+            # a single backend object, so that the models share the text cache of each page
+            self._model_scrapers = OrderedDict(
+                (name, AutoScraper(model.stack_list, backend=self.backend))
+                for name, model in self.models.items())
+            stack_list = [x for model in self.models.values() for x in model.stack_list]
+            self._scraper = AutoScraper(stack_list, backend=self.backend)
+            self._signature = signature
+        return self._scraper, self._model_scrapers
+
+    def _get_result_by_func(self, func_name, url, html, soup, request_args, grouped,
+                            group_by_alias, unique, attr_fuzz_ratio, **kwargs):
+        scraper, model_scrapers = self._get_scrapers()
+        if not soup:
+            soup = scraper._get_soup(url=url, html=html, request_args=request_args)
+
+        keep_order = kwargs.get('keep_order', False)
+
+        elements = child_indexes = None
+        if group_by_alias or (keep_order and not grouped):
+            elements, child_indexes = scraper._get_child_indexes(soup)
+
+        # the rules of all models are evaluated at once, then split back by model
+        elements_list = getattr(scraper, func_name)(soup, url, attr_fuzz_ratio, **kwargs)
+
+        results = OrderedDict()
+        start = 0
+        for name, model_scraper in model_scrapers.items():
+            end = start + len(model_scraper.stack_list)
+            results[name] = model_scraper._collect_results(
+                elements_list[start:end], soup, url, child_indexes, grouped, group_by_alias,
+                unique, keep_order)
+            start = end
+        return results
+
+    def get_result_similar(self, url=None, html=None, soup=None, request_args=None,
+                           grouped=False, group_by_alias=False, unique=None, attr_fuzz_ratio=1.0,
+                           keep_order=False, contain_sibling_leaves=False):
+        """
+        Gets the similar results of every model.
+
+        Parameters:
+        ----------
+        Same as AutoScraper.get_result_similar.
+
+        Returns:
+        --------
+        Dict with the model names as keys and their similar results as values.
+        """
+
+        func = '_get_result_with_stack_list'
+        return self._get_result_by_func(func, url, html, soup, request_args, grouped,
+                                        group_by_alias, unique, attr_fuzz_ratio,
+                                        keep_order=keep_order,
+                                        contain_sibling_leaves=contain_sibling_leaves)
+
+    def get_result_exact(self, url=None, html=None, soup=None, request_args=None,
+                         grouped=False, group_by_alias=False, unique=None, attr_fuzz_ratio=1.0):
+        """
+        Gets the exact results of every model.
+
+        Parameters:
+        ----------
+        Same as AutoScraper.get_result_exact.
+
+        Returns:
+        --------
+        Dict with the model names as keys and their exact results as values.
+        """
+
+        func = '_get_result_with_stack_list_index_based'
+        return self._get_result_by_func(func, url, html, soup, request_args, grouped,
+                                        group_by_alias, unique, attr_fuzz_ratio)
+
+    def get_result(self, url=None, html=None, request_args=None, grouped=False,
+                   group_by_alias=False, unique=None, attr_fuzz_ratio=1.0):
+        """
+        Gets the similar and exact results of every model, parsing the page once.
+
+        Parameters:
+        ----------
+        Same as AutoScraper.get_result.
+
+        Returns:
+        --------
+        Dict with the model names as keys and pairs of (similar, exact) results as values.
+        """
+
+        scraper, _ = self._get_scrapers()
+        soup = scraper._get_soup(url=url, html=html, request_args=request_args)
+        args = dict(url=url, soup=soup, grouped=grouped, group_by_alias=group_by_alias,
+                    unique=unique, attr_fuzz_ratio=attr_fuzz_ratio)
+        similar = self.get_result_similar(**args)
+        exact = self.get_result_exact(**args)
+        return OrderedDict((name, (similar[name], exact[name])) for name in self.models)
@@ -0,0 +1,329 @@
+"""
+Binary format of saved models.
+
+A file holds one or more named models. Strings and content steps are stored once in tables
+shared by all the models of the file, and each model is a block decoded on its first use:
+
+    header    magic, version, number of models and offsets of the tables
+    strings   number of strings, their end offsets and their UTF-8 bytes
+    steps     number of steps, their end offsets and the encoded (tag, attrs[, index]) tuples
+    index     name, offset, size and number of rules of each model
+    models    the encoded stack_list of each model, steps being references to the step table
+
+Values are encoded as a type byte followed by their data, see _Writer.
+"""
+import mmap
+import os
+import struct
+import threading
+
+from autoscraper.rule import Rule, intern_step, _encode_hash, _step_key
+
+MAGIC = b'ASBM'
+VERSION = 1
+
+# magic, version, flags, number of models, offsets of the strings, steps and index tables
+HEADER = struct.Struct('<4sHHIQQQ')
+INDEX_ENTRY = struct.Struct('<IQQI')
+UINT = struct.Struct('<I')
+INT = struct.Struct('<q')
+FLOAT = struct.Struct('<d')
+
+NONE, FALSE, TRUE, INT_VALUE, FLOAT_VALUE, STR, LIST, DICT, TUPLE, STEP, DIGEST = range(11)
+
+# files from this size on are memory-mapped rather than read
+MMAP_MIN_SIZE = 1 << 20
+
+
+def is_model_file(file_path):
+    """Returns True if the file is a model in the binary format."""
+
+    with open(file_path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+class _Writer(object):
+    def __init__(self):
+        self.strings = {}
+        self.steps = {}
+        self.step_data = []
+
+    def string(self, value):
+        index = self.strings.get(value)
+        if index is None:
+            index = self.strings[value] = len(self.strings)
+        return index
+
+    def step(self, step):
+        key = _step_key(step)
+        index = self.steps.get(key)
+        if index is None:
+            data = bytearray()
+            self.value(tuple(step), data)
+            index = self.steps[key] = len(self.step_data)
+            self.step_data.append(bytes(data))
+        return index
+
+    def value(self, value, out):
+        if value is None:
+            out.append(NONE)
+        elif value is True or value is False:
+            out.append(TRUE if value else FALSE)
+        elif isinstance(value, int):
+            out.append(INT_VALUE)
+            out += INT.pack(value)
+        elif isinstance(value, float):
+            out.append(FLOAT_VALUE)
+            out += FLOAT.pack(value)
+        elif isinstance(value, str):
+            out.append(STR)
+            out += UINT.pack(self.string(value))
+        elif isinstance(value, (list, tuple)):
+            out.append(LIST if isinstance(value, list) else TUPLE)
+            out += UINT.pack(len(value))
+            for item in value:
+                self.value(item, out)
+        elif isinstance(value, dict):
+            out.append(DICT)
+            out += UINT.pack(len(value))
+            for key, item in value.items():
+                self.value(key, out)
+                self.value(item, out)
+        else:
+            raise TypeError('Can not save a value of type %s' % type(value).__name__)
+
+    def rule(self, rule, out):
+        out.append(DICT)
+        out += UINT.pack(len(rule))
+        for key, value in rule.items():
+            self.value(key, out)
+            if key == 'content':
+                out.append(LIST)
+                out += UINT.pack(len(value))
+                for step in value:
+                    out.append(STEP)
+                    out += UINT.pack(self.step(step))
+            elif key == 'hash' and isinstance(_encode_hash(value), bytes):
+                out.append(DIGEST)
+                out += _encode_hash(value)
+            else:
+                self.value(value, out)
+
+    @staticmethod
+    def _table(items):
+        ends = []
+        end = 0
+        for item in items:
+            end += len(item)
+            ends.append(end)
+        return UINT.pack(len(items)) + struct.pack('<%dI' % len(ends), *ends) + b''.join(items)
+
+    def write(self, file_path, models):
+        blocks = []
+        for name, stack_list in models.items():
+            data = bytearray()
+            data.append(LIST)
+            data += UINT.pack(len(stack_list))
+            for rule in stack_list:
+                self.rule(rule, data)
+            blocks.append((self.string(name), len(stack_list), bytes(data)))
+
+        strings = [x.encode('utf-8') for x in self.strings]
+        tables = [self._table(strings), self._table(self.step_data)]
+        offset = HEADER.size
+        offsets = []
+        for table in tables:
+            offsets.append(offset)
+            offset += len(table)
+        index_offset = offset
+        offset += len(blocks) * INDEX_ENTRY.size
+
+        index = bytearray()
+        for name, rule_count, data in blocks:
+            index += INDEX_ENTRY.pack(name, offset, len(data), rule_count)
+            offset += len(data)
+
+        header = HEADER.pack(MAGIC, VERSION, 0, len(blocks), offsets[0], offsets[1], index_offset)
+        tmp_path = '%s.tmp' % file_path
+        with open(tmp_path, 'wb') as f:
+            f.write(header)
+            for table in tables:
+                f.write(table)
+            f.write(index)
+            for _, _, data in blocks:
+                f.write(data)
+        os.replace(tmp_path, file_path)
+
+
+def save_models(file_path, models):
+    """
+    Saves the stack_lists of several models to a single file in the binary format.
+
+    Parameters:
+    ----------
+    file_path: str
+        Path of the output.
+
+    models: dict
+        Dict of AutoScraper objects or stack_lists by model name.
+
+    Returns:
+    --------
+    None
+    """
+
+    models = {name: getattr(x, 'stack_list', x) for name, x in models.items()}
+    _Writer().write(file_path, models)
+
+
+class ModelFile(object):
+    """
+    Models of a file in the binary format. Only the header and the index are read when it's
+        opened, the strings, steps and rules are decoded when a model is first used.
+
+    Parameters
+    ----------
+    file_path: str
+        Path of the file.
+    """
+
+    def __init__(self, file_path):
+        with open(file_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size >= MMAP_MIN_SIZE:
+                self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                self._data = f.read()
+
+        magic, version, _, count, strings_offset, steps_offset, index_offset = \
+            HEADER.unpack_from(self._data, 0)
+        if magic != MAGIC:
+            raise ValueError('%s is not a model in the binary format' % file_path)
+        if version > VERSION:
+            raise ValueError('%s was saved with a newer version of the format (%d)'
+                             % (file_path, version))
+
+        self._strings_offset = strings_offset
+        self._steps_offset = steps_offset
+        self._strings = None
+        self._steps = None
+        self._lock = threading.Lock()
+        # name: (offset, size, number of rules) of each model
+        self.index = {}
+        for i in range(count):
+            name, offset, size, rule_count = INDEX_ENTRY.unpack_from(
+                self._data, index_offset + i * INDEX_ENTRY.size)
+            # names are the only strings read before a model is used
+            self.index[self._read_string(name)] = (offset, size, rule_count)
+        self.names = list(self.index)
+
+    def _read_table(self, offset):
+        count, = UINT.unpack_from(self._data, offset)
+        ends = struct.unpack_from('<%dI' % count, self._data, offset + UINT.size)
+        return offset + UINT.size * (count + 1), ends
+
+    def _read_string(self, index):
+        count, = UINT.unpack_from(self._data, self._strings_offset)
+        ends_offset = self._strings_offset + UINT.size
+        start = ends_offset + UINT.size * count
+        begin = 0
+        if index:
+            begin, = UINT.unpack_from(self._data, ends_offset + UINT.size * (index - 1))
+        end, = UINT.unpack_from(self._data, ends_offset + UINT.size * index)
+        return bytes(self._data[start + begin:start + end]).decode('utf-8')
+
+    def _load_tables(self):
+        with self._lock:
+            if self._strings is not None:
+                return
+
+            start, ends = self._read_table(self._strings_offset)
+            data = bytes(self._data[start:start + (ends[-1] if ends else 0)])
+            begins = (0,) + ends[:-1]
+            self._strings = [data[b:e].decode('utf-8') for b, e in zip(begins, ends)]
+
+            start, ends = self._read_table(self._steps_offset)
+            begins = (0,) + ends[:-1]
+            steps = []
+            for begin, end in zip(begins, ends):
+                step, _ = self._decode(start + begin)
+                steps.append(intern_step(step))
+            self._steps = steps
+
+    def _decode(self, pos):
+        data = self._data
+        kind = data[pos]
+        pos += 1
+        if kind == STR:
+            return self._strings[UINT.unpack_from(data, pos)[0]], pos + UINT.size
+        if kind == NONE:
+            return None, pos
+        if kind == TRUE or kind == FALSE:
+            return kind == TRUE, pos
+        if kind == INT_VALUE:
+            return INT.unpack_from(data, pos)[0], pos + INT.size
+        if kind == FLOAT_VALUE:
+            return FLOAT.unpack_from(data, pos)[0], pos + FLOAT.size
+        if kind == STEP:
+            return self._steps[UINT.unpack_from(data, pos)[0]], pos + UINT.size
+        if kind == DIGEST:
+            return bytes(data[pos:pos + 32]).hex(), pos + 32
+
+        count, = UINT.unpack_from(data, pos)
+        pos += UINT.size
+        if kind == DICT:
+            value = {}
+            for _ in range(count):
+                key, pos = self._decode(pos)
+                value[key], pos = self._decode(pos)
+            return value, pos
+
+        items = []
+        for _ in range(count):
+            item, pos = self._decode(pos)
+            items.append(item)
+        if kind == TUPLE:
+            return tuple(items), pos
+        if kind == LIST:
+            return items, pos
+        raise ValueError('Invalid value of type %d in the model file' % kind)
+
+    def get_name(self, name=None):
+        """Returns the name of the model, the only model of the file if name is None."""
+
+        if name is None:
+            if len(self.names) != 1:
+                raise ValueError('The file has %d models, a name must be given' % len(self.names))
+            return self.names[0]
+        if name not in self.index:
+            raise KeyError('No model named %r in the file' % name)
+        return name
+
+    def get_stack_list(self, name=None):
+        """
+        Decodes and returns the stack_list of a model.
+
+        Parameters:
+        ----------
+        name: str, optional
+            Name of the model. Can be omitted if the file has a single model.
+
+        Returns:
+        --------
+        List of Rule objects
+        """
+
+        self._load_tables()
+        offset, _, _ = self.index[self.get_name(name)]
+        stack_list, _ = self._decode(offset)
+
+        rules = []
+        for data in stack_list:
+            rule = Rule()
+            for key, value in data.items():
+                if key == 'content':
+                    # the steps are interned already
+                    dict.__setitem__(rule, key, value)
+                else:
+                    rule[key] = value
+            rules.append(rule)
+        return rules
@@ -0,0 +1,88 @@
+import time
+
+from collections import OrderedDict
+
+from autoscraper.batch import load_page
+
+
+def _get_output(stack):
+    # rules with the same output give the same values for the same elements
+    is_full_url = stack['is_full_url']
+    return (stack.get('alias', ''), stack['wanted_attr'], is_full_url,
+            stack.get('is_non_rec_text'), stack.get('url', '') if is_full_url else '')
+
+
+def _get_matches(scraper, soup, url, attr_fuzz_ratio):
+    # positions of the elements selected by each rule as similar and as exact results
+    elements, positions = scraper._get_child_indexes(soup)
+    similar = scraper._get_result_with_stack_list(soup, url, attr_fuzz_ratio)
+    exact = scraper._get_result_with_stack_list_index_based(soup, url, attr_fuzz_ratio)
+    return [(frozenset(positions[id(x)] for x in s), frozenset(positions[id(x)] for x in e))
+            for s, e in zip(similar, exact)]
+
+
+def _time_rules(scraper, documents, attr_fuzz_ratio, repeat):
+    def run():
+        start = time.perf_counter()
+        for url, soup in documents:
+            scraper.get_result_similar(url=url, soup=soup, attr_fuzz_ratio=attr_fuzz_ratio)
+            scraper.get_result_exact(url=url, soup=soup, attr_fuzz_ratio=attr_fuzz_ratio)
+        return time.perf_counter() - start
+
+    # the first run computes the texts of the documents, it isn't counted
+    run()
+    return min(run() for _ in range(max(repeat, 1)))
+
+
+def optimize_rules(scraper, pages, request_args=None, attr_fuzz_ratio=1.0,
+                   remove_unmatched=True, repeat=3):
+    documents = []
+    for page in pages:
+        url, html = load_page(page)
+        soup = scraper._get_soup(url=url, html=html, request_args=request_args)
+        documents.append((url, soup))
+
+    stack_list = scraper.stack_list
+    matches = [_get_matches(scraper, soup, url, attr_fuzz_ratio) for url, soup in documents]
+    time_before = _time_rules(scraper, documents, attr_fuzz_ratio, repeat)
+
+    def covered(i, kept):
+        # the elements of the rule are selected by the kept rules with the same output
+        for page_matches in matches:
+            similar, exact = page_matches[i]
+            if not similar <= frozenset().union(*(page_matches[j][0] for j in kept)):
+                return False
+            if not exact <= frozenset().union(*(page_matches[j][1] for j in kept)):
+                return False
+        return True
+
+    removed = OrderedDict()
+    kept = {}
+    # the most general rules are looked at first, so that the rules they subsume are removed
+    order = sorted(range(len(stack_list)), key=lambda i: -sum(len(m[i][0]) for m in matches))
+    for i in order:
+        stack = stack_list[i]
+        same_output = kept.setdefault(_get_output(stack), [])
+        if not any(m[i][0] or m[i][1] for m in matches):
+            # unmatched rules are kept as they are if asked, the others cover them trivially
+            if remove_unmatched:
+                removed[stack['stack_id']] = 'unmatched'
+            else:
+                same_output.append(i)
+            continue
+
+        duplicate = next((j for j in same_output if all(m[i] == m[j] for m in matches)), None)
+        if duplicate is not None:
+            removed[stack['stack_id']] = 'duplicate of %s' % stack_list[duplicate]['stack_id']
+        elif same_output and covered(i, same_output):
+            removed[stack['stack_id']] = 'subsumed'
+        else:
+            same_output.append(i)
+
+    kept_positions = sorted(j for positions in kept.values() for j in positions)
+    scraper.stack_list = [stack_list[j] for j in kept_positions]
+    time_after = _time_rules(scraper, documents, attr_fuzz_ratio, repeat)
+
+    return dict(rules_before=len(stack_list), rules_after=len(kept_positions), removed=removed,
+                time_before=time_before, time_after=time_after,
+                speedup=time_before / time_after if time_after else None)
@@ -0,0 +1,75 @@
+from autoscraper.backends import LxmlBackend, _matches
+
+
+class _FilterNode(object):
+    __slots__ = ('children', 'is_leaf')
+
+    def __init__(self):
+        # tag: [(attrs, node)]
+        self.children = {}
+        self.is_leaf = False
+
+
+class PathFilter(object):
+    """
+    Decides while a page is parsed which of its elements the rules of a RuleTrie can reach:
+        the elements matching a prefix of the content steps of a rule, and the whole subtrees
+        of the elements matching all of them. The other elements, and their subtrees, are not
+        needed to get the results, and are not built.
+
+    The state of an element is None if it isn't needed, True if its whole subtree is, and
+        otherwise the list of the filter nodes it matches, which its children are matched
+        against.
+
+    Parameters
+    ----------
+    trie: RuleTrie
+        Compiled stack_list.
+
+    get_attrs: function, optional
+        get_attrs(attrs) returns the attributes to match, e.g. fuzzy attributes.
+    """
+
+    def __init__(self, trie, get_attrs=None):
+        # documents parsed with equal signatures have the same elements
+        self.signature = (trie.signature, get_attrs)
+        self.root = [self._build(trie.similar_root, get_attrs)]
+
+    def _build(self, trie_node, get_attrs):
+        node = _FilterNode()
+        node.is_leaf = bool(trie_node.rules)
+        for child in trie_node.children.values():
+            attrs = get_attrs(child.attrs) if get_attrs is not None else child.attrs
+            node.children.setdefault(child.tag, []).append(
+                (attrs, self._build(child, get_attrs)))
+        return node
+
+    @staticmethod
+    def _matches(tag, raw_attrs, attrs):
+        for key, match_against in attrs.items():
+            value = LxmlBackend.split_attr(tag, key, raw_attrs.get(key))
+            if not _matches(value, match_against):
+                return False
+        return True
+
+    def get_state(self, state, tag, raw_attrs):
+        """
+        Returns the state of an element from the state of its parent, its tag and its
+            attributes as parsed, with multi-valued attributes as strings.
+        """
+
+        if state is True:
+            return True
+
+        nodes = []
+        for node in state:
+            for attrs, child in node.children.get(tag, ()):
+                if self._matches(tag, raw_attrs, attrs):
+                    if child.is_leaf:
+                        return True
+                    nodes.append(child)
+        return nodes or None
+
+    def get_root_state(self, tag, raw_attrs):
+        # the root element is always kept, exact results are looked up from it
+        return self.get_state(self.root, tag, raw_attrs) or []
@@ -0,0 +1,327 @@
+"""
+Cache of the results of the get_result* methods by fingerprint of the page and of the rules,
+so that unchanged pages scraped again, e.g. by monitoring jobs, are not scraped twice.
+"""
+import hashlib
+import json
+import os
+import threading
+
+from collections import OrderedDict
+
+from autoscraper.text_cache import get_text_cache
+
+FINGERPRINTS = ('page', 'subtrees')
+
+
+def _encode(value, sort_keys=True):
+    return json.dumps(value, ensure_ascii=False, sort_keys=sort_keys, default=repr).encode(
+        'utf-8', 'surrogatepass')
+
+
+class MemoryResultStore(object):
+    """
+    Results kept in memory, the least recently used ones being dropped beyond max_bytes.
+
+    Parameters
+    ----------
+    max_bytes: int, optional, defaults to 16 MB
+        Size budget of the stored results, as serialized.
+    """
+
+    def __init__(self, max_bytes=16 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+
+        with self._lock:
+            self._discard(key)
+            self._items[key] = value
+            self.size += len(value)
+            while self.size > self.max_bytes:
+                self._discard(next(iter(self._items)))
+
+    def _discard(self, key):
+        value = self._items.pop(key, None)
+        if value is not None:
+            self.size -= len(value)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.size = 0
+
+
+class DiskResultStore(object):
+    """
+    Results saved to a directory, one file per entry. Beyond max_bytes, the least recently
+        used files are removed.
+
+    Parameters
+    ----------
+    directory: str
+        Directory of the results.
+
+    max_bytes: int, optional, defaults to 256 MB
+        Size budget of the directory.
+    """
+
+    suffix = '.result'
+
+    def __init__(self, directory, max_bytes=256 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.size = sum(size for _, _, size in self._list_files())
+
+    def _get_path(self, key):
+        return os.path.join(self.directory, key + self.suffix)
+
+    def _list_files(self):
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(self.suffix):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, entry.path, stat.st_size))
+        return files
+
+    def get(self, key):
+        path = self._get_path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = f.read()
+            # the modification time orders the files by last use
+            os.utime(path)
+        except OSError:
+            return None
+        return value
+
+    def set(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+
+        path = self._get_path(key)
+        with self._lock:
+            try:
+                self.size -= os.path.getsize(path)
+            except OSError:
+                pass
+            with open(path + '.tmp', 'wb') as f:
+                f.write(value)
+            os.replace(path + '.tmp', path)
+            self.size += len(value)
+            if self.size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        files = sorted(self._list_files())
+        self.size = sum(size for _, _, size in files)
+        for _, path, size in files:
+            if self.size <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self.size -= size
+
+    def clear(self):
+        with self._lock:
+            for _, path, _ in self._list_files():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self.size = 0
+
+
+def get_rules_fingerprint(stack_list):
+    """
+    Returns a digest of the rules, from their hash and the keys changing their results.
+        Rules without hash, e.g. written by hand, are fingerprinted by their content.
+    """
+
+    digest = hashlib.sha1()
+    for stack in stack_list:
+        rule_hash = stack.get('hash')
+        if isinstance(rule_hash, bytes):
+            rule_hash = rule_hash.hex()
+        if not rule_hash:
+            rule_hash = stack['content']
+        digest.update(_encode([
+            rule_hash, stack.get('stack_id'), stack.get('alias', ''), stack['wanted_attr'],
+            stack['is_full_url'], stack.get('is_non_rec_text', False), stack.get('url', '')]))
+    return digest.hexdigest()
+
+
+def get_page_fingerprint(html):
+    """Returns a digest of a page given as a string or bytes, or None for other inputs."""
+
+    if isinstance(html, str):
+        html = html.encode('utf-8', 'surrogatepass')
+    try:
+        data = memoryview(html)
+    except TypeError:
+        return None
+    return hashlib.sha1(data).hexdigest()
+
+
+def _get_raw_attrs(backend, element):
+    # attributes as parsed, as the path filters match them
+    return {key: ' '.join(value) if isinstance(value, list) else value
+            for key, value in backend.get_attrs(element).items()}
+
+
+def get_subtrees_fingerprint(backend, document, path_filter):
+    """
+    Returns a digest of the elements of a document the rules of path_filter can reach: the
+        tags and attributes of the elements along their steps, and also the texts of the
+        elements they select. Changes elsewhere in the page leave it unchanged.
+    """
+
+    # texts are taken from the text cache of the document, so that results scraped after a
+    # cache miss don't compute them again
+    texts = get_text_cache(backend, document)
+    digest = hashlib.sha1()
+    # elements are visited depth first, their depth giving the shape of the tree
+    stack = [(iter(backend.get_children(document)), path_filter.root, 0)]
+    while stack:
+        children, state, depth = stack[-1]
+        child = next(children, None)
+        if child is None:
+            stack.pop()
+            continue
+
+        tag = backend.get_name(child)
+        attrs = _get_raw_attrs(backend, child)
+        child_state = path_filter.get_state(state, tag, attrs)
+        if child_state is None:
+            continue
+
+        item = [depth, tag, sorted(attrs.items())]
+        if child_state is True:
+            item += [texts.get_text(child), texts.get_non_rec_text(child)]
+        else:
+            stack.append((iter(backend.get_children(child)), child_state, depth + 1))
+        digest.update(repr(item).encode('utf-8', 'surrogatepass') + b'\n')
+    return digest.hexdigest()
+
+
+class ResultCache(object):
+    """
+    Cache of the results of the get_result* methods of AutoScraper, keyed on a fingerprint
+        of the page and a fingerprint of the rules built from their hash. Cached results are
+        returned without scraping the page again, they are used until the page or the rules
+        change.
+
+    Parameters
+    ----------
+    store: MemoryResultStore, DiskResultStore or object, optional
+        Storage of the results, an object with get(key) and set(key, value) methods for
+            bytes values. Defaults to a MemoryResultStore.
+
+    fingerprint: str, optional, defaults to 'page'
+        'page' fingerprints the whole HTML, a cache hit then skips parsing. Only pages given
+            as strings, bytes or buffers, or fetched from their url, are cached. Pages are
+            then downloaded without the PageCache of the scraper, which keeps parsed pages.
+        'subtrees' parses the page and fingerprints the elements the rules can reach only,
+            so that pages changing elsewhere still hit the cache. A hit skips the evaluation
+            of the rules and the cleaning of the results.
+    """
+
+    def __init__(self, store=None, fingerprint='page'):
+        if fingerprint not in FINGERPRINTS:
+            raise ValueError('fingerprint must be one of %s' % ', '.join(FINGERPRINTS))
+        self.store = store if store is not None else MemoryResultStore()
+        self.fingerprint = fingerprint
+        self.hits = 0
+        self.misses = 0
+
+    def _get_key(self, scraper, name, url, page_fingerprint, options):
+        data = [name, scraper.backend.name, url or '', sorted(options.items()),
+                get_rules_fingerprint(scraper.stack_list), page_fingerprint]
+        return hashlib.sha1(_encode(data)).hexdigest()
+
+    def get_result(self, scraper, name, url, html, request_args, options, get_result):
+        """
+        Returns the cached result of a scraping method, or scrapes the page and caches it.
+
+        Parameters:
+        ----------
+        scraper: AutoScraper
+            Scraper of the page.
+
+        name: str
+            Name of the scraping method.
+
+        url: str
+            URL of the page, which may be None if html is given.
+
+        html: str, bytes or other html input of AutoScraper, optional
+            Page to scrape. Fetched from url if not given.
+
+        request_args: dict, optional
+            Request parameters, see AutoScraper.get_result_similar.
+
+        options: dict
+            Arguments of the method changing the result, including attr_fuzz_ratio.
+
+        get_result: function
+            get_result(soup) scrapes the parsed page.
+
+        Returns:
+        --------
+        The result of get_result
+        """
+
+        path_filter = scraper._get_path_filter(options['attr_fuzz_ratio'])
+        soup = None
+        if self.fingerprint == 'page':
+            if not html:
+                html = scraper._run_step('fetch', scraper._fetch_html, url, request_args)
+            page_fingerprint = scraper._run_step('fingerprint', get_page_fingerprint, html)
+            if page_fingerprint is None:
+                return get_result(scraper._parse_html(html, path_filter))
+        else:
+            soup = scraper._get_soup(url=url, html=html, request_args=request_args,
+                                     path_filter=path_filter)
+            rules_filter = scraper._build_path_filter(options['attr_fuzz_ratio'])
+            page_fingerprint = scraper._run_step(
+                'fingerprint', get_subtrees_fingerprint, scraper.backend, soup, rules_filter)
+
+        key = self._get_key(scraper, name, url, page_fingerprint, options)
+        value = self.store.get(key)
+        if value is not None:
+            self.hits += 1
+            data = json.loads(value.decode('utf-8', 'surrogatepass'))
+            return tuple(data['result']) if data['pair'] else data['result']
+
+        self.misses += 1
+        if soup is None:
+            soup = scraper._parse_html(html, path_filter)
+        result = get_result(soup)
+        # the order of grouped results is kept as is
+        self.store.set(key, _encode(dict(result=result, pair=isinstance(result, tuple)),
+                                    sort_keys=False))
+        return result
+
+    def clear(self):
+        """Removes all results from the store."""
+
+        self.store.clear()
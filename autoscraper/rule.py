@@ -0,0 +1,113 @@
+import sys
+import weakref
+
+# keys of the rules learned by build, in the order they are saved
+RULE_KEYS = ('content', 'wanted_attr', 'is_full_url', 'is_non_rec_text', 'url', 'hash',
+             'stack_id', 'alias', 'sample')
+
+# attrs of the content steps of the rules alive by value, so that equal steps of any rules
+# share a single dict. an attrs dict is dropped with the last step using it
+_step_attrs = weakref.WeakValueDictionary()
+
+
+class _StepAttrs(dict):
+    # dicts can't be weakly referenced, instances of their subclasses can
+    __slots__ = ('__weakref__',)
+
+    def __reduce__(self):
+        return dict, (dict(self),)
+
+
+def _intern(value):
+    if isinstance(value, str):
+        return sys.intern(value)
+    if isinstance(value, list):
+        return [_intern(x) for x in value]
+    return value
+
+
+def _attrs_key(attrs):
+    # keeps the order of the attributes, so that rules are saved as they were loaded
+    return tuple((k, tuple(v) if isinstance(v, list) else v) for k, v in attrs.items())
+
+
+def _step_key(step):
+    return (step[0], _attrs_key(step[1])) + tuple(step[2:])
+
+
+def intern_step(step):
+    """
+    Returns a (tag, attrs[, index]) tuple equal to a step of a rule content, with its strings
+        interned and its attrs shared with all equal steps. Shared attrs must not be modified.
+    """
+
+    key = _attrs_key(step[1])
+    attrs = _step_attrs.get(key)
+    if attrs is None:
+        attrs = _StepAttrs((sys.intern(k), _intern(v)) for k, v in step[1].items())
+        _step_attrs[key] = attrs
+    return (sys.intern(step[0]), attrs) + tuple(step[2:])
+
+
+def _encode_hash(value):
+    # sha256 hex digests are saved as bytes, other values as they are
+    if isinstance(value, str) and len(value) == 64:
+        try:
+            encoded = bytes.fromhex(value)
+        except ValueError:
+            return value
+        if encoded.hex() == value:
+            return encoded
+    return value
+
+
+class Rule(dict):
+    """
+    Compact rule of a stack_list, a dict with the keys of the rule.
+
+    The attrs of the steps of its content are shared with all other rules having equal
+        steps, and its keys and string values are interned.
+
+    Parameters
+    ----------
+    data: dict, optional
+        Keys and values of the rule, e.g. a rule loaded from JSON.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, data=(), **kwargs):
+        super().__init__()
+        self.update(data, **kwargs)
+
+    def __setitem__(self, key, value):
+        if key == 'content':
+            value = [intern_step(x) for x in value]
+        elif key in RULE_KEYS:
+            value = _intern(value)
+        super().__setitem__(_intern(key), value)
+
+    def update(self, data=(), **kwargs):
+        for key, value in dict(data, **kwargs).items():
+            self[key] = value
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def copy(self):
+        return Rule(self)
+
+    def __reduce__(self):
+        # steps are interned again when unpickled, e.g. in the workers of a batch
+        return Rule, (dict(self),)
+
+    def __repr__(self):
+        return 'Rule(%s)' % super().__repr__()
+
+
+def to_rules(stack_list):
+    """Returns the stack_list with its rules converted to Rule objects."""
+
+    return [x if isinstance(x, Rule) else Rule(x) for x in stack_list]
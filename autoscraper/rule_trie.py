@@ -0,0 +1,121 @@
+def _freeze(value):
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+class _Node(object):
+    __slots__ = ('tag', 'attrs', 'index', 'children', 'rules')
+
+    def __init__(self, tag=None, attrs=None, index=0):
+        self.tag = tag
+        self.attrs = attrs
+        self.index = index
+        self.children = {}
+        self.rules = []
+
+    def child(self, key, tag, attrs, index=0):
+        node = self.children.get(key)
+        if node is None:
+            node = self.children[key] = _Node(tag, attrs, index)
+        return node
+
+
+class RuleTrie(object):
+    """
+    Compiled form of a stack_list. Rules sharing a prefix of their content steps share
+    the trie nodes of that prefix, so every distinct step is evaluated once per document.
+
+    Two tries are kept: one for similar results, keyed on (tag, attrs) of each step, and one
+    for exact results, keyed on (tag, attrs) of each step plus the sibling index of its parent.
+    """
+
+    def __init__(self, stack_list):
+        self.signature = self.get_signature(stack_list)
+        self.size = len(stack_list)
+        self._similar_root = _Node()
+        self._exact_root = _Node()
+
+        for position, stack in enumerate(stack_list):
+            self._add_similar(position, stack['content'])
+            self._add_exact(position, stack['content'])
+
+    @property
+    def similar_root(self):
+        return self._similar_root
+
+    @staticmethod
+    def get_signature(stack_list):
+        return tuple(stack.get('hash') or id(stack['content']) for stack in stack_list)
+
+    def _add_similar(self, position, content):
+        node = self._similar_root
+        for item in content:
+            node = node.child((item[0], _freeze(item[1])), item[0], item[1])
+
+        # the last step keeps the sibling index of the leaf's parent
+        index = content[-2][2] if len(content) > 1 else 0
+        node.rules.append((position, index))
+
+    def _add_exact(self, position, content):
+        node = self._exact_root
+        for item, next_item in zip(content, content[1:]):
+            key = (next_item[0], _freeze(next_item[1]), item[2])
+            node = node.child(key, next_item[0], next_item[1], item[2])
+        node.rules.append((position, 0))
+
+    def evaluate_similar(self, soup, find_all, contain_sibling_leaves=False):
+        """
+        Walks the trie top-down once and returns the list of matched elements for every rule,
+        in the order of the compiled stack_list.
+        find_all(parent, tag, attrs) must return the direct children of parent matching the step.
+        """
+
+        results = [[] for _ in range(self.size)]
+        pending = [(self._similar_root, [soup])]
+        while pending:
+            node, parents = pending.pop()
+            for child in node.children.values():
+                groups = []
+                for parent in parents:
+                    found = find_all(parent, child.tag, child.attrs)
+                    if found:
+                        groups.append(found)
+
+                if not groups:
+                    continue
+
+                for position, index in child.rules:
+                    if contain_sibling_leaves:
+                        results[position] = [x for found in groups for x in found]
+                    else:
+                        results[position] = [found[min(len(found) - 1, index)]
+                                             for found in groups]
+
+                if child.children:
+                    pending.append((child, [x for found in groups for x in found]))
+
+        return results
+
+    def evaluate_exact(self, root, find_all):
+        """
+        Walks the index-pinned trie top-down once starting from the document root element and
+        returns the matched element (or None) for every rule.
+        """
+
+        results = [None] * self.size
+        pending = [(self._exact_root, root)]
+        while pending:
+            node, element = pending.pop()
+            for position, _ in node.rules:
+                results[position] = element
+
+            for child in node.children.values():
+                found = find_all(element, child.tag, child.attrs)
+                if not found:
+                    continue
+                pending.append((child, found[min(len(found) - 1, child.index)]))
+
+        return results
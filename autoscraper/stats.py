@@ -0,0 +1,136 @@
+import threading
+
+from collections import defaultdict
+
+
+class PhaseStats(object):
+    """Number of calls and time spent in a phase, in seconds."""
+
+    __slots__ = ('calls', 'time', 'max_time')
+
+    def __init__(self):
+        self.calls = 0
+        self.time = 0.0
+        self.max_time = 0.0
+
+    def add(self, seconds):
+        self.calls += 1
+        self.time += seconds
+        self.max_time = max(self.max_time, seconds)
+
+    def to_dict(self):
+        return dict(calls=self.calls, time=self.time, max_time=self.max_time)
+
+    def __repr__(self):
+        return 'PhaseStats(calls=%d, time=%.6f)' % (self.calls, self.time)
+
+
+class RuleStats(PhaseStats):
+    """
+    Evaluations of a rule: time spent finding its elements and getting their values,
+        number of results and number of evaluations without any result.
+    """
+
+    __slots__ = ('elements', 'matches', 'empty_calls')
+
+    def __init__(self):
+        super().__init__()
+        self.elements = 0
+        self.matches = 0
+        self.empty_calls = 0
+
+    def add(self, seconds, elements=0, matches=0):
+        super().add(seconds)
+        self.elements += elements
+        self.matches += matches
+        self.empty_calls += not matches
+
+    def to_dict(self):
+        data = super().to_dict()
+        data.update(elements=self.elements, matches=self.matches, empty_calls=self.empty_calls)
+        return data
+
+    def __repr__(self):
+        return 'RuleStats(calls=%d, time=%.6f, matches=%d)' % (self.calls, self.time, self.matches)
+
+
+class ScrapeStats(object):
+    """
+    Hook of AutoScraper aggregating the instrumentation events of its calls.
+        It can be shared by several scrapers and threads.
+
+    Attributes
+    ----------
+    phases: dict
+        PhaseStats by phase name: 'fetch', 'normalize', 'parse', 'index', 'rules', 'clean'
+            and 'fingerprint'.
+
+    rules: dict
+        RuleStats by stack_id.
+
+    counts: dict
+        Totals of the counters of the events, e.g. 'find_all_calls' and 'nodes_visited'.
+
+    Example
+    -------
+    stats = ScrapeStats()
+    scraper.add_hook(stats)
+    ...
+    scraper.remove_rules(stats.dead_rules())
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.phases = defaultdict(PhaseStats)
+        self.rules = defaultdict(RuleStats)
+        self.counts = defaultdict(int)
+
+    def __call__(self, phase, seconds, info):
+        with self._lock:
+            if phase == 'rule':
+                self.rules[info['stack_id']].add(seconds, info['elements'], info['matches'])
+                return
+
+            self.phases[phase].add(seconds)
+            for key, value in info.items():
+                if isinstance(value, int):
+                    self.counts[key] += value
+
+    def dead_rules(self, stack_ids=None):
+        """
+        Returns the stack_ids of the rules which never gave a result.
+
+        Parameters:
+        ----------
+        stack_ids: iterable, optional
+            stack_ids of all rules, e.g. [x['stack_id'] for x in scraper.stack_list],
+                to include the rules which were never evaluated.
+
+        Returns:
+        --------
+        List of stack_ids
+        """
+
+        with self._lock:
+            dead = [k for k, v in self.rules.items() if not v.matches]
+            if stack_ids is not None:
+                dead += [x for x in stack_ids if x not in self.rules]
+        return dead
+
+    def slowest_rules(self, count=None):
+        """
+        Returns the (stack_id, RuleStats) pairs of the rules, most time consuming first.
+        """
+
+        with self._lock:
+            rules = sorted(self.rules.items(), key=lambda x: x[1].time, reverse=True)
+        return rules[:count]
+
+    def to_dict(self):
+        with self._lock:
+            return dict(phases={k: v.to_dict() for k, v in self.phases.items()},
+                        rules={k: v.to_dict() for k, v in self.rules.items()},
+                        counts=dict(self.counts))
@@ -0,0 +1,276 @@
+import codecs
+import mmap
+import os
+import unicodedata
+
+from html import unescape
+from urllib.parse import urljoin
+
+from bs4.dammit import EncodingDetector
+from lxml import etree
+
+from autoscraper.backends import LxmlBackend
+
+# a text without any tag is split on whitespace once it gets this long
+MAX_PENDING_TEXT = 1 << 20
+
+
+def get_encoding(head):
+    """
+    Returns the encoding of an HTML document from the bytes it starts with: the encoding of
+        its byte order mark, else the encoding it declares, else UTF-8.
+    """
+
+    _, encoding = EncodingDetector.strip_byte_order_mark(bytes(head))
+    encoding = encoding or EncodingDetector.find_declared_encoding(bytes(head), is_html=True)
+    try:
+        return codecs.lookup(encoding).name if encoding else 'utf-8'
+    except LookupError:
+        return 'utf-8'
+
+
+def _iter_decoded(read, chunk_size):
+    decoder = None
+    while True:
+        chunk = read(chunk_size)
+        if not chunk:
+            break
+        if not isinstance(chunk, str):
+            if decoder is None:
+                # the encoding is declared at the start of the document
+                decoder = codecs.getincrementaldecoder(get_encoding(chunk))(errors='replace')
+            chunk = decoder.decode(chunk)
+        yield chunk
+
+    if decoder is not None:
+        yield decoder.decode(b'', final=True)
+
+
+def iter_text_chunks(source, chunk_size):
+    """
+    Yields the text of an HTML document by chunks. The document is a string, bytes or a
+        buffer such as an mmap, the path of a file as a PathLike object, or a file object
+        opened in text or binary mode. Bytes are decoded with get_encoding.
+    """
+
+    if isinstance(source, str):
+        for start in range(0, len(source), chunk_size):
+            yield source[start:start + chunk_size]
+        return
+
+    if isinstance(source, os.PathLike):
+        with open(source, 'rb') as f:
+            yield from _iter_decoded(f.read, chunk_size)
+        return
+
+    if hasattr(source, 'read') and not isinstance(source, mmap.mmap):
+        yield from _iter_decoded(source.read, chunk_size)
+        return
+
+    # slices of the buffer are decoded without copying the whole of it
+    view = memoryview(source).cast('B')
+    position = [0]
+
+    def read(size):
+        start = position[0]
+        position[0] = start + size
+        return view[start:start + size]
+
+    yield from _iter_decoded(read, chunk_size)
+
+
+def _get_cut(text):
+    # entities never contain '<' or whitespace, and both are starters for unicode
+    # normalization, so the text before them can be processed on its own
+    cut = text.rfind('<')
+    if cut > 0 or len(text) < MAX_PENDING_TEXT:
+        return max(cut, 0)
+
+    end = len(text.rstrip())
+    return max(text.rfind(' ', 0, end), text.rfind('\n', 0, end), 0)
+
+
+def iter_normalized_chunks(chunks):
+    """
+    Unescapes and normalizes the chunks of an HTML document the way a whole document is
+        before parsing, holding back the end of each chunk which may change with the next one.
+    """
+
+    pending = ''
+    started = False
+    for chunk in chunks:
+        pending += chunk
+        cut = _get_cut(pending)
+        if not cut:
+            continue
+
+        text, pending = unescape(pending[:cut]), pending[cut:]
+        if not started:
+            text = text.lstrip()
+            started = bool(text)
+        if text:
+            yield unicodedata.normalize('NFKD', text)
+
+    text = unescape(pending)
+    text = text.strip() if not started else text.rstrip()
+    if text:
+        yield unicodedata.normalize('NFKD', text)
+
+
+def get_stream_value(element, stack, url):
+    wanted_attr = stack['wanted_attr']
+    if wanted_attr is None:
+        if stack.get('is_non_rec_text', False):
+            return LxmlBackend.get_non_rec_text(element)
+        return LxmlBackend.get_text(element).strip()
+
+    value = LxmlBackend.get_attrs(element).get(wanted_attr)
+    if value is not None and stack['is_full_url']:
+        return urljoin(url, value)
+    return value
+
+
+class _ChunkReader(object):
+    # file object reading the chunks. lxml parses files with a pull parser, which unlike its
+    # push (feed) parser releases the input already parsed
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+
+    def read(self, size=-1):
+        for chunk in self._chunks:
+            if chunk:
+                return chunk.encode('utf-8')
+        return b''
+
+
+def _iter_events(events):
+    # lxml fails on a document without any element, such as an empty one, which has no
+    # results like with the backends
+    started = False
+    try:
+        for event in events:
+            started = True
+            yield event
+    except etree.XMLSyntaxError:
+        if started:
+            raise
+
+
+class _OpenElement(object):
+    __slots__ = ('element', 'nodes', 'counts', 'held', 'is_candidate')
+
+    def __init__(self, element, nodes, is_candidate=False):
+        self.element = element
+        # matched trie nodes with the sibling index of the element among their matches
+        self.nodes = nodes
+        self.counts = {}
+        # last matches of the children which may be the result of a rule once all
+        # children are known
+        self.held = {}
+        self.is_candidate = is_candidate
+
+
+class StreamMatcher(object):
+    """
+    Evaluates the similar trie of a stack_list on a document while it's being parsed.
+
+    An element is matched against the trie when it starts, as its path and attributes are
+    known by then, and its result is computed when it ends. When a rule wants the n-th
+    match among siblings but there may be fewer, the last match is held until the parent
+    ends. Finished subtrees which are not part of an element still open as a possible result
+    are dropped, so the tree kept in memory doesn't grow with the document.
+
+    Parameters
+    ----------
+    trie: RuleTrie
+        Compiled stack_list.
+    get_value: function
+        get_value(position, element) returns the result of the rule at the position.
+    get_attrs: function, optional
+        get_attrs(attrs) returns the attributes to match, e.g. fuzzy attributes.
+    contain_sibling_leaves: bool, optional, defaults to False
+        Same as in AutoScraper.get_result_similar.
+    """
+
+    def __init__(self, trie, get_value, get_attrs=None, contain_sibling_leaves=False):
+        self.trie = trie
+        self.get_value = get_value
+        self.get_attrs = get_attrs
+        self.contain_sibling_leaves = contain_sibling_leaves
+        self._children = {}
+        self._attrs = {}
+
+    def _get_children(self, node, tag):
+        key = id(node)
+        if key not in self._children:
+            children = self._children[key] = {}
+            for child in node.children.values():
+                children.setdefault(child.tag, []).append(child)
+        return self._children[key].get(tag, ())
+
+    def _matches(self, element, node):
+        attrs = node.attrs
+        if self.get_attrs is not None:
+            key = id(node)
+            if key not in self._attrs:
+                self._attrs[key] = self.get_attrs(attrs)
+            attrs = self._attrs[key]
+        return LxmlBackend.matches_attrs(element, attrs)
+
+    def _start(self, parent, element):
+        nodes = []
+        is_candidate = False
+        for node, _ in parent.nodes:
+            for match in self._get_children(node, element.tag):
+                if not self._matches(element, match):
+                    continue
+                index = parent.counts.get(match, 0)
+                parent.counts[match] = index + 1
+                nodes.append((match, index))
+                is_candidate = is_candidate or bool(match.rules)
+        return _OpenElement(element, nodes, is_candidate)
+
+    def _end(self, parent, opened):
+        for node, index in opened.nodes:
+            for position, wanted_index in node.rules:
+                if self.contain_sibling_leaves or index == wanted_index:
+                    parent.held.pop((node, position), None)
+                    yield position, self.get_value(position, opened.element)
+                elif index < wanted_index:
+                    parent.held[(node, position)] = self.get_value(position, opened.element)
+
+    def iter_results(self, chunks):
+        """
+        Parses the chunks of a document and yields a (position, result) pair for each
+            result of the rules, in the order the results are known.
+        """
+
+        events = etree.iterparse(_ChunkReader(chunks), events=('start', 'end'), html=True,
+                                 recover=True, strip_cdata=False, encoding='utf-8')
+        document = _OpenElement(None, [(self.trie.similar_root, 0)])
+        opened = [document]
+        candidates = 0
+
+        for event, element in _iter_events(events):
+            if event == 'start':
+                opened.append(self._start(opened[-1], element))
+                candidates += opened[-1].is_candidate
+                continue
+
+            current = opened.pop()
+            for (_, position), result in current.held.items():
+                yield position, result
+            yield from self._end(opened[-1], current)
+            candidates -= current.is_candidate
+
+            # nothing needs the texts of this subtree any longer
+            if not candidates:
+                element.clear(keep_tail=True)
+                # siblings of the root, such as leading comments, can't be deleted
+                parent = element.getparent()
+                if parent is not None:
+                    while element.getprevious() is not None:
+                        del parent[0]
+
+        for (_, position), result in document.held.items():
+            yield position, result
@@ -0,0 +1,119 @@
+import weakref
+
+from autoscraper.backends import START, STRING, END
+
+# text caches of the documents alive, by document id
+_text_caches = {}
+
+
+def _accepts(key, string_type):
+    # same filtering of the string types as bs4 Tag._all_strings
+    if key is None:
+        return True
+    if isinstance(key, tuple):
+        return string_type in key
+    return string_type is key
+
+
+class TextCache(object):
+    """
+    Texts and non recursive texts of the elements of a document, each computed once.
+
+    compute_all() computes the texts of all elements bottom-up in a single walk of the
+    document, as build() needs them. The strings making up the text of an element are
+    contiguous in the document once the strings of other types are filtered out, so the
+    strings of each type are joined once and the text of an element is stored as a range
+    of them. Before that, texts are computed and kept element by element, which is cheaper
+    when only the texts of the matched elements are needed.
+    """
+
+    def __init__(self, backend, document):
+        self.backend = backend
+        # the cache must not keep the document alive
+        self._document = weakref.ref(document)
+        self._streams = None
+        self._ranges = {}
+        self._texts = {}
+        self._non_rec_texts = {}
+        # elements which are not kept alive by the document, as lxml proxies,
+        # are kept alive while their ids are used
+        self._elements = []
+        # fuzzy matchers of the wanted texts, with their decisions on the texts of the document
+        self.fuzzy_matchers = {}
+
+    def _keep_alive(self, element):
+        if not self.backend.stable_ids and element is not self._document():
+            self._elements.append(element)
+
+    def compute_all(self):
+        if self._streams is not None:
+            return
+
+        streams = {}
+        open_elements = []
+
+        for event, node, key in self.backend.walk(self._document()):
+            if event == STRING:
+                if open_elements:
+                    open_elements[-1][3].append(node)
+                for stream_key, stream in streams.items():
+                    if _accepts(stream_key, key):
+                        stream[0].append(node)
+                        stream[1] += len(node)
+
+            elif event == START:
+                if key not in streams:
+                    streams[key] = [[], 0]
+                open_elements.append((node, key, streams[key][1], []))
+
+            elif event == END:
+                element, key, start, strings = open_elements.pop()
+                self._ranges[id(element)] = (key, start, streams[key][1])
+                self._non_rec_texts[id(element)] = ''.join(strings).strip()
+                self._keep_alive(element)
+
+        self._streams = {key: ''.join(strings) for key, (strings, _) in streams.items()}
+
+    def get_text(self, element):
+        text_range = self._ranges.get(id(element))
+        if text_range is not None:
+            key, start, end = text_range
+            return self._streams[key][start:end]
+
+        key = id(element)
+        if key not in self._texts:
+            self._texts[key] = self.backend.get_text(element)
+            self._keep_alive(element)
+        return self._texts[key]
+
+    def get_non_rec_text(self, element):
+        key = id(element)
+        if key not in self._non_rec_texts:
+            self._non_rec_texts[key] = self.backend.get_non_rec_text(element)
+            self._keep_alive(element)
+        return self._non_rec_texts[key]
+
+
+def get_text_cache(backend, document):
+    """
+    Returns the text cache of the document, which is freed with the document.
+
+    Parameters:
+    ----------
+    backend: SoupBackend or LxmlBackend
+        Backend of the document.
+
+    document: BeautifulSoup or LxmlDocument
+        A document parsed by the backend.
+
+    Returns:
+    --------
+    TextCache of the document
+    """
+
+    key = id(document)
+    text_cache = _text_caches.get(key)
+    if text_cache is None or text_cache.backend is not backend:
+        text_cache = _text_caches[key] = TextCache(backend, document)
+        weakref.finalize(document, _text_caches.pop, key, None)
+    return text_cache
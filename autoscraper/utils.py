@@ -1,4 +1,4 @@
-from collections import OrderedDict
+from collections import Counter, OrderedDict
 
 import random
 import string
@@ -39,12 +39,66 @@ def normalize(item):
     return unicodedata.normalize("NFKD", item.strip())
 
 
-def text_match(t1, t2, ratio_limit):
+def text_match(t1, t2, ratio_limit, matchers=None):
+    """
+    Whether t2 matches t1, a string or a compiled regex. Fuzzy decisions are cached in the
+        matchers dict if given, which the caller drops with the texts compared.
+    """
     if hasattr(t1, 'fullmatch'):
         return bool(t1.fullmatch(t2))
     if ratio_limit >= 1:
         return t1 == t2
-    return SequenceMatcher(None, t1, t2).ratio() >= ratio_limit
+    if matchers is None:
+        return FuzzyMatcher(t1, ratio_limit).match(t2)
+
+    matcher = matchers.get((t1, ratio_limit))
+    if matcher is None:
+        matcher = matchers[(t1, ratio_limit)] = FuzzyMatcher(t1, ratio_limit)
+    return matcher.match(t2)
+
+
+class FuzzyMatcher(object):
+    """
+    Decides whether SequenceMatcher(None, text, other).ratio() >= ratio_limit.
+    Most candidates are rejected with the length and character count upper bounds of the
+    ratio (as real_quick_ratio and quick_ratio do) before computing the ratio itself, and
+    computed decisions are cached. The decisions are the same as the ratio comparison.
+    """
+
+    max_cache_size = 4096
+
+    def __init__(self, text, ratio_limit):
+        self.text = text
+        self.ratio_limit = ratio_limit
+        self._length = len(text)
+        self._counts = None
+        self._cache = {}
+
+    def _upper_bound(self, matches, other):
+        length = self._length + len(other)
+        if not length:
+            return 1.0
+        return 2.0 * matches / length
+
+    def match(self, other):
+        if self._upper_bound(min(self._length, len(other)), other) < self.ratio_limit:
+            return False
+
+        cached = self._cache.get(other)
+        if cached is not None:
+            return cached
+
+        if self._counts is None:
+            self._counts = Counter(self.text)
+        matches = sum((self._counts & Counter(other)).values())
+        if self._upper_bound(matches, other) < self.ratio_limit:
+            result = False
+        else:
+            result = SequenceMatcher(None, self.text, other).ratio() >= self.ratio_limit
+
+        if len(self._cache) < self.max_cache_size:
+            self._cache[other] = result
+        return result
 
 
 class ResultItem():
@@ -61,6 +115,38 @@ class FuzzyText(object):
         self.text = text
         self.ratio_limit = ratio_limit
         self.match = None
+        self._matcher = FuzzyMatcher(text, ratio_limit)
 
     def search(self, text):
-        return SequenceMatcher(None, self.text, text).ratio() >= self.ratio_limit
+        return self._matcher.match(text)
+
+
+class SeenSet(object):
+    """
+    Hashes of the values seen so far, to remove duplicates from results yielded one by one.
+        Only the hashes are kept, so a distinct value is dropped in the unlikely case its
+        hash collides with a value seen before. If max_size is set, only the max_size values
+        seen most recently are remembered.
+    """
+
+    def __init__(self, max_size=None):
+        self.max_size = max_size
+        self._hashes = OrderedDict() if max_size else set()
+
+    def add(self, value):
+        """Adds a value, returns False if it was already seen."""
+
+        key = hash(value)
+        if key in self._hashes:
+            if self.max_size:
+                self._hashes.move_to_end(key)
+            return False
+
+        if not self.max_size:
+            self._hashes.add(key)
+            return True
+
+        self._hashes[key] = None
+        if len(self._hashes) > self.max_size:
+            self._hashes.popitem(last=False)
+        return True
@@ -0,0 +1,118 @@
+import re
+
+from lxml import etree
+
+from autoscraper.backends import CDATA_LIST_ATTRIBUTES
+from autoscraper.rule_trie import RuleTrie
+
+ncname_re = re.compile(r'^[A-Za-z_][\w.-]*$')
+
+
+def xpath_literal(value):
+    if "'" not in value:
+        return "'%s'" % value
+    if '"' not in value:
+        return '"%s"' % value
+    parts = value.split("'")
+    return 'concat(%s)' % ", \"'\", ".join("'%s'" % x for x in parts)
+
+
+def _name_test(tag):
+    if ncname_re.match(tag):
+        return tag
+    return '*[name()=%s]' % xpath_literal(tag)
+
+
+def _tokens(attr):
+    # class names joined by single spaces, as bs4 splits them
+    return 'normalize-space(@%s)' % attr
+
+
+def _value_test(tag, attr, value):
+    # a single string value, as bs4 matches it with the attribute present
+    if not _is_multi_valued(tag, attr):
+        return '@%s=%s' % (attr, xpath_literal(value))
+
+    if not value:
+        return "%s=''" % _tokens(attr)
+
+    if not re.search(r'\s', value):
+        return "contains(concat(' ', %s, ' '), %s)" % (_tokens(attr), xpath_literal(' %s ' % value))
+
+    if ' '.join(value.split()) != value:
+        return 'false()'
+    return '%s=%s' % (_tokens(attr), xpath_literal(value))
+
+
+def _is_multi_valued(tag, attr):
+    return attr in CDATA_LIST_ATTRIBUTES['*'] or attr in CDATA_LIST_ATTRIBUTES.get(tag, ())
+
+
+def _attr_predicate(tag, attr, value):
+    if isinstance(value, (list, tuple)):
+        if not value:
+            return 'not(@%s)' % attr
+        tests = ' or '.join(_value_test(tag, attr, x) for x in value)
+        return '@%s and (%s)' % (attr, tests)
+
+    if not value:
+        return 'not(@%s) or %s' % (attr, _value_test(tag, attr, value))
+
+    return _value_test(tag, attr, value)
+
+
+def _step(tag, attrs, index=None):
+    step = _name_test(tag)
+    for attr in sorted(attrs):
+        step += '[%s]' % _attr_predicate(tag, attr, attrs[attr])
+
+    if index is not None:
+        # the index-th match, or the last one if there are fewer matches
+        position = index + 1
+        step += '[position()=%d or (position()=last() and last()<%d)]' % (position, position)
+    return step
+
+
+def compile_similar(content, contain_sibling_leaves=False):
+    steps = [_step(item[0], item[1]) for item in content[:-1]]
+    index = None
+    if not contain_sibling_leaves:
+        index = content[-2][2] if len(content) > 1 else 0
+    steps.append(_step(content[-1][0], content[-1][1], index))
+    return '/' + '/'.join(steps)
+
+
+def compile_exact(content):
+    steps = ['*[1]']
+    for item, next_item in zip(content, content[1:]):
+        steps.append(_step(next_item[0], next_item[1], item[2]))
+    return '/' + '/'.join(steps)
+
+
+def compile_stack(stack):
+    """Returns the XPath expressions of a rule for similar, similar with sibling leaves
+    and exact results."""
+
+    content = stack['content']
+    return dict(similar=compile_similar(content),
+                similar_with_leaves=compile_similar(content, contain_sibling_leaves=True),
+                exact=compile_exact(content))
+
+
+class RuleXPaths(object):
+    """
+    Compiled XPath expressions of a stack_list, evaluated natively by libxml2.
+    """
+
+    def __init__(self, stack_list):
+        self.signature = RuleTrie.get_signature(stack_list)
+        self.expressions = [compile_stack(stack) for stack in stack_list]
+        self._compiled = {}
+
+    def _get_compiled(self, mode):
+        if mode not in self._compiled:
+            self._compiled[mode] = [etree.XPath(x[mode]) for x in self.expressions]
+        return self._compiled[mode]
+
+    def evaluate(self, root, mode):
+        return [xpath(root) for xpath in self._get_compiled(mode)]
@@ -0,0 +1,248 @@
+"""
+Benchmarks of AutoScraper build and extraction on the fixtures of fixtures.py.
+
+Reports the time (best of --repeat runs) and the peak Python memory of every phase:
+fetch (served by a stub), parse, index, rules (rule evaluation) and cleanup (result values,
+grouping and deduplication), plus the total of each operation.
+
+Usage:
+    python benchmarks/bench.py
+    python benchmarks/bench.py --quick --backend lxml
+    python benchmarks/bench.py --save baseline.json
+    python benchmarks/bench.py --compare baseline.json
+
+With --compare, the exit status is 1 if any measure is slower or bigger than the baseline
+beyond the tolerances.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+from collections import OrderedDict
+
+# benchmark the working tree rather than an installed version
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from autoscraper import AutoScraper  # noqa: E402
+from autoscraper.build_index import BuildIndex  # noqa: E402
+from autoscraper.text_cache import get_text_cache  # noqa: E402
+
+import fixtures  # noqa: E402
+
+OPERATIONS = ['build', 'similar', 'exact', 'both']
+
+
+class StubScraper(AutoScraper):
+    """AutoScraper serving the fixture pages instead of downloading them."""
+
+    pages = {}
+
+    @classmethod
+    def _fetch_html(cls, url, request_args=None):
+        return cls.pages[url]
+
+
+class Recorder(object):
+    """Runs the phases of an operation and records their time or their peak memory."""
+
+    def __init__(self, memory=False):
+        self.memory = memory
+        self.measures = OrderedDict()
+
+    def run(self, phase, func, *args, **kwargs):
+        if self.memory:
+            tracemalloc.start()
+            result = func(*args, **kwargs)
+            self.measures[phase] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            return result
+
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        self.measures[phase] = time.perf_counter() - start
+        return result
+
+
+def _build_indexes(scraper, soup, url, wanted_list, text_fuzz_ratio):
+    elements = scraper.backend.iter_elements(soup)
+    get_text_cache(scraper.backend, soup).compute_all()
+    if any(BuildIndex.is_indexable(x, text_fuzz_ratio) for x in wanted_list):
+        BuildIndex(scraper.backend, get_text_cache(scraper.backend, soup), elements, url)
+
+
+def bench_build(recorder, fixture, backend):
+    fuzz = fixture.fuzz
+    scraper = StubScraper(backend=backend)
+    StubScraper.pages[fixture.url] = fixture.html
+
+    html = recorder.run('fetch', scraper._fetch_html, fixture.url)
+    soup = recorder.run('parse', scraper._parse_html, html)
+    recorder.run('index', _build_indexes, scraper, soup, fixture.url, fixture.wanted_list, fuzz)
+    recorder.run('total', scraper.build, url=fixture.url, wanted_list=fixture.wanted_list,
+                 text_fuzz_ratio=fuzz)
+    return scraper
+
+
+def bench_extraction(recorder, scraper, fixture, operation):
+    fuzz = fixture.fuzz
+    StubScraper.pages[fixture.url] = fixture.scrape_html
+    args = dict(url=fixture.url, attr_fuzz_ratio=fuzz)
+
+    if operation == 'both':
+        # scraper.get_result shares the parse between similar and exact results
+        recorder.run('total', scraper.get_result, group_by_alias=True, **args)
+        return
+
+    if operation == 'similar':
+        func, method = scraper._get_result_with_stack_list, scraper.get_result_similar
+    else:
+        func, method = scraper._get_result_with_stack_list_index_based, scraper.get_result_exact
+
+    html = recorder.run('fetch', scraper._fetch_html, fixture.url)
+    soup = recorder.run('parse', scraper._parse_html, html)
+    elements, child_indexes = recorder.run('index', scraper._get_child_indexes, soup)
+    elements_list = recorder.run('rules', func, soup, fixture.url, fuzz)
+    recorder.run('cleanup', scraper._collect_results, elements_list, soup, fixture.url,
+                 child_indexes, False, True, None, False)
+    recorder.run('total', method, group_by_alias=True, **args)
+
+
+def _derive_build_rules(measures):
+    # the rules of a build are found along with the results, they are timed as the rest
+    others = sum(measures[x] for x in ('fetch', 'parse', 'index'))
+    measures['rules'] = max(measures['total'] - others, 0.0)
+    measures.move_to_end('total')
+
+
+def measure(fixture, backend, repeat, memory=True):
+    """Returns {operation: {phase: {'time': seconds, 'memory': bytes}}} for the fixture."""
+
+    times = {}
+    for _ in range(repeat):
+        recorder = Recorder()
+        scraper = bench_build(recorder, fixture, backend)
+        _derive_build_rules(recorder.measures)
+        runs = [('build', recorder.measures)]
+        for operation in OPERATIONS[1:]:
+            recorder = Recorder()
+            bench_extraction(recorder, scraper, fixture, operation)
+            runs.append((operation, recorder.measures))
+
+        for operation, measures in runs:
+            best = times.setdefault(operation, OrderedDict())
+            for phase, value in measures.items():
+                best[phase] = min(best.get(phase, value), value)
+
+    peaks = {}
+    if memory:
+        recorder = Recorder(memory=True)
+        scraper = bench_build(recorder, fixture, backend)
+        peaks['build'] = recorder.measures
+        for operation in OPERATIONS[1:]:
+            recorder = Recorder(memory=True)
+            bench_extraction(recorder, scraper, fixture, operation)
+            peaks[operation] = recorder.measures
+
+    report = OrderedDict()
+    for operation in OPERATIONS:
+        report[operation] = OrderedDict(
+            (phase, dict(time=value, memory=peaks.get(operation, {}).get(phase)))
+            for phase, value in times[operation].items())
+    return report
+
+
+def run(args):
+    results = OrderedDict()
+    for fixture in fixtures.get_fixtures(quick=args.quick):
+        for backend in args.backend:
+            name = '%s/%s' % (fixture.name, backend)
+            report = measure(fixture, backend, args.repeat, memory=not args.no_memory)
+            for operation, phases in report.items():
+                for phase, values in phases.items():
+                    results['%s/%s/%s' % (name, operation, phase)] = values
+            total = ', '.join('%s %.1fms' % (operation, phases['total']['time'] * 1000)
+                              for operation, phases in report.items())
+            print('%-30s %s' % (name, total), flush=True)
+    return results
+
+
+def print_results(results):
+    print()
+    print('%-50s %10s %12s' % ('measure', 'time (ms)', 'memory (KB)'))
+    for key, values in results.items():
+        memory = values['memory']
+        memory = '%12.1f' % (memory / 1024) if memory is not None else '%12s' % '-'
+        print('%-50s %10.2f %s' % (key, values['time'] * 1000, memory))
+
+
+def compare(results, baseline, args):
+    """Prints the measures which regressed against the baseline and returns their number."""
+
+    regressions = 0
+    for key, values in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+
+        checks = [('time', args.tolerance, args.min_time),
+                  ('memory', args.memory_tolerance, args.min_memory)]
+        for kind, tolerance, minimum in checks:
+            new, old = values[kind], base.get(kind)
+            if new is None or old is None:
+                continue
+            if new > old * (1 + tolerance) and new - old > minimum:
+                regressions += 1
+                print('REGRESSION %-50s %s %.4g -> %.4g (%+.0f%%)'
+                      % (key, kind, old, new, (new / old - 1) * 100 if old else float('inf')))
+
+    missing = [key for key in baseline if key not in results]
+    if missing and not args.quick:
+        print('%d measures of the baseline were not run' % len(missing))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backend', nargs='+', default=['bs4', 'lxml'],
+                        help='backends to benchmark')
+    parser.add_argument('--repeat', type=int, default=5, help='runs per measure, the best is kept')
+    parser.add_argument('--quick', action='store_true', help='fewer fixtures')
+    parser.add_argument('--no-memory', action='store_true', help='skip the memory measures')
+    parser.add_argument('--save', metavar='PATH', help='save the results as a baseline')
+    parser.add_argument('--compare', metavar='PATH', help='compare the results with a baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed relative slowdown, defaults to 0.25')
+    parser.add_argument('--min-time', type=float, default=0.002,
+                        help='slowdowns below this many seconds are ignored, defaults to 0.002')
+    parser.add_argument('--memory-tolerance', type=float, default=0.1,
+                        help='allowed relative memory increase, defaults to 0.1')
+    parser.add_argument('--min-memory', type=int, default=64 * 1024,
+                        help='memory increases below this many bytes are ignored')
+    args = parser.parse_args()
+
+    results = run(args)
+    print_results(results)
+
+    if args.save:
+        data = dict(python=platform.python_version(), platform=platform.platform(),
+                    results=results)
+        with open(args.save, 'w') as f:
+            json.dump(data, f, indent=1)
+        print('\nsaved to %s' % args.save)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args)
+        print('\n%d regression(s) against %s' % (regressions, args.compare))
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+"""
+Benchmark fixtures: synthetic product listing pages and the HTML pages vendored in pages/.
+Every fixture is deterministic, so runs on different versions scrape the same pages.
+"""
+import os
+import random
+
+PAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pages')
+
+WORDS = ['lorem', 'ipsum', 'dolor', 'sit', 'amet', 'consectetur', 'adipiscing', 'elit', 'sed',
+         'tempor', 'incididunt', 'labore', 'magna', 'aliqua', 'veniam', 'nostrud', 'laboris',
+         'nisi', 'aliquip', 'commodo', 'café', 'naïve', 'ｗｉｄｅ', '&amp;']
+
+# fields of a product card, in the order they are picked as wanted items
+FIELDS = ['title', 'price', 'url', 'rating', 'description', 'tag']
+
+
+class Fixture(object):
+    """
+    A page to build the rules on and a similar page to scrape with them.
+
+    Parameters
+    ----------
+    name: str
+        Name of the fixture, used in the reports.
+    url: str
+        URL of the pages, they are served by a stub instead of being downloaded.
+    html: str
+        Page the rules are built on.
+    wanted_list: list
+        Wanted items of the build.
+    scrape_html: str, optional
+        Page scraped with the rules. Defaults to html.
+    fuzz: float, optional, defaults to 1.0
+        text_fuzz_ratio of the build and attr_fuzz_ratio of the results.
+    """
+
+    def __init__(self, name, url, html, wanted_list, scrape_html=None, fuzz=1.0):
+        self.name = name
+        self.url = url
+        self.html = html
+        self.wanted_list = wanted_list
+        self.scrape_html = scrape_html or html
+        self.fuzz = fuzz
+
+
+def _words(rng, count):
+    return ' '.join(rng.choice(WORDS) for _ in range(count))
+
+
+def _card(rng, section, index):
+    product_id = section * 10000 + index
+    fields = dict(
+        title='%s %d' % (_words(rng, 2).title(), product_id),
+        price='$%d.%02d' % (rng.randint(1, 999), rng.randint(0, 99)),
+        url='/products/%d' % product_id,
+        rating='%.1f out of 5' % (rng.randint(10, 50) / 10),
+        description=_words(rng, rng.randint(5, 15)),
+        tag=rng.choice(['new', 'sale', 'popular', 'limited']),
+    )
+    html = (
+        '<div class="card" data-id="%d">'
+        '<h3 class="title"><a href="%s">%s</a></h3>'
+        '<span class="price" style="color: green">%s</span>'
+        '<div class="rating"><span>%s</span></div>'
+        '<p class="description">%s</p>'
+        '<ul class="tags"><li>%s</li></ul>'
+        '</div>'
+    ) % (product_id, fields['url'], fields['title'], fields['price'], fields['rating'],
+         fields['description'], fields['tag'])
+    return html, fields
+
+
+def make_listing(seed, items=200, depth=4, fan_out=4):
+    """
+    Returns the HTML of a product listing page and the fields of its cards.
+
+    Parameters:
+    ----------
+    seed: int
+        Seed of the texts. The structure of the page only depends on the other parameters.
+
+    items: int
+        Number of product cards.
+
+    depth: int
+        Number of nested containers around each list of cards.
+
+    fan_out: int
+        Number of sibling sections the cards are spread over.
+
+    Returns:
+    --------
+    Pair of (html, fields) where fields is a list per section of the fields of its cards.
+    """
+
+    rng = random.Random(seed)
+    sections = []
+    fields = []
+    per_section = max(1, items // fan_out)
+    for section in range(fan_out):
+        cards = [_card(rng, section, index) for index in range(per_section)]
+        fields.append([x[1] for x in cards])
+
+        html = '<div class="cards">%s</div>' % ''.join(x[0] for x in cards)
+        for level in range(depth):
+            # a sibling at every level, which the rules must not match
+            html = ('<div class="level-%d"><div class="banner">%s</div>%s</div>'
+                    % (level, _words(rng, 3), html))
+        sections.append('<section class="section-%d"><h2>%s</h2>%s</section>'
+                        % (section, _words(rng, 2), html))
+
+    nav = ''.join('<li><a href="/category/%d">%s</a></li>' % (i, _words(rng, 1))
+                  for i in range(10))
+    html = (
+        '<!DOCTYPE html><html><head><title>%s</title>'
+        '<script>var config = {"page": 1};</script>'
+        '<style>.card { margin: 0 }</style></head>'
+        '<body><nav><ul>%s</ul></nav><main>%s</main>'
+        '<footer><p>%s</p><!-- generated --></footer></body></html>'
+    ) % (_words(rng, 3), nav, ''.join(sections), _words(rng, 8))
+    return html, fields
+
+
+def synthetic(name, seed=0, items=200, depth=4, fan_out=4, rules=4, fuzz=1.0):
+    """
+    Returns a listing fixture whose build wants `rules` items, taken field by field from the
+    first card of successive sections. The scraped page has the same structure and other texts.
+    """
+
+    url = 'https://shop.example.com/catalog/page.html'
+    html, fields = make_listing(seed, items, depth, fan_out)
+    scrape_html, _ = make_listing(seed + 1, items, depth, fan_out)
+
+    wanted_list = []
+    for i in range(rules):
+        card = fields[i % len(fields)][0]
+        field = FIELDS[i % len(FIELDS)]
+        value = card[field]
+        if field == 'url':
+            value = 'https://shop.example.com' + value
+        wanted_list.append(value.replace('&amp;', '&'))
+
+    return Fixture(name, url, html, wanted_list, scrape_html, fuzz)
+
+
+def vendored(name, file_name, url, wanted_list):
+    with open(os.path.join(PAGES_DIR, file_name), encoding='utf-8') as f:
+        html = f.read()
+    return Fixture(name, url, html, wanted_list)
+
+
+def get_fixtures(quick=False):
+    """Returns the fixtures, each synthetic one varies one parameter of the base listing."""
+
+    base = dict(items=200, depth=4, fan_out=4, rules=4, fuzz=1.0)
+    variations = [
+        ('items', [50, 1000] if not quick else [1000]),
+        ('depth', [1, 12] if not quick else [12]),
+        ('fan_out', [1, 16] if not quick else [16]),
+        ('rules', [1, 12] if not quick else [12]),
+        ('fuzz', [0.9, 0.8] if not quick else [0.8]),
+    ]
+
+    fixtures = [synthetic('base', **base)]
+    for key, values in variations:
+        for value in values:
+            params = dict(base, **{key: value})
+            fixtures.append(synthetic('%s=%s' % (key, value), **params))
+
+    fixtures.append(vendored('books', 'books.html', 'https://books.example.com/catalogue/',
+                             ['A Light in the Attic', '£51.77',
+                              'https://books.example.com/catalogue/a-light-in-the-attic_1000/']))
+    fixtures.append(vendored('questions', 'questions.html', 'https://qa.example.com/questions',
+                             ['How to convert bytes to a string in Python 3?', '2.1k', 'python']))
+    return fixtures
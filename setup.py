@@ -33,7 +33,11 @@ setup(
 
     packages=find_packages(exclude=['contrib', 'docs', 'tests']),
 
-    python_requires='>=3.6',
+    python_requires='>=3.7',
     install_requires=['requests', 'bs4', 'lxml'],
 
+    entry_points={
+        'console_scripts': ['autoscraper=autoscraper.__main__:main'],
+    },
+
 )
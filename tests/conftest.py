@@ -0,0 +1,110 @@
+import os
+import sys
+import threading
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from autoscraper import AutoScraper
+
+BENCHMARKS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                              'benchmarks')
+PAGES_DIR = os.path.join(BENCHMARKS_DIR, 'pages')
+# the pages of the benchmarks are scraped by the tests as well
+sys.path.insert(0, BENCHMARKS_DIR)
+
+BACKENDS = ['bs4', 'lxml']
+
+
+def make_listing(items=6, offset=0, comment=True, extra=''):
+    """Returns a small product listing page, its cards differing by offset."""
+
+    cards = []
+    for index in range(offset, offset + items):
+        cards.append(
+            '<div class="card">'
+            '<h3 class="title"><a href="/products/%d">Product %d</a></h3>'
+            '<span class="price" style="color: green">$%d.99</span>'
+            '<p class="tag">%s</p>'
+            '</div>' % (index, index, index + 10, 'sale' if index % 2 else 'new'))
+    return (
+        '%s<html><head><title>Shop</title></head><body>'
+        '<div class="header"><h1>Shop</h1></div>'
+        '<div class="listing">%s</div>%s'
+        '<div class="footer"><p class="tag">footer</p></div>'
+        '</body></html>' % ('<!-- listing -->' if comment else '', ''.join(cards), extra))
+
+
+SAMPLE_HTML = make_listing()
+SAMPLE_URL = 'http://example.com/shop'
+WANTED = ['Product 0', '$10.99', '/products/0']
+
+
+@pytest.fixture(params=BACKENDS)
+def backend(request):
+    return request.param
+
+
+@pytest.fixture
+def scraper(backend):
+    scraper = AutoScraper(backend=backend)
+    scraper.build(url=SAMPLE_URL, html=SAMPLE_HTML, wanted_list=WANTED)
+    return scraper
+
+
+def read_page(name):
+    with open(os.path.join(PAGES_DIR, name), 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+class LocalServer(object):
+    """
+    Local stand-in for the scraped sites. routes maps a path to (status, headers, body),
+        requests lists the (path, headers) of the requests received.
+    """
+
+    def __init__(self):
+        self.routes = {}
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests.append((self.path, dict(self.headers)))
+                status, headers, body = server.routes.get(self.path, (404, {}, 'not found'))
+                if callable(body):
+                    status, headers, body = body(self.headers)
+                if isinstance(body, str):
+                    body = body.encode('utf-8')
+                self.send_response(status)
+                headers = dict({'Content-Type': 'text/html; charset=utf-8'}, **headers)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def url(self, path):
+        return 'http://127.0.0.1:%d%s' % (self._server.server_address[1], path)
+
+    def hits(self, path):
+        return sum(1 for x, _ in self.requests if x == path)
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+@pytest.fixture
+def local_server():
+    server = LocalServer()
+    yield server
+    server.close()
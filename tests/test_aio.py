@@ -0,0 +1,83 @@
+import asyncio
+
+from autoscraper import AsyncFetcher, AutoScraper, PageCache
+
+from conftest import SAMPLE_HTML, SAMPLE_URL, WANTED, make_listing
+
+
+def make_scraper(local_server, backend='bs4', cache=None, pages=2):
+    for i in range(pages):
+        local_server.routes['/page/%d' % i] = (200, {}, make_listing(items=4, offset=10 * i))
+    scraper = AutoScraper(backend=backend, cache=cache)
+    scraper.build(url=SAMPLE_URL, html=SAMPLE_HTML, wanted_list=WANTED)
+    return scraper
+
+
+def test_async_results_match(local_server, backend):
+    scraper = make_scraper(local_server, backend)
+    url = local_server.url('/page/1')
+
+    async def scrape():
+        try:
+            return (await scraper.aget_result_similar(url),
+                    await scraper.aget_result_exact(url),
+                    await scraper.aget_result(url))
+        finally:
+            await scraper.aclose()
+
+    results = asyncio.run(scrape())
+    assert results == (scraper.get_result_similar(url), scraper.get_result_exact(url),
+                       scraper.get_result(url))
+    assert 'Product 10' in results[0]
+
+
+def test_async_batch(local_server):
+    scraper = make_scraper(local_server, pages=3)
+    pages = [local_server.url('/page/%d' % i) for i in range(3)] + ['http://127.0.0.1:1/']
+
+    async def scrape():
+        async with AsyncFetcher(max_connections=2) as fetcher:
+            return [x async for x in scraper.aget_results_batch(pages, fetcher=fetcher)]
+
+    results = asyncio.run(scrape())
+    assert [x.index for x in results] == [0, 1, 2, 3]
+    assert [x.result for x in results[:3]] == [scraper.get_result_similar(x) for x in pages[:3]]
+    assert results[3].result is None and results[3].error
+
+
+def test_aclose_releases_the_fetcher(local_server):
+    scraper = make_scraper(local_server)
+    url = local_server.url('/page/0')
+
+    async def scrape():
+        await scraper.aget_result_similar(url)
+        return scraper._async_fetcher
+
+    fetcher = asyncio.run(scrape())
+    assert fetcher is not None
+    asyncio.run(scraper.aclose())
+    assert scraper._async_fetcher is None
+    assert fetcher.executor._shutdown
+
+    # a new fetcher is created when the scraper is used again
+    assert asyncio.run(scraper.aget_result_similar(url)) == scraper.get_result_similar(url)
+    scraper.close()
+    assert scraper._async_fetcher is None
+
+
+def test_async_methods_use_the_page_cache(local_server):
+    scraper = make_scraper(local_server, cache=PageCache())
+    url = local_server.url('/page/0')
+
+    async def scrape():
+        try:
+            first = await scraper.aget_result_similar(url)
+            second = await scraper.aget_result_similar(url)
+            batch = [x async for x in scraper.aget_results_batch([url])]
+            return first, second, batch
+        finally:
+            await scraper.aclose()
+
+    first, second, batch = asyncio.run(scrape())
+    assert first == second == batch[0].result == scraper.get_result_similar(url)
+    assert local_server.hits('/page/0') == 1
@@ -0,0 +1,143 @@
+import gzip
+import json
+
+from autoscraper import AutoScraper
+from autoscraper.__main__ import main
+from autoscraper.archive import iter_archive
+
+from conftest import SAMPLE_URL, make_listing
+
+
+def warc_record(url, body, warc_type='response', content_type='text/html'):
+    if warc_type == 'response':
+        body = ('HTTP/1.1 200 OK\r\nContent-Type: %s\r\n\r\n' % content_type).encode() + body
+        content_type = 'application/http; msgtype=response'
+    headers = ('WARC/1.0\r\nWARC-Type: %s\r\nWARC-Target-URI: %s\r\nContent-Type: %s\r\n'
+               'Content-Length: %d\r\n\r\n' % (warc_type, url, content_type, len(body)))
+    return headers.encode() + body + b'\r\n\r\n'
+
+
+def write_warc(path, pages):
+    data = b''.join(warc_record(url, html.encode('utf-8')) for url, html in pages)
+    opener = gzip.open if str(path).endswith('.gz') else open
+    with opener(path, 'wb') as f:
+        f.write(data)
+
+
+def pages_of(count):
+    return [('http://example.com/%d' % i, make_listing(items=2, offset=i * 10))
+            for i in range(count)]
+
+
+def read_jsonl(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+def test_iter_warc_records(tmp_path):
+    path = tmp_path / 'crawl.warc.gz'
+    write_warc(path, pages_of(3))
+    records = list(iter_archive(str(path)))
+    assert [x.url for x in records] == ['http://example.com/%d' % i for i in range(3)]
+    # reading resumes after a record from its next_offset
+    assert [x.url for x in iter_archive(str(path), offset=records[0].next_offset)] == \
+        [x.url for x in records[1:]]
+
+
+def test_warc_skips_empty_and_non_html_records(tmp_path):
+    path = tmp_path / 'crawl.warc'
+    data = warc_record('http://example.com/empty', b'')
+    data += warc_record('http://example.com/image', b'GIF89a', content_type='image/gif')
+    data += warc_record('http://example.com/page', make_listing().encode())
+    path.write_bytes(data)
+    assert [x.url for x in iter_archive(str(path))] == ['http://example.com/page']
+
+
+def test_scrape_archive_never_fetches(tmp_path, local_server, scraper):
+    local_server.routes['/live'] = (200, {}, make_listing(offset=500))
+    path = tmp_path / 'crawl.warc'
+    path.write_bytes(warc_record(local_server.url('/live'), b''))
+    output = tmp_path / 'out.jsonl'
+    stats = scraper.scrape_archive(str(path), str(output), workers=1)
+    assert stats['records'] == 0
+    assert read_jsonl(output) == []
+    assert local_server.requests == []
+
+
+def test_scrape_archive_matches_get_result(tmp_path, scraper):
+    pages = pages_of(4)
+    path = tmp_path / 'crawl.warc.gz'
+    write_warc(path, pages)
+    output = tmp_path / 'out.jsonl'
+    stats = scraper.scrape_archive(str(path), str(output), workers=1)
+    assert stats['records'] == 4 and stats['errors'] == 0
+    rows = read_jsonl(output)
+    assert [x['url'] for x in rows] == [url for url, _ in pages]
+    for row, (url, html) in zip(rows, pages):
+        assert row['result'] == scraper.get_result_similar(url=url, html=html)
+
+
+def test_scrape_jsonl_archive_to_csv(tmp_path, scraper):
+    path = tmp_path / 'pages.jsonl'
+    with open(path, 'w', encoding='utf-8') as f:
+        for url, html in pages_of(2):
+            f.write(json.dumps(dict(url=url, html=html)) + '\n')
+        f.write(json.dumps(dict(url='http://example.com/none', html='')) + '\n')
+    output = tmp_path / 'out.csv'
+    stats = scraper.scrape_archive(str(path), str(output), workers=1)
+    assert stats['records'] == 2
+    lines = output.read_text(encoding='utf-8').splitlines()
+    assert lines[0] == 'offset,url,key,value,error'
+    assert any('Product 10' in line for line in lines)
+
+
+def test_scrape_archive_resumes_from_checkpoint(tmp_path, scraper):
+    pages = pages_of(5)
+    path = tmp_path / 'crawl.warc'
+    write_warc(path, pages)
+    output, checkpoint = tmp_path / 'out.jsonl', tmp_path / 'out.ckpt'
+    scraper.scrape_archive(str(path), str(output), workers=1, checkpoint_path=str(checkpoint),
+                           checkpoint_every=1)
+    full = read_jsonl(output)
+
+    # an interrupted run is simulated by a checkpoint after the second record
+    records = list(iter_archive(str(path)))
+    json.dump(dict(offset=records[1].next_offset, records=2, errors=0,
+                   output_size=len(''.join(json.dumps(x, ensure_ascii=False) + '\n'
+                                           for x in full[:2]).encode('utf-8'))),
+              open(checkpoint, 'w'))
+    stats = scraper.scrape_archive(str(path), str(output), workers=1,
+                                   checkpoint_path=str(checkpoint), resume=True)
+    assert stats['records'] == 5
+    assert read_jsonl(output) == full
+
+
+def test_cli(tmp_path, scraper):
+    model = tmp_path / 'model.json'
+    scraper.save(str(model))
+    path = tmp_path / 'crawl.warc'
+    write_warc(path, pages_of(2))
+    output = tmp_path / 'out.jsonl'
+    main([str(model), str(path), str(output), '--workers', '1', '--quiet',
+          '--backend', scraper.backend.name])
+    assert len(read_jsonl(output)) == 2
+
+
+def test_scrape_archive_with_workers(tmp_path):
+    scraper = AutoScraper()
+    scraper.build(url=SAMPLE_URL, html=make_listing(), wanted_list=['Product 0'])
+    path = tmp_path / 'crawl.warc'
+    write_warc(path, pages_of(3))
+    output = tmp_path / 'out.jsonl'
+    stats = scraper.scrape_archive(str(path), str(output), workers=2)
+    assert stats['records'] == 3
+    assert [x['result'] for x in read_jsonl(output)] == \
+        [['Product %d' % (i * 10), 'Product %d' % (i * 10 + 1)] for i in range(3)]
+
+
+def test_batch_without_fetch_reports_pages_without_html(local_server, scraper):
+    from autoscraper.batch import iter_batch
+    pages = [(local_server.url('/live'), '')]
+    result, = iter_batch(scraper, pages, 1, 'similar', True, None, {}, fetch=False)
+    assert result.error and result.result is None
+    assert local_server.requests == []
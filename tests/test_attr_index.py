@@ -0,0 +1,64 @@
+import gc
+
+import pytest
+
+from autoscraper import attr_index as attr_index_module
+from autoscraper import auto_scraper as auto_scraper_module
+from autoscraper.attr_index import get_attr_index
+
+from conftest import SAMPLE_URL, make_listing, read_page
+from test_backends import FIXTURES, build
+
+RATIOS = [0.5, 0.7, 0.8, 0.9]
+# listing with renamed and restyled elements, which only fuzzy attributes match
+DRIFTED_HTML = make_listing(items=5, offset=2).replace('class="card"', 'class="cards"') \
+    .replace('color: green', 'color: red').replace('class="title"', 'class="titles big"')
+
+
+def pages(fixture):
+    return [fixture.scrape_html, DRIFTED_HTML, read_page('books.html')]
+
+
+@pytest.mark.parametrize('fixture', FIXTURES, ids=lambda x: x.name)
+def test_indexed_fuzzy_results_match(fixture, backend, monkeypatch):
+    scraper, _ = build(fixture, backend)
+    results = []
+    for _ in range(2):
+        results.append([
+            (scraper.get_result_similar(url=SAMPLE_URL, html=html, attr_fuzz_ratio=ratio,
+                                        grouped=True),
+             scraper.get_result_exact(url=SAMPLE_URL, html=html, attr_fuzz_ratio=ratio,
+                                      grouped=True))
+            for html in pages(fixture) for ratio in RATIOS])
+        # steps are matched element by element without the index
+        monkeypatch.setattr(auto_scraper_module, 'get_attr_index', lambda backend, soup: None)
+    assert results[0] == results[1]
+
+
+def test_drifted_page_is_matched(scraper):
+    assert scraper.get_result_similar(url=SAMPLE_URL, html=DRIFTED_HTML) == []
+    assert scraper.get_result_similar(url=SAMPLE_URL, html=DRIFTED_HTML,
+                                      attr_fuzz_ratio=0.7)[:2] == ['Product 2', 'Product 3']
+
+
+def test_index_find_all_matches_the_backend(scraper):
+    backend = scraper.backend
+    document = scraper._parse_html(DRIFTED_HTML)
+    index = get_attr_index(backend, document)
+    steps = {id(step[1]): step for stack in scraper.stack_list for step in stack['content']}
+    for element in [document] + list(backend.iter_elements(document)):
+        for tag, attrs, *_ in steps.values():
+            for ratio in RATIOS:
+                fuzzy_attrs = scraper._get_fuzzy_step(attrs, ratio)
+                assert index.find_all(element, tag, fuzzy_attrs) == \
+                    backend.find_all(element, tag, fuzzy_attrs)
+
+
+def test_index_is_shared_and_freed_with_the_document(scraper):
+    document = scraper._parse_html(DRIFTED_HTML)
+    index = get_attr_index(scraper.backend, document)
+    assert get_attr_index(scraper.backend, document) is index
+    key = id(document)
+    del document
+    gc.collect()
+    assert key not in attr_index_module._attr_indexes
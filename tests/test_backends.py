@@ -0,0 +1,82 @@
+import random
+
+import pytest
+
+from autoscraper import AutoScraper
+from autoscraper.backends import LxmlBackend, SoupBackend
+
+from fixtures import synthetic, vendored
+
+FIXTURES = [
+    synthetic('listing', items=24, depth=2, fan_out=3, rules=6),
+    synthetic('fuzzy', items=24, depth=2, fan_out=3, rules=3, fuzz=0.8),
+    vendored('books', 'books.html', 'https://books.example.com/catalogue/',
+             ['A Light in the Attic', '£51.77',
+              'https://books.example.com/catalogue/a-light-in-the-attic_1000/']),
+    vendored('questions', 'questions.html', 'https://qa.example.com/questions',
+             ['How to convert bytes to a string in Python 3?', '2.1k', 'python']),
+]
+
+SIMILAR_OPTIONS = [dict(), dict(grouped=True), dict(group_by_alias=True), dict(keep_order=True),
+                   dict(contain_sibling_leaves=True), dict(unique=False, keep_order=True),
+                   dict(attr_fuzz_ratio=0.7)]
+EXACT_OPTIONS = [dict(), dict(grouped=True), dict(unique=False), dict(attr_fuzz_ratio=0.7)]
+
+
+def build(fixture, backend):
+    scraper = AutoScraper(backend=backend)
+    # stack ids are random
+    random.seed(0)
+    result = scraper.build(url=fixture.url, html=fixture.html, wanted_list=fixture.wanted_list,
+                           text_fuzz_ratio=fixture.fuzz)
+    return scraper, result
+
+
+@pytest.mark.parametrize('fixture', FIXTURES, ids=lambda x: x.name)
+def test_backends_learn_the_same_rules(fixture):
+    soup_scraper, soup_result = build(fixture, 'bs4')
+    lxml_scraper, lxml_result = build(fixture, 'lxml')
+    assert soup_result and soup_result == lxml_result
+    assert soup_scraper.stack_list == lxml_scraper.stack_list
+
+
+@pytest.mark.parametrize('fixture', FIXTURES, ids=lambda x: x.name)
+def test_backends_give_the_same_results(fixture):
+    soup_scraper, _ = build(fixture, 'bs4')
+    lxml_scraper = AutoScraper(soup_scraper.stack_list, backend='lxml')
+    assert lxml_scraper.get_result_similar(url=fixture.url, html=fixture.scrape_html)
+    for options in SIMILAR_OPTIONS:
+        assert soup_scraper.get_result_similar(url=fixture.url, html=fixture.scrape_html,
+                                               **options) == \
+            lxml_scraper.get_result_similar(url=fixture.url, html=fixture.scrape_html, **options)
+    for options in EXACT_OPTIONS:
+        assert soup_scraper.get_result_exact(url=fixture.url, html=fixture.scrape_html,
+                                             **options) == \
+            lxml_scraper.get_result_exact(url=fixture.url, html=fixture.scrape_html, **options)
+    assert soup_scraper.get_result(url=fixture.url, html=fixture.scrape_html) == \
+        lxml_scraper.get_result(url=fixture.url, html=fixture.scrape_html)
+
+
+@pytest.mark.parametrize('html', [
+    '<div class=" a  b\tc ">x</div>',
+    '<div id="x y" rel="a b">x</div>',
+    '<div>a <b>b</b><!-- c --> <script>d</script> e</div>',
+    '<pre>  a\n  <b> b </b></pre>',
+    '<div>caf&eacute; <![CDATA[x]]></div>',
+])
+def test_backends_see_the_same_elements(html):
+    soup, document = SoupBackend.parse(html), LxmlBackend.parse(html)
+    soup_elements = list(SoupBackend.iter_elements(soup))
+    lxml_elements = list(LxmlBackend.iter_elements(document))
+    assert [SoupBackend.get_name(x) for x in soup_elements] == \
+        [LxmlBackend.get_name(x) for x in lxml_elements]
+    for soup_element, lxml_element in zip(soup_elements, lxml_elements):
+        assert SoupBackend.get_attrs(soup_element) == LxmlBackend.get_attrs(lxml_element)
+        assert SoupBackend.get_text(soup_element) == LxmlBackend.get_text(lxml_element)
+        assert SoupBackend.get_non_rec_text(soup_element) == \
+            LxmlBackend.get_non_rec_text(lxml_element)
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        AutoScraper(backend='html5lib')
@@ -0,0 +1,56 @@
+import pytest
+
+from autoscraper import AutoScraper
+
+from conftest import SAMPLE_URL, make_listing
+
+PAGES = [make_listing(items=3, offset=10 * i) for i in range(5)]
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+@pytest.mark.parametrize('method', ['similar', 'exact', 'both'])
+def test_batch_matches_get_result(scraper, workers, method):
+    get_result = getattr(scraper, {'similar': 'get_result_similar', 'exact': 'get_result_exact',
+                                   'both': 'get_result'}[method])
+    results = list(scraper.get_results_batch([(SAMPLE_URL, x) for x in PAGES],
+                                             workers=workers, method=method))
+    assert [x.index for x in results] == list(range(len(PAGES)))
+    assert all(x.source == SAMPLE_URL and x.error is None for x in results)
+    assert [x.result for x in results] == [get_result(url=SAMPLE_URL, html=x) for x in PAGES]
+    assert all(x.result for x in results)
+
+
+def test_batch_unordered_with_small_window(scraper):
+    pages = [(SAMPLE_URL, x) for x in PAGES]
+    results = list(scraper.get_results_batch(pages, workers=2, ordered=False, max_pending=2,
+                                             group_by_alias=True))
+    assert sorted(x.index for x in results) == list(range(len(PAGES)))
+    for item in results:
+        assert item.result == scraper.get_result_similar(url=SAMPLE_URL, html=PAGES[item.index],
+                                                         group_by_alias=True)
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_batch_reads_paths_and_reports_errors(scraper, tmp_path, workers):
+    path = tmp_path / 'page.html'
+    path.write_text(PAGES[1], encoding='utf-8')
+    pages = [str(path), str(tmp_path / 'missing.html'), path]
+    results = list(scraper.get_results_batch(pages, workers=workers))
+
+    assert results[0].source == str(path) and results[2].source == str(path)
+    assert results[0].result == results[2].result == scraper.get_result_similar(html=PAGES[1])
+    assert results[1].result is None and results[1].error.startswith('FileNotFoundError')
+
+
+def test_batch_rejects_unknown_method(scraper):
+    with pytest.raises(ValueError):
+        list(scraper.get_results_batch(PAGES, method='fuzzy'))
+
+
+def test_batch_of_partial_parse_scraper():
+    scraper = AutoScraper(partial_parse=True)
+    scraper.build(url=SAMPLE_URL, html=PAGES[0], wanted_list=['Product 0'])
+    results = list(scraper.get_results_batch([(SAMPLE_URL, x) for x in PAGES], workers=2))
+    assert [x.result for x in results] == \
+        [scraper.get_result_similar(url=SAMPLE_URL, html=x) for x in PAGES]
+    assert 'Product 40' in results[4].result
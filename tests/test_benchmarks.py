@@ -0,0 +1,45 @@
+import argparse
+
+import bench
+import fixtures
+
+
+def test_fixtures_are_deterministic():
+    first = fixtures.synthetic('small', items=8, depth=1, fan_out=2, rules=3)
+    second = fixtures.synthetic('small', items=8, depth=1, fan_out=2, rules=3)
+    assert (first.html, first.scrape_html, first.wanted_list) == \
+        (second.html, second.scrape_html, second.wanted_list)
+    assert first.html != first.scrape_html
+    assert all(x.replace('&', '&amp;') in first.html or x.startswith('https://')
+               for x in first.wanted_list)
+
+
+def test_measure(backend):
+    fixture = fixtures.synthetic('small', items=8, depth=1, fan_out=2, rules=3)
+    report = bench.measure(fixture, backend, repeat=1)
+    assert list(report) == bench.OPERATIONS
+    assert list(report['build']) == ['fetch', 'parse', 'index', 'rules', 'total']
+    assert list(report['similar']) == list(report['exact']) == \
+        ['fetch', 'parse', 'index', 'rules', 'cleanup', 'total']
+    assert list(report['both']) == ['total']
+    for operation, phases in report.items():
+        for phase, values in phases.items():
+            assert values['time'] >= 0
+            # the rules of a build are timed as the rest of the build, not measured
+            assert (values['memory'] is None) == (operation == 'build' and phase == 'rules')
+
+
+def test_compare_reports_regressions(capsys):
+    args = argparse.Namespace(tolerance=0.25, min_time=0.002, memory_tolerance=0.1,
+                              min_memory=1024, quick=False)
+    baseline = {'a/total': dict(time=0.1, memory=10000),
+                'b/total': dict(time=0.1, memory=10000),
+                'c/total': dict(time=0.1, memory=None)}
+    results = {'a/total': dict(time=0.11, memory=10500),
+               'b/total': dict(time=0.2, memory=20000)}
+    assert bench.compare(results, baseline, args) == 2
+    output = capsys.readouterr().out
+    assert 'a/total' not in output
+    assert [x.split()[1:3] for x in output.splitlines() if x.startswith('REGRESSION')] == \
+        [['b/total', 'time'], ['b/total', 'memory']]
+    assert '1 measures of the baseline were not run' in output
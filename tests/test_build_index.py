@@ -0,0 +1,59 @@
+import random
+import re
+
+import pytest
+
+from autoscraper import AutoScraper
+from autoscraper.build_index import BuildIndex
+from autoscraper.text_cache import get_text_cache
+
+from conftest import SAMPLE_HTML, SAMPLE_URL, read_page
+
+BOOKS_URL = 'https://books.example.com/catalogue/'
+SAMPLES = [
+    (SAMPLE_URL, SAMPLE_HTML, dict(wanted_list=['Product 2', '$13.99', '/products/2'])),
+    (SAMPLE_URL, SAMPLE_HTML, dict(wanted_list=['http://example.com/products/4', 'sale'])),
+    (SAMPLE_URL, SAMPLE_HTML, dict(wanted_dict={'name': ['Product 1'],
+                                                'price': [re.compile(r'\$1\d\.99')]})),
+    (BOOKS_URL, read_page('books.html'),
+     dict(wanted_list=['A Light in the Attic', '£51.77', 'In stock',
+                       'https://books.example.com/catalogue/a-light-in-the-attic_1000/'])),
+]
+
+
+def build(backend, url, html, wanted):
+    scraper = AutoScraper(backend=backend)
+    random.seed(0)
+    result = scraper.build(url=url, html=html, **wanted)
+    return result, scraper.stack_list
+
+
+@pytest.mark.parametrize('url, html, wanted', SAMPLES)
+def test_indexed_build_matches_full_scan(monkeypatch, backend, url, html, wanted):
+    indexed = build(backend, url, html, wanted)
+    assert indexed[0] and indexed[1]
+
+    # every element is scanned for every wanted item, as without the index
+    monkeypatch.setattr(BuildIndex, 'is_indexable', staticmethod(lambda text, ratio: False))
+    assert build(backend, url, html, wanted) == indexed
+
+
+def test_index_candidates(scraper):
+    backend = scraper.backend
+    soup = scraper._parse_html(SAMPLE_HTML)
+    elements = backend.iter_elements(soup)
+    index = BuildIndex(backend, get_text_cache(backend, soup), elements, SAMPLE_URL)
+
+    def names(text):
+        return [backend.get_name(elements[x]) for x in index.get_candidates(text)]
+
+    assert names('Product 3') == ['a', 'h3']
+    assert names('/products/3') == names('http://example.com/products/3') == ['a']
+    assert names('color: green') == ['span'] * 6
+    assert names('not in the page') == []
+
+
+def test_fuzzy_texts_are_not_indexed():
+    assert BuildIndex.is_indexable('text', 1.0)
+    assert not BuildIndex.is_indexable('text', 0.9)
+    assert not BuildIndex.is_indexable(re.compile('text'), 1.0)
@@ -0,0 +1,59 @@
+from pathlib import Path
+
+import pytest
+
+from autoscraper import AutoScraper
+
+from conftest import SAMPLE_HTML, SAMPLE_URL, make_listing, read_page
+
+BOOKS_URL = 'https://books.example.com/catalogue/'
+
+
+@pytest.fixture
+def samples(tmp_path):
+    path = tmp_path / 'books.html'
+    path.write_text(read_page('books.html'), encoding='utf-8')
+    return [
+        ((SAMPLE_URL, SAMPLE_HTML), ['Product 0', '$10.99']),
+        ((SAMPLE_URL, make_listing(items=3, offset=20)), {'link': ['/products/21']}),
+        (str(path), ['A Light in the Attic']),
+    ]
+
+
+def build_in_order(backend, samples):
+    scraper = AutoScraper(backend=backend)
+    results = []
+    for page, wanted in samples:
+        url, html = (None, Path(page).read_bytes()) if isinstance(page, str) else page
+        key = 'wanted_dict' if isinstance(wanted, dict) else 'wanted_list'
+        results.append(scraper.build(url=url, html=html, update=True, **{key: wanted}))
+    return scraper, results
+
+
+def without_ids(scraper):
+    return [{k: v for k, v in x.items() if k != 'stack_id'} for x in scraper.stack_list]
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_build_many_matches_builds_in_order(backend, samples, workers):
+    expected, expected_results = build_in_order(backend, samples)
+    scraper = AutoScraper(backend=backend)
+    assert scraper.build_many(samples, workers=workers) == expected_results
+    assert without_ids(scraper) == without_ids(expected)
+    assert all(expected_results)
+
+    stack_ids = [x['stack_id'] for x in scraper.stack_list]
+    assert len(set(stack_ids)) == len(stack_ids)
+    assert scraper.get_result_similar(url=SAMPLE_URL, html=SAMPLE_HTML, group_by_alias=True) == \
+        expected.get_result_similar(url=SAMPLE_URL, html=SAMPLE_HTML, group_by_alias=True)
+
+
+def test_build_many_update(scraper, samples):
+    before = without_ids(scraper)
+    scraper.build_many(samples[1:], workers=1, update=True)
+    assert without_ids(scraper)[:len(before)] == before
+    assert len(scraper.stack_list) > len(before)
+
+    scraper.build_many(samples[2:], workers=1)
+    assert 'Product 0' not in scraper.get_result_similar(url=SAMPLE_URL, html=SAMPLE_HTML)
+    assert scraper.get_result_similar(html=read_page('books.html'))[0] == 'A Light in the Attic'
@@ -0,0 +1,45 @@
+from autoscraper import AutoScraper
+
+from conftest import SAMPLE_HTML, SAMPLE_URL, WANTED
+
+
+def make_rows(texts, columns=1):
+    rows = ''.join('<div class="row">%s</div>' % ''.join('<span>%s</span>' % x
+                                                          for _ in range(columns))
+                   for x in texts)
+    return '<html><body><div class="list">%s</div></body></html>' % rows
+
+
+def get_row_indexes(scraper):
+    return sorted(x['content'][2][2] for x in scraper.stack_list)
+
+
+def test_identical_siblings_get_their_own_index(backend):
+    scraper = AutoScraper(backend=backend)
+    assert scraper.build(html=make_rows(['dup'] * 4), wanted_list=['dup']) == ['dup']
+    assert get_row_indexes(scraper) == [0, 1, 2, 3]
+
+    # each rule selects its own row of another page
+    html = make_rows(['row %d' % i for i in range(4)])
+    exact = scraper.get_result_exact(html=html, grouped=True)
+    assert sorted(v[0] for v in exact.values()) == ['row 0', 'row 1', 'row 2', 'row 3']
+    for stack in scraper.stack_list:
+        assert exact[stack['stack_id']] == ['row %d' % stack['content'][2][2]]
+
+
+def test_wide_grid(backend):
+    texts = ['cell'] * 100 + ['other %d' % i for i in range(5)]
+    html = make_rows(texts, columns=3)
+    scraper = AutoScraper(backend=backend)
+    assert scraper.build(html=html, wanted_list=['cell']) == ['cell', 'other 0', 'other 1',
+                                                              'other 2', 'other 3', 'other 4']
+    # a rule per cell
+    assert get_row_indexes(scraper) == sorted(list(range(100)) * 3)
+    assert scraper.get_result_similar(html=html) == ['cell'] + ['other %d' % i for i in range(5)]
+
+
+def test_build_results_keep_their_order(scraper):
+    result = AutoScraper(backend=scraper.backend).build(url=SAMPLE_URL, html=SAMPLE_HTML,
+                                                        wanted_list=WANTED)
+    assert result == scraper.get_result_similar(url=SAMPLE_URL, html=SAMPLE_HTML)
+    assert result[:3] == ['Product 0', 'Product 1', 'Product 2']
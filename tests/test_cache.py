@@ -0,0 +1,81 @@
+from autoscraper import AutoScraper, PageCache
+
+from conftest import WANTED, make_listing
+
+
+def make_scraper(local_server, cache, backend='bs4'):
+    local_server.routes['/sample'] = (200, {}, make_listing())
+    scraper = AutoScraper(backend=backend, cache=cache)
+    scraper.build(url=local_server.url('/sample'), wanted_list=WANTED)
+    return scraper
+
+
+def test_page_is_fetched_once(local_server, backend):
+    scraper = make_scraper(local_server, PageCache(), backend)
+    local_server.routes['/page'] = (200, {}, make_listing(offset=3))
+    url = local_server.url('/page')
+    similar = scraper.get_result_similar(url)
+    exact = scraper.get_result_exact(url)
+    assert 'Product 3' in similar and exact
+    assert scraper.get_result_similar(url) == similar
+    assert local_server.hits('/page') == 1
+
+
+def test_error_pages_are_not_cached(local_server):
+    scraper = make_scraper(local_server, PageCache())
+    local_server.routes['/flaky'] = (503, {}, make_listing(offset=100))
+    url = local_server.url('/flaky')
+    assert 'Product 100' in scraper.get_result_similar(url)
+
+    local_server.routes['/flaky'] = (200, {}, make_listing(offset=200))
+    assert 'Product 200' in scraper.get_result_similar(url)
+    assert local_server.hits('/flaky') == 2
+
+
+def test_error_pages_are_not_cached_with_directory(local_server, tmp_path):
+    scraper = make_scraper(local_server, PageCache(directory=str(tmp_path)))
+    local_server.routes['/flaky'] = (404, {}, make_listing(offset=100))
+    url = local_server.url('/flaky')
+    scraper.get_result_similar(url)
+
+    local_server.routes['/flaky'] = (200, {}, make_listing(offset=200))
+    assert 'Product 200' in scraper.get_result_similar(url)
+    assert 'Product 200' in scraper.get_result_similar(url)
+    assert local_server.hits('/flaky') == 2
+
+
+def test_saved_responses_are_revalidated(local_server, tmp_path):
+    def respond(headers):
+        if headers.get('If-None-Match') == '"v1"':
+            return 304, {}, ''
+        return 200, {'ETag': '"v1"'}, make_listing(offset=7)
+
+    local_server.routes['/etag'] = (200, {}, respond)
+    url = local_server.url('/etag')
+    scraper = make_scraper(local_server, PageCache(ttl=0, directory=str(tmp_path)))
+    first = scraper.get_result_similar(url)
+
+    # a new process reads the saved response, and only revalidates it
+    scraper.cache = PageCache(ttl=0, directory=str(tmp_path))
+    assert scraper.get_result_similar(url) == first
+    assert [x[1].get('If-None-Match') for x in local_server.requests if x[0] == '/etag'] == \
+        [None, '"v1"']
+
+
+def test_memory_budget(local_server):
+    cache = PageCache(max_bytes=len(make_listing()) + 10)
+    scraper = make_scraper(local_server, cache)
+    for path in ('/a', '/b'):
+        local_server.routes[path] = (200, {}, make_listing())
+        scraper.get_result_similar(local_server.url(path))
+    assert cache.size <= cache.max_bytes
+    scraper.get_result_similar(local_server.url('/a'))
+    assert local_server.hits('/a') == 2
+
+
+def test_html_pages_are_not_cached(local_server):
+    cache = PageCache()
+    scraper = make_scraper(local_server, cache)
+    size = cache.size
+    scraper.get_result_similar(html=make_listing(offset=50))
+    assert cache.size == size
@@ -0,0 +1,70 @@
+import gc
+import random
+import weakref
+
+from difflib import SequenceMatcher
+
+import pytest
+
+from autoscraper import AutoScraper
+from autoscraper.text_cache import get_text_cache
+from autoscraper.utils import FuzzyMatcher, FuzzyText, text_match
+
+from conftest import SAMPLE_URL, WANTED, make_listing
+
+
+def random_texts(rng, count):
+    alphabet = 'abcde fgh'
+    return [''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 12)))
+            for _ in range(count)]
+
+
+@pytest.mark.parametrize('ratio_limit', [0.3, 0.6, 0.8, 0.95])
+def test_fuzzy_matcher_decides_as_sequence_matcher(ratio_limit):
+    rng = random.Random(ratio_limit)
+    texts = random_texts(rng, 40)
+    for text in texts:
+        matcher = FuzzyMatcher(text, ratio_limit)
+        for other in texts:
+            expected = SequenceMatcher(None, text, other).ratio() >= ratio_limit
+            assert matcher.match(other) == expected
+            # cached decisions are the same
+            assert matcher.match(other) == expected
+
+
+def test_text_match():
+    assert text_match('price', 'price', 1.0)
+    assert not text_match('price', 'prices', 1.0)
+    assert text_match('price', 'prices', 0.8)
+    assert FuzzyText('product title', 0.8).search('product titles')
+
+
+def test_fuzzy_matchers_are_freed_with_the_document(backend):
+    scraper = AutoScraper(backend=backend)
+    document = scraper.backend.parse(make_listing())
+    matchers = get_text_cache(scraper.backend, document).fuzzy_matchers
+    assert text_match('Product 0!', 'Product 0', 0.9, matchers)
+    assert not text_match('Product 0!', 'Sale', 0.9, matchers)
+    assert list(matchers) == [('Product 0!', 0.9)]
+
+    matcher = weakref.ref(matchers[('Product 0!', 0.9)])
+    del document, matchers
+    gc.collect()
+    assert matcher() is None
+
+
+def test_text_fuzz_ratio_in_build(backend):
+    scraper = AutoScraper(backend=backend)
+    assert scraper.build(url=SAMPLE_URL, html=make_listing(), wanted_list=['Product 0!'],
+                         text_fuzz_ratio=1.0) == []
+    assert 'Product 0' in scraper.build(url=SAMPLE_URL, html=make_listing(),
+                                        wanted_list=['Product 0!'], text_fuzz_ratio=0.9)
+
+
+def test_attr_fuzz_ratio(backend):
+    scraper = AutoScraper(backend=backend)
+    scraper.build(url=SAMPLE_URL, html=make_listing(), wanted_list=WANTED)
+    changed = make_listing(items=4).replace('class="card"', 'class="cards"')
+    assert scraper.get_result_similar(url=SAMPLE_URL, html=changed) == []
+    assert scraper.get_result_similar(url=SAMPLE_URL, html=changed, attr_fuzz_ratio=0.8) == \
+        scraper.get_result_similar(url=SAMPLE_URL, html=make_listing(items=4))
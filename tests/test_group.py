@@ -0,0 +1,66 @@
+import pytest
+
+from autoscraper import AutoScraper, ScraperGroup
+
+from conftest import SAMPLE_HTML, SAMPLE_URL, make_listing
+
+OPTIONS = [dict(), dict(grouped=True), dict(group_by_alias=True), dict(unique=False),
+           dict(attr_fuzz_ratio=0.8)]
+SIMILAR_OPTIONS = [dict(keep_order=True), dict(contain_sibling_leaves=True)]
+
+
+@pytest.fixture
+def models(backend):
+    models = {}
+    for name, wanted in [('titles', ['Product 0']), ('prices', ['$10.99', 'new']),
+                         ('links', ['/products/0', 'Product 0'])]:
+        scraper = models[name] = AutoScraper(backend=backend)
+        scraper.build(url=SAMPLE_URL, html=SAMPLE_HTML, wanted_list=wanted)
+        scraper.set_rule_aliases({x['stack_id']: name for x in scraper.stack_list})
+    return models
+
+
+@pytest.mark.parametrize('options', OPTIONS + SIMILAR_OPTIONS)
+def test_group_matches_its_models(models, backend, options):
+    group = ScraperGroup(models, backend=backend)
+    html = make_listing(items=4, offset=3)
+    assert group.get_result_similar(url=SAMPLE_URL, html=html, **options) == \
+        {k: v.get_result_similar(url=SAMPLE_URL, html=html, **options)
+         for k, v in models.items()}
+    if options not in SIMILAR_OPTIONS:
+        assert group.get_result_exact(url=SAMPLE_URL, html=html, **options) == \
+            {k: v.get_result_exact(url=SAMPLE_URL, html=html, **options)
+             for k, v in models.items()}
+        assert group.get_result(url=SAMPLE_URL, html=html, **options) == \
+            {k: v.get_result(url=SAMPLE_URL, html=html, **options) for k, v in models.items()}
+
+
+def test_page_is_parsed_once(models, backend, monkeypatch):
+    group = ScraperGroup(models, backend=backend)
+    parse = group.backend.parse
+    calls = []
+    monkeypatch.setattr(group.backend, 'parse', lambda *args: calls.append(1) or parse(*args))
+    result = group.get_result(url=SAMPLE_URL, html=SAMPLE_HTML)
+    assert len(calls) == 1
+    assert result['titles'][0][:2] == ['Product 0', 'Product 1']
+
+
+def test_models_loaded_from_files(models, tmp_path):
+    paths = []
+    for name, scraper in models.items():
+        paths.append(str(tmp_path / ('%s.json' % name)))
+        scraper.save(paths[-1])
+    group = ScraperGroup(paths)
+    assert list(group.models) == list(models)
+    assert group.get_result_similar(url=SAMPLE_URL, html=SAMPLE_HTML) == \
+        {k: v.get_result_similar(url=SAMPLE_URL, html=SAMPLE_HTML) for k, v in models.items()}
+
+
+def test_group_follows_rule_changes(models, backend):
+    group = ScraperGroup(models, backend=backend)
+    group.get_result_similar(url=SAMPLE_URL, html=SAMPLE_HTML)
+    prices = models['prices']
+    prices.keep_rules([prices.stack_list[0]['stack_id']])
+    assert 'new' not in prices.get_result_similar(url=SAMPLE_URL, html=SAMPLE_HTML)
+    assert group.get_result_similar(url=SAMPLE_URL, html=SAMPLE_HTML)['prices'] == \
+        prices.get_result_similar(url=SAMPLE_URL, html=SAMPLE_HTML)
@@ -0,0 +1,76 @@
+import pytest
+
+from autoscraper import AutoScraper, ScrapeStats
+
+from conftest import SAMPLE_HTML, SAMPLE_URL, WANTED, make_listing
+
+OPTIONS = [dict(), dict(grouped=True), dict(group_by_alias=True), dict(unique=False),
+           dict(attr_fuzz_ratio=0.8)]
+SIMILAR_OPTIONS = [dict(keep_order=True), dict(contain_sibling_leaves=True)]
+
+
+@pytest.mark.parametrize('options', OPTIONS + SIMILAR_OPTIONS)
+def test_instrumented_results_are_the_same(scraper, options):
+    html = make_listing(items=4, offset=5)
+    methods = [scraper.get_result_similar]
+    if options not in SIMILAR_OPTIONS:
+        methods.append(scraper.get_result_exact)
+    expected = [x(url=SAMPLE_URL, html=html, **options) for x in methods]
+    scraper.add_hook(ScrapeStats())
+    assert [x(url=SAMPLE_URL, html=html, **options) for x in methods] == expected
+
+
+def test_phases_of_a_call(scraper):
+    events = []
+    scraper.add_hook(lambda phase, seconds, info: events.append((phase, seconds, info)))
+    scraper.get_result_similar(url=SAMPLE_URL, html=SAMPLE_HTML)
+
+    assert [x[0] for x in events] == \
+        ['normalize', 'parse', 'rules'] + ['rule'] * len(scraper.stack_list) + ['clean']
+    assert all(x[1] >= 0 for x in events)
+    assert set(events[2][2]) == {'find_all_calls', 'nodes_visited'}
+    assert [x[2]['stack_id'] for x in events if x[0] == 'rule'] == \
+        [x['stack_id'] for x in scraper.stack_list]
+
+    del events[:]
+    scraper.build(url=SAMPLE_URL, html=SAMPLE_HTML, wanted_list=WANTED)
+    assert [x[0] for x in events] == ['normalize', 'parse']
+
+
+def test_scrape_stats(scraper):
+    stats = scraper.add_hook(ScrapeStats())
+    scraper.stack_list.append(dict(content=[('html', {}, 0), ('body', {}, 0), ('nav', {})],
+                                   wanted_attr=None, is_full_url=False, stack_id='rule_dead'))
+    for offset in (0, 10):
+        scraper.get_result_similar(url=SAMPLE_URL, html=make_listing(items=3, offset=offset))
+
+    assert stats.phases['parse'].calls == stats.phases['clean'].calls == 2
+    assert stats.rules['rule_dead'].calls == 2 and stats.rules['rule_dead'].empty_calls == 2
+    assert stats.dead_rules() == ['rule_dead']
+    assert stats.dead_rules(['rule_dead', 'rule_other']) == ['rule_dead', 'rule_other']
+    for stack in scraper.stack_list[:-1]:
+        assert stats.rules[stack['stack_id']].matches == 6
+    assert len(stats.slowest_rules(2)) == 2
+    assert set(stats.to_dict()) == {'phases', 'rules', 'counts'}
+    # rules evaluated with XPath don't count their calls
+    assert (stats.counts['find_all_calls'] > 0) == (scraper.backend.name == 'bs4')
+
+    stats.reset()
+    assert not stats.rules and not stats.phases
+
+
+def test_remove_hook(scraper):
+    stats = scraper.add_hook(ScrapeStats())
+    scraper.remove_hook(stats)
+    scraper.get_result_similar(url=SAMPLE_URL, html=SAMPLE_HTML)
+    assert not stats.phases and not stats.rules
+
+
+def test_hooks_of_shared_scrapers():
+    stats = ScrapeStats()
+    scrapers = [AutoScraper(backend=x) for x in ('bs4', 'lxml')]
+    for scraper in scrapers:
+        scraper.build(url=SAMPLE_URL, html=SAMPLE_HTML, wanted_list=WANTED)
+        scraper.add_hook(stats)
+        scraper.get_result_exact(url=SAMPLE_URL, html=SAMPLE_HTML)
+    assert stats.phases['rules'].calls == 2
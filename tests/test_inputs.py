@@ -0,0 +1,61 @@
+import io
+import mmap
+import pathlib
+
+import pytest
+
+from autoscraper import AutoScraper
+from autoscraper.utils import normalize
+
+from conftest import SAMPLE_URL, make_listing
+
+LATIN_PAGE = ('<html><head><meta charset="windows-1252"><title>Caf\xe9</title></head><body>'
+              '<div><span>Caf\xe9 cr\xe8me</span><span>3 \u20ac</span></div>'
+              '<div><span>Cr\xeape</span><span>4 \u20ac</span></div>'
+              '</body></html>')
+ITEMS = [normalize('Caf\xe9 cr\xe8me'), normalize('Cr\xeape')]
+
+
+@pytest.fixture
+def latin_file(tmp_path):
+    path = tmp_path / 'latin.html'
+    path.write_bytes(LATIN_PAGE.encode('cp1252'))
+    return path
+
+
+def test_html_inputs_give_the_same_results(scraper, tmp_path):
+    html = make_listing(items=5, offset=20)
+    expected = scraper.get_result_similar(url=SAMPLE_URL, html=html)
+    path = tmp_path / 'page.html'
+    path.write_text(html, encoding='utf-8')
+    data = html.encode('utf-8')
+
+    inputs = [data, bytearray(data), memoryview(data), path, io.BytesIO(data),
+              io.StringIO(html), ('﻿' + html).encode('utf-16')]
+    for html_input in inputs:
+        assert scraper.get_result_similar(url=SAMPLE_URL, html=html_input) == expected
+
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+        assert scraper.get_result_similar(url=SAMPLE_URL, html=m) == expected
+
+
+def test_declared_encoding(latin_file, backend):
+    scraper = AutoScraper(backend=backend)
+    assert scraper.build(html=latin_file, wanted_list=['Caf\xe9 cr\xe8me']) == ITEMS
+    assert scraper.get_result_similar(html=latin_file.read_bytes()) == ITEMS
+
+
+def test_batch_reads_files_in_their_encoding(latin_file):
+    scraper = AutoScraper()
+    scraper.build(html=LATIN_PAGE, wanted_list=['Caf\xe9 cr\xe8me'])
+    result, = scraper.get_results_batch([str(latin_file)], workers=1)
+    assert result.error is None
+    assert result.result == ITEMS
+
+
+def test_build_many_and_optimize_read_files_in_their_encoding(latin_file):
+    scraper = AutoScraper()
+    results = scraper.build_many([(pathlib.Path(latin_file), ['Cr\xeape'])], workers=1)
+    assert results == [ITEMS]
+    scraper.optimize([str(latin_file)], repeat=1)
+    assert scraper.get_result_similar(html=latin_file) == ITEMS
@@ -0,0 +1,85 @@
+import pytest
+
+from autoscraper import AutoScraper
+from autoscraper.utils import SeenSet
+
+from conftest import SAMPLE_URL, make_listing
+from test_backends import FIXTURES, build
+
+OPTIONS = [dict(), dict(contain_sibling_leaves=True), dict(attr_fuzz_ratio=0.7)]
+
+
+def group(items, key):
+    grouped = {}
+    for item in items:
+        grouped.setdefault(item[key], []).append(item[2])
+    return grouped
+
+
+@pytest.mark.parametrize('fixture', FIXTURES, ids=lambda x: x.name)
+@pytest.mark.parametrize('options', OPTIONS)
+def test_iter_matches_get_result_similar(fixture, backend, options):
+    scraper, _ = build(fixture, backend)
+    aliases = {x['stack_id']: 'field %d' % (i % 2) for i, x in enumerate(scraper.stack_list)}
+    scraper.set_rule_aliases(aliases)
+    args = dict(url=fixture.url, html=fixture.scrape_html, **options)
+
+    items = list(scraper.iter_result_similar(**args))
+    assert items
+    assert [x[2] for x in items] == scraper.get_result_similar(keep_order=True, **args)
+    assert all(aliases[x[1]] == x[0] for x in items)
+
+    items = list(scraper.iter_result_similar(unique=False, **args))
+    assert [x[2] for x in items] == \
+        scraper.get_result_similar(keep_order=True, unique=False, **args)
+    grouped = scraper.get_result_similar(grouped=True, unique=False, **args)
+    assert group(items, 1) == {k: v for k, v in grouped.items() if v}
+    by_alias = scraper.get_result_similar(group_by_alias=True, keep_order=True, unique=False,
+                                          **args)
+    assert group(items, 0) == {k: v for k, v in by_alias.items() if v}
+
+
+@pytest.mark.parametrize('fixture', FIXTURES, ids=lambda x: x.name)
+def test_iter_matches_get_result_exact(fixture, backend):
+    scraper, _ = build(fixture, backend)
+    args = dict(url=fixture.url, html=fixture.scrape_html)
+    items = list(scraper.iter_result_exact(**args))
+    assert sorted(x[2] for x in items) == sorted(scraper.get_result_exact(**args))
+    assert group(list(scraper.iter_result_exact(unique=False, **args)), 1) == \
+        {k: v for k, v in scraper.get_result_exact(grouped=True, unique=False, **args).items()
+         if v}
+
+
+def test_results_are_extracted_lazily(scraper, monkeypatch):
+    html = make_listing(items=50)
+    calls = []
+    fetch_result = scraper._fetch_result_from_child
+    monkeypatch.setattr(scraper, '_fetch_result_from_child',
+                        lambda *args: calls.append(1) or fetch_result(*args))
+    items = scraper.iter_result_similar(url=SAMPLE_URL, html=html)
+    assert next(items)[2] == 'Product 0'
+    first_calls = len(calls)
+    assert first_calls < 10
+    assert len(list(items)) == 149 and len(calls) > first_calls
+
+
+def test_max_seen(backend):
+    html = make_listing(items=6)
+    scraper = AutoScraper(backend=backend)
+    scraper.build(url=SAMPLE_URL, html=html, wanted_list=['new'])
+    assert [x[2] for x in scraper.iter_result_similar(url=SAMPLE_URL, html=html)] == \
+        ['new', 'sale']
+    assert [x[2] for x in scraper.iter_result_similar(url=SAMPLE_URL, html=html,
+                                                      max_seen=1)] == \
+        ['new', 'sale'] * 3
+
+
+def test_seen_set():
+    seen = SeenSet()
+    assert seen.add('a') and seen.add('b') and not seen.add('a')
+
+    seen = SeenSet(max_size=2)
+    assert seen.add('a') and seen.add('b')
+    assert not seen.add('a')
+    # 'b' is the least recently seen value
+    assert seen.add('c') and seen.add('b') and not seen.add('c')
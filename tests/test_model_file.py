@@ -0,0 +1,100 @@
+import json
+import struct
+
+import pytest
+
+from autoscraper import AutoScraper
+from autoscraper import model_file as model_file_module
+from autoscraper.model_file import ModelFile, is_model_file
+
+from conftest import SAMPLE_HTML, SAMPLE_URL, make_listing
+
+
+@pytest.fixture
+def models(backend):
+    models = {}
+    for name, wanted in [('titles', ['Product 0']), ('prices', ['$10.99', 'new'])]:
+        scraper = models[name] = AutoScraper(backend=backend)
+        scraper.build(url=SAMPLE_URL, html=SAMPLE_HTML, wanted_list=wanted)
+    return models
+
+
+def saved_rules(scraper):
+    return json.loads(json.dumps(scraper.stack_list))
+
+
+def test_values_round_trip(tmp_path):
+    stack_list = [
+        dict(content=[('html', {'class': ['a', 'b'], 'style': ''}, 0),
+                      ('p', {'data-x': 'ü 漢字', 'class': ''})],
+             wanted_attr='href', is_full_url=True, is_non_rec_text=False, url='http://x/',
+             hash='not a digest', stack_id='rule_a', alias='name',
+             custom={'ratio': 0.5, 'count': -3, 'items': [None, True, 'x']}),
+        dict(content=[('html', {}, 0), ('div', {})], wanted_attr=None, is_full_url=None,
+             hash='ab' * 32, stack_id='rule_b'),
+    ]
+    scraper = AutoScraper(stack_list)
+    path = str(tmp_path / 'model.bin')
+    scraper.save(path, format='binary')
+    assert is_model_file(path)
+
+    loaded = AutoScraper()
+    loaded.load(path)
+    assert saved_rules(loaded) == saved_rules(scraper)
+
+
+def test_rules_are_decoded_on_first_use(models, tmp_path, monkeypatch):
+    path = str(tmp_path / 'model.bin')
+    models['titles'].save(path, format='binary')
+    calls = []
+    get_stack_list = ModelFile.get_stack_list
+    monkeypatch.setattr(ModelFile, 'get_stack_list',
+                        lambda self, name=None: calls.append(name) or get_stack_list(self, name))
+
+    loaded = AutoScraper()
+    loaded.load(path)
+    assert calls == []
+    html = make_listing(items=3, offset=4)
+    assert loaded.get_result_similar(url=SAMPLE_URL, html=html) == \
+        models['titles'].get_result_similar(url=SAMPLE_URL, html=html)
+    loaded.get_result_exact(url=SAMPLE_URL, html=html)
+    assert calls == ['']
+
+
+@pytest.mark.parametrize('mmap_min_size', [0, model_file_module.MMAP_MIN_SIZE])
+def test_bundle_of_models(models, backend, tmp_path, monkeypatch, mmap_min_size):
+    monkeypatch.setattr(model_file_module, 'MMAP_MIN_SIZE', mmap_min_size)
+    path = str(tmp_path / 'models.bin')
+    AutoScraper.save_models(path, models)
+
+    loaded = AutoScraper.load_models(path, backend=backend)
+    assert list(loaded) == list(models)
+    for name, scraper in loaded.items():
+        assert scraper.backend.name == backend
+        assert saved_rules(scraper) == saved_rules(models[name])
+
+    single = AutoScraper()
+    single.load(path, name='prices')
+    assert saved_rules(single) == saved_rules(models['prices'])
+    with pytest.raises(ValueError):
+        AutoScraper().load(path)
+    with pytest.raises(KeyError):
+        AutoScraper().load(path, name='reviews')
+
+
+def test_invalid_files(models, tmp_path):
+    path = str(tmp_path / 'model.bin')
+    models['titles'].save(path, format='binary')
+    with open(path, 'r+b') as f:
+        f.seek(4)
+        f.write(struct.pack('<H', model_file_module.VERSION + 1))
+    with pytest.raises(ValueError):
+        AutoScraper().load(path)
+
+    json_path = str(tmp_path / 'model.json')
+    models['titles'].save(json_path)
+    assert not is_model_file(json_path)
+    with pytest.raises(ValueError):
+        ModelFile(json_path)
+    with pytest.raises(ValueError):
+        models['titles'].save(json_path, format='yaml')
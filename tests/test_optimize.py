@@ -0,0 +1,62 @@
+from autoscraper import AutoScraper
+from autoscraper.rule import Rule
+
+from conftest import SAMPLE_URL, make_listing
+
+PAGES = [(SAMPLE_URL, make_listing(items=6)), (SAMPLE_URL, make_listing(items=4, offset=30))]
+
+
+OTHER_HTML = '<html><body><div><em>other thing</em><p>x</p></div></body></html>'
+
+
+def redundant_scraper(backend):
+    scraper = AutoScraper(backend=backend)
+    scraper.build(url=SAMPLE_URL, html=make_listing(), wanted_list=['Product 0', '$10.99'])
+    # a rule learned on another layout, and a copy of a rule under another id
+    scraper.build(html=OTHER_HTML, wanted_list=['other thing'], update=True)
+    rule = scraper.stack_list[0]
+    scraper.stack_list.append(Rule(dict(rule, stack_id='rule_copy', hash='copy')))
+    return scraper
+
+
+def get_results(scraper):
+    results = []
+    for url, html in PAGES:
+        results.append(scraper.get_result_similar(url=url, html=html, keep_order=True))
+        results.append(scraper.get_result_similar(url=url, html=html, group_by_alias=True,
+                                                  unique=True))
+        results.append(scraper.get_result_exact(url=url, html=html, group_by_alias=True,
+                                                unique=True))
+    return results
+
+
+def test_optimize_keeps_unique_results(backend):
+    scraper = redundant_scraper(backend)
+    before = get_results(scraper)
+    rules_before = len(scraper.stack_list)
+
+    report = scraper.optimize(PAGES, repeat=1)
+    assert report['rules_before'] == rules_before
+    assert report['rules_after'] == len(scraper.stack_list) < rules_before
+    assert 'unmatched' in report['removed'].values()
+    assert report['removed'].get('rule_copy', '').startswith('duplicate') or \
+        report['removed'].get(scraper.stack_list[0]['stack_id'])
+    assert get_results(scraper) == before
+
+
+def test_optimize_changes_results_grouped_by_rule():
+    # the documented exception: removed rules disappear from results grouped by rule
+    scraper = redundant_scraper('bs4')
+    url, html = PAGES[0]
+    before = scraper.get_result_similar(url=url, html=html, grouped=True)
+    scraper.optimize(PAGES, repeat=1)
+    after = scraper.get_result_similar(url=url, html=html, grouped=True)
+    assert set(after) < set(before)
+    assert all(after[key] == before[key] for key in after)
+
+
+def test_optimize_keeps_unmatched_rules_if_asked():
+    scraper = redundant_scraper('bs4')
+    report = scraper.optimize(PAGES, remove_unmatched=False, repeat=1)
+    assert 'unmatched' not in report['removed'].values()
+    assert scraper.get_result_similar(html=OTHER_HTML) == ['other thing']
@@ -0,0 +1,57 @@
+import pytest
+
+from autoscraper import AutoScraper, PageCache, ResultCache
+from autoscraper.backends import SoupBackend
+
+from test_backends import EXACT_OPTIONS, FIXTURES, SIMILAR_OPTIONS, build
+
+
+@pytest.mark.parametrize('fixture', FIXTURES, ids=lambda x: x.name)
+def test_partial_parse_gives_the_same_results(fixture, backend):
+    full, _ = build(fixture, backend)
+    partial = AutoScraper(full.stack_list, backend=backend, partial_parse=True)
+    args = dict(url=fixture.url, html=fixture.scrape_html)
+    assert partial.get_result_similar(**args)
+
+    for options in SIMILAR_OPTIONS:
+        assert partial.get_result_similar(**args, **options) == \
+            full.get_result_similar(**args, **options)
+    for options in EXACT_OPTIONS:
+        assert partial.get_result_exact(**args, **options) == \
+            full.get_result_exact(**args, **options)
+    assert partial.get_result(**args, group_by_alias=True) == \
+        full.get_result(**args, group_by_alias=True)
+    assert list(partial.iter_result_similar(**args)) == list(full.iter_result_similar(**args))
+
+
+@pytest.mark.parametrize('fixture', FIXTURES[:1], ids=lambda x: x.name)
+def test_partial_tree_is_smaller(fixture):
+    scraper, _ = build(fixture, 'bs4')
+    scraper.partial_parse = True
+    path_filter = scraper._get_path_filter(1.0)
+    partial = SoupBackend.parse(fixture.scrape_html, path_filter)
+    full = SoupBackend.parse(fixture.scrape_html)
+    assert len(SoupBackend.iter_elements(partial)) < len(SoupBackend.iter_elements(full))
+    assert full.find('nav') and full.find('footer')
+    assert partial.find('nav') is None and partial.find('footer') is None
+    assert scraper._get_path_filter(1.0) is path_filter
+    assert scraper._get_path_filter(0.8) is not path_filter
+
+
+def test_partial_parse_with_caches(local_server):
+    fixture = FIXTURES[0]
+    local_server.routes['/page'] = (200, {}, fixture.scrape_html)
+    url = local_server.url('/page')
+    full, _ = build(fixture, 'bs4')
+    expected = full.get_result_similar(url=url, html=fixture.scrape_html)
+
+    # pages parsed partially for other rules are not reused
+    cache = PageCache()
+    scrapers = [AutoScraper(full.stack_list[:1], cache=cache, partial_parse=True),
+                AutoScraper(full.stack_list, cache=cache, partial_parse=True),
+                AutoScraper(full.stack_list, cache=cache,
+                            result_cache=ResultCache(fingerprint='subtrees'))]
+    results = [x.get_result_similar(url=url, grouped=True) for x in scrapers]
+    assert results[1] == results[2]
+    assert results[0] == {k: v for k, v in results[1].items() if k in results[0]}
+    assert sorted(set(sum(results[1].values(), []))) == sorted(expected)
@@ -0,0 +1,73 @@
+import json
+
+from autoscraper import AutoScraper
+
+from conftest import SAMPLE_HTML, SAMPLE_URL, make_listing
+
+# the cards of the listing were renamed
+DRIFTED_HTML = make_listing(items=4, offset=0).replace('class="card"', 'class="product"')
+
+
+def build(backend, wanted=('Product 0', '$10.99')):
+    scraper = AutoScraper(backend=backend)
+    scraper.build(url=SAMPLE_URL, html=SAMPLE_HTML, wanted_list=list(wanted))
+    scraper.set_rule_aliases({x['stack_id']: 'field %d' % i
+                              for i, x in enumerate(scraper.stack_list)})
+    return scraper
+
+
+def rules(scraper):
+    return json.dumps(scraper.stack_list)
+
+
+def test_unchanged_page(backend):
+    scraper = build(backend)
+    before = rules(scraper)
+    status = scraper.repair_rules(url=SAMPLE_URL, html=make_listing(items=3, offset=8))
+    assert set(status.values()) == {'ok'}
+    assert rules(scraper) == before
+
+
+def test_drifted_rules_are_relearned(backend):
+    scraper = build(backend)
+    ids = [(x['stack_id'], x['alias'], x['sample']) for x in scraper.stack_list]
+    assert scraper.get_result_similar(url=SAMPLE_URL, html=DRIFTED_HTML) == []
+
+    status = scraper.repair_rules(url=SAMPLE_URL, html=DRIFTED_HTML)
+    assert status == {x[0]: 'repaired' for x in ids}
+    assert [(x['stack_id'], x['alias'], x['sample']) for x in scraper.stack_list] == ids
+    assert all('product' in str(x['content']) for x in scraper.stack_list)
+
+    fresh = AutoScraper(backend=backend)
+    fresh.build(url=SAMPLE_URL, html=DRIFTED_HTML, wanted_list=['Product 0', '$10.99'])
+    assert scraper.get_result_similar(url=SAMPLE_URL, html=DRIFTED_HTML) == \
+        fresh.get_result_similar(url=SAMPLE_URL, html=DRIFTED_HTML)
+    assert scraper.get_result_similar(url=SAMPLE_URL, html=DRIFTED_HTML,
+                                      group_by_alias=True)['field 0'][:2] == \
+        ['Product 0', 'Product 1']
+
+
+def test_samples_of_the_new_page(backend):
+    scraper = build(backend, wanted=['Product 0'])
+    stack_id = scraper.stack_list[0]['stack_id']
+    html = DRIFTED_HTML.replace('Product 0', 'Renamed 0')
+
+    status = scraper.repair_rules(url=SAMPLE_URL, html=html, samples={stack_id: 'Renamed 0'})
+    assert status[stack_id] == 'repaired'
+    assert scraper.stack_list[0]['sample'] == 'Renamed 0'
+    assert scraper.get_result_similar(url=SAMPLE_URL, html=html)[:2] == ['Renamed 0', 'Product 1']
+
+    # a sample missing from the page breaks the rule even if it has results
+    status = scraper.repair_rules(url=SAMPLE_URL, html=html, samples={stack_id: 'Missing'})
+    assert status[stack_id] == 'broken'
+    assert scraper.stack_list[0]['sample'] == 'Renamed 0'
+
+
+def test_rules_without_sample_stay_broken(backend):
+    scraper = build(backend)
+    for stack in scraper.stack_list:
+        del stack['sample']
+    before = rules(scraper)
+    status = scraper.repair_rules(url=SAMPLE_URL, html=DRIFTED_HTML)
+    assert set(status.values()) == {'broken'}
+    assert rules(scraper) == before
@@ -0,0 +1,144 @@
+import os
+
+import pytest
+
+from autoscraper import AutoScraper, ResultCache
+from autoscraper.result_cache import DiskResultStore, MemoryResultStore
+
+from conftest import SAMPLE_HTML, SAMPLE_URL, WANTED, make_listing
+
+
+def make_scraper(backend='bs4', **kwargs):
+    scraper = AutoScraper(backend=backend, result_cache=ResultCache(**kwargs))
+    scraper.build(url=SAMPLE_URL, html=SAMPLE_HTML, wanted_list=WANTED)
+    return scraper
+
+
+def count_scrapes(scraper, monkeypatch):
+    calls = []
+    collect_results = scraper._collect_results
+    monkeypatch.setattr(scraper, '_collect_results',
+                        lambda *args, **kwargs: calls.append(1) or collect_results(*args, **kwargs))
+    return calls
+
+
+@pytest.mark.parametrize('fingerprint', ['page', 'subtrees'])
+def test_cached_results_are_the_same(backend, fingerprint):
+    scraper = make_scraper(backend, fingerprint=fingerprint)
+    uncached = AutoScraper(scraper.stack_list, backend=backend)
+    html = make_listing(items=4, offset=3)
+    calls = [
+        ('get_result_similar', dict()), ('get_result_similar', dict(grouped=True)),
+        ('get_result_similar', dict(group_by_alias=True, keep_order=True)),
+        ('get_result_exact', dict(unique=False)), ('get_result', dict(group_by_alias=True)),
+        ('get_result_similar', dict(attr_fuzz_ratio=0.8)),
+    ]
+    for _ in range(2):
+        for name, options in calls:
+            assert getattr(scraper, name)(url=SAMPLE_URL, html=html, **options) == \
+                getattr(uncached, name)(url=SAMPLE_URL, html=html, **options)
+    assert scraper.result_cache.misses == len(calls)
+    assert scraper.result_cache.hits == len(calls)
+    assert isinstance(scraper.get_result(url=SAMPLE_URL, html=html), tuple)
+
+
+@pytest.mark.parametrize('options', [dict(group_by_alias=True), dict(grouped=True)])
+def test_cached_groups_keep_their_order(options):
+    scraper = make_scraper()
+    scraper.set_rule_aliases({x['stack_id']: alias for x, alias
+                              in zip(scraper.stack_list, ['zeta', 'alpha', 'mid'])})
+    uncached = AutoScraper(scraper.stack_list)
+    html = make_listing(items=4)
+    expected = uncached.get_result_similar(url=SAMPLE_URL, html=html, **options)
+    assert list(expected) != sorted(expected)
+    for _ in range(2):
+        result = scraper.get_result_similar(url=SAMPLE_URL, html=html, **options)
+        assert list(result.items()) == list(expected.items())
+    assert scraper.result_cache.hits == 1
+
+
+def test_page_fingerprint(monkeypatch):
+    scraper = make_scraper()
+    calls = count_scrapes(scraper, monkeypatch)
+    html = make_listing(items=3)
+    first = scraper.get_result_similar(url=SAMPLE_URL, html=html)
+    assert scraper.get_result_similar(url=SAMPLE_URL, html=html.encode('utf-8')) == first
+    assert len(calls) == 1
+
+    # any change of the page, the url or the rules is a miss
+    scraper.get_result_similar(url=SAMPLE_URL, html=html.replace('Shop', 'Store'))
+    scraper.get_result_similar(url=SAMPLE_URL + '/2', html=html)
+    scraper.keep_rules([scraper.stack_list[0]['stack_id']])
+    scraper.get_result_similar(url=SAMPLE_URL, html=html)
+    assert len(calls) == 4
+
+    # parsed pages are not cached
+    scraper.get_result_similar(url=SAMPLE_URL, soup=scraper._parse_html(html))
+    assert scraper.result_cache.hits == 1 and scraper.result_cache.misses == 4
+
+
+def test_subtrees_fingerprint(backend, monkeypatch):
+    scraper = make_scraper(backend, fingerprint='subtrees')
+    calls = count_scrapes(scraper, monkeypatch)
+    html = make_listing(items=3)
+    first = scraper.get_result_similar(url=SAMPLE_URL, html=html)
+
+    # elements the rules can't reach may change
+    changed = html.replace('<h1>Shop</h1>', '<h1>Store</h1><p>news</p>')
+    assert scraper.get_result_similar(url=SAMPLE_URL, html=changed) == first
+    assert len(calls) == 1
+
+    changed = html.replace('Product 1', 'Product one')
+    assert 'Product one' in scraper.get_result_similar(url=SAMPLE_URL, html=changed)
+    assert len(calls) == 2
+
+
+def test_pages_fetched_from_their_url(local_server):
+    local_server.routes['/shop'] = (200, {}, make_listing(items=3))
+    scraper = make_scraper()
+    url = local_server.url('/shop')
+    assert scraper.get_result_similar(url=url) == scraper.get_result_similar(url=url)
+    assert local_server.hits('/shop') == 2
+    assert scraper.result_cache.hits == 1
+
+
+def test_memory_store_budget():
+    store = MemoryResultStore(max_bytes=10)
+    store.set('a', b'12345')
+    store.set('b', b'12345')
+    assert store.get('a') == b'12345'
+    store.set('c', b'123')
+    assert store.get('b') is None and store.get('a') and store.get('c')
+    store.set('d', b'x' * 11)
+    assert store.get('d') is None and store.size == 8
+    store.clear()
+    assert store.get('a') is None and store.size == 0
+
+
+def test_disk_store(tmp_path):
+    directory = str(tmp_path / 'results')
+    scraper = AutoScraper(result_cache=ResultCache(store=DiskResultStore(directory)))
+    scraper.build(url=SAMPLE_URL, html=SAMPLE_HTML, wanted_list=WANTED)
+    first = scraper.get_result_similar(url=SAMPLE_URL, html=SAMPLE_HTML, group_by_alias=True)
+    assert len(os.listdir(directory)) == 1
+
+    # results are kept by a new cache on the same directory
+    scraper.result_cache = ResultCache(store=DiskResultStore(directory))
+    assert scraper.get_result_similar(url=SAMPLE_URL, html=SAMPLE_HTML,
+                                      group_by_alias=True) == first
+    assert scraper.result_cache.hits == 1
+
+    size = scraper.result_cache.store.size
+    store = DiskResultStore(directory, max_bytes=size * 2 + 1)
+    scraper.result_cache = ResultCache(store=store)
+    for offset in range(3):
+        scraper.get_result_similar(url=SAMPLE_URL, html=make_listing(offset=offset),
+                                   group_by_alias=True)
+    assert store.size <= store.max_bytes and len(os.listdir(directory)) == 2
+    scraper.result_cache.clear()
+    assert os.listdir(directory) == [] and store.size == 0
+
+
+def test_invalid_fingerprint():
+    with pytest.raises(ValueError):
+        ResultCache(fingerprint='dom')
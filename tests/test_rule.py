@@ -0,0 +1,76 @@
+import copy
+import gc
+import json
+import pickle
+
+import pytest
+
+from autoscraper import AutoScraper
+from autoscraper import rule as rule_module
+from autoscraper.rule import Rule, to_rules
+
+from conftest import SAMPLE_HTML, SAMPLE_URL, WANTED, make_listing
+
+
+def test_rules_are_dicts(scraper):
+    rule = scraper.stack_list[0]
+    assert isinstance(rule, Rule) and isinstance(rule, dict)
+    assert set(rule) >= {'content', 'wanted_attr', 'is_full_url', 'hash', 'stack_id'}
+    assert len(rule['hash']) == 64
+
+    rule['custom'] = 1
+    assert rule['custom'] == 1 and 'custom' in rule
+    del rule['custom']
+    assert 'custom' not in rule and rule.get('custom') is None
+    assert rule.setdefault('alias', 'x') == ''
+
+    copied = rule.copy()
+    assert isinstance(copied, Rule) and copied == rule and copied is not rule
+    copied['stack_id'] = 'rule_copy'
+    assert rule['stack_id'] != 'rule_copy'
+    assert copy.deepcopy(scraper.stack_list) == scraper.stack_list
+
+
+def test_stack_list_is_json_serializable(scraper):
+    data = json.loads(json.dumps(scraper.stack_list))
+    assert [Rule(x) for x in data] == scraper.stack_list
+    assert list(data[0]) == list(scraper.stack_list[0])
+
+
+def test_equal_steps_share_their_attrs(scraper):
+    other = AutoScraper()
+    other.build(url=SAMPLE_URL, html=SAMPLE_HTML, wanted_list=WANTED)
+    step, other_step = scraper.stack_list[0]['content'][0], other.stack_list[0]['content'][0]
+    assert step == other_step and step[1] is other_step[1]
+
+
+@pytest.mark.parametrize('file_format', ['json', 'binary'])
+def test_rules_round_trip(scraper, tmp_path, file_format):
+    path = tmp_path / 'model'
+    scraper.save(str(path), format=file_format)
+    loaded = AutoScraper()
+    loaded.load(str(path))
+    assert json.dumps(loaded.stack_list) == json.dumps(scraper.stack_list)
+    html = make_listing(items=3)
+    assert loaded.get_result_similar(url=SAMPLE_URL, html=html) == \
+        scraper.get_result_similar(url=SAMPLE_URL, html=html)
+
+    unpickled = pickle.loads(pickle.dumps(scraper.stack_list))
+    assert unpickled == scraper.stack_list
+    assert unpickled[0]['content'][0][1] is scraper.stack_list[0]['content'][0][1]
+
+
+def test_unused_steps_are_dropped():
+    gc.collect()
+    before = len(rule_module._step_attrs)
+    rules = to_rules([dict(content=[('div', {'class': 'model%d' % i}, 0)], wanted_attr=None,
+                           is_full_url=False, stack_id='rule_%d' % i) for i in range(100)])
+    assert len(rule_module._step_attrs) == before + 100
+
+    # steps are freed as soon as their rules are, without waiting for the cyclic collector
+    gc.disable()
+    try:
+        del rules
+        assert len(rule_module._step_attrs) == before
+    finally:
+        gc.enable()
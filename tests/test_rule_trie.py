@@ -0,0 +1,67 @@
+import pytest
+
+from autoscraper import AutoScraper
+from autoscraper.rule_trie import RuleTrie
+
+from conftest import SAMPLE_HTML, SAMPLE_URL, make_listing, read_page
+
+PAGES = [make_listing(items=8, offset=3), make_listing(items=1), read_page('books.html')]
+
+
+@pytest.fixture
+def books_scraper(backend):
+    scraper = AutoScraper(backend=backend)
+    scraper.build(html=read_page('books.html'),
+                  wanted_list=['£51.77', 'A Light in the Attic', 'In stock'])
+    return scraper
+
+
+def rule_by_rule(scraper, html, contain_sibling_leaves=False):
+    # each rule evaluated on its own, as before the rules were compiled
+    soup = scraper._parse_html(html)
+    result = {}
+    for stack in scraper.stack_list:
+        items = scraper._get_result_with_stack(stack, soup, SAMPLE_URL, 1.0,
+                                               contain_sibling_leaves=contain_sibling_leaves)
+        result[stack['stack_id']] = [x.text for x in items]
+    return result
+
+
+@pytest.mark.parametrize('html', PAGES)
+@pytest.mark.parametrize('contain_sibling_leaves', [False, True])
+def test_trie_matches_rule_by_rule_evaluation(scraper, books_scraper, html,
+                                              contain_sibling_leaves):
+    for model in (scraper, books_scraper):
+        grouped = model.get_result_similar(url=SAMPLE_URL, html=html, grouped=True,
+                                           contain_sibling_leaves=contain_sibling_leaves)
+        expected = rule_by_rule(model, html, contain_sibling_leaves)
+        assert grouped == expected
+
+
+def test_exact_results_are_the_samples(books_scraper):
+    grouped = books_scraper.get_result_exact(html=read_page('books.html'), grouped=True)
+    assert grouped == {x['stack_id']: [x['sample']] for x in books_scraper.stack_list}
+
+
+def test_rules_sharing_steps_are_compiled_once(scraper):
+    trie = RuleTrie(scraper.stack_list)
+    steps = sum(len(x['content']) for x in scraper.stack_list)
+
+    def count(node):
+        return 1 + sum(count(x) for x in node.children.values())
+
+    assert count(trie.similar_root) - 1 < steps
+
+
+def test_trie_is_recompiled_when_rules_change(scraper):
+    html = make_listing(items=3)
+    first = scraper.get_result_similar(url=SAMPLE_URL, html=html)
+    scraper.keep_rules([scraper.stack_list[0]['stack_id']])
+    assert scraper.get_result_similar(url=SAMPLE_URL, html=html) == \
+        rule_by_rule(scraper, html)[scraper.stack_list[0]['stack_id']]
+    assert len(scraper.get_result_similar(url=SAMPLE_URL, html=html)) < len(first)
+
+
+def test_results_grouped_by_alias_follow_the_page(scraper):
+    assert scraper.get_result_similar(url=SAMPLE_URL, html=SAMPLE_HTML, group_by_alias=True) \
+        == {'': scraper.get_result_similar(url=SAMPLE_URL, html=SAMPLE_HTML, keep_order=True)}
@@ -0,0 +1,92 @@
+import io
+
+import pytest
+
+from autoscraper import AutoScraper
+
+from conftest import SAMPLE_URL, make_listing, read_page
+from test_backends import FIXTURES, build
+
+
+def test_stream_matches_similar_results(scraper):
+    # results are yielded in the order they are known, not in the order of the page
+    html = make_listing(items=20, offset=5)
+    expected = scraper.get_result_similar(url=SAMPLE_URL, html=html, unique=False)
+    streamed = list(scraper.stream_result_similar(url=SAMPLE_URL, html=html))
+    assert sorted(streamed) == sorted(expected)
+
+
+def test_stream_unique(scraper):
+    html = make_listing(items=8)
+    streamed = list(scraper.stream_result_similar(url=SAMPLE_URL, html=html, unique=True))
+    assert len(streamed) == len(set(streamed))
+    assert set(streamed) == set(scraper.get_result_similar(url=SAMPLE_URL, html=html))
+
+
+def test_stream_grouped_by_alias(scraper):
+    scraper.set_rule_aliases({x['stack_id']: 'field' for x in scraper.stack_list})
+    html = make_listing(items=3)
+    streamed = list(scraper.stream_result_similar(url=SAMPLE_URL, html=html,
+                                                  group_by_alias=True))
+    assert {alias for alias, _ in streamed} == {'field'}
+    expected = scraper.get_result_similar(url=SAMPLE_URL, html=html, group_by_alias=True)
+    assert sorted(value for _, value in streamed) == sorted(expected['field'])
+
+
+def test_stream_page_with_leading_comment():
+    scraper = AutoScraper()
+    scraper.build(html='<html><body><p>x</p><p>y</p></body></html>', wanted_list=['x'])
+    html = '<!-- c --><html><body><p>x</p><p>z</p></body></html>'
+    assert list(scraper.stream_result_similar(html=html)) == ['x']
+    assert list(scraper.stream_result_similar(html=html, contain_sibling_leaves=True)) == \
+        ['x', 'z']
+
+
+def test_stream_page_with_processing_instruction():
+    scraper = AutoScraper()
+    scraper.build(html='<html><body><p>x</p><p>y</p></body></html>', wanted_list=['x'])
+    html = '<?xml version="1.0"?><!--[if IE]><![endif]--><html><body><p>a</p></body></html>'
+    assert list(scraper.stream_result_similar(html=html)) == ['a']
+
+
+@pytest.mark.parametrize('body', ['', '   \n'])
+def test_stream_empty_page(scraper, backend, local_server, body):
+    local_server.routes['/empty'] = (200, {}, body)
+    url = local_server.url('/empty')
+    scraper = AutoScraper(scraper.stack_list, backend=backend)
+    assert scraper.get_result_similar(url=url) == []
+    assert list(scraper.stream_result_similar(url=url)) == []
+    assert list(scraper.stream_result_similar(html=io.StringIO(body))) == []
+
+
+def test_stream_books_page():
+    html = read_page('books.html')
+    scraper = AutoScraper()
+    scraper.build(html=html, wanted_list=['£51.77'])
+    expected = scraper.get_result_similar(html=html, unique=False)
+    assert len(expected) == 20
+    assert sorted(scraper.stream_result_similar(html=html)) == sorted(expected)
+
+
+def test_stream_file_in_small_chunks(scraper):
+    html = make_listing(items=10)
+    expected = scraper.get_result_similar(url=SAMPLE_URL, html=html, unique=False)
+    f = io.BytesIO(html.encode('utf-8'))
+    streamed = scraper.stream_result_similar(url=SAMPLE_URL, html=f, chunk_size=7)
+    assert sorted(streamed) == sorted(expected)
+
+
+@pytest.mark.parametrize('fixture', FIXTURES, ids=lambda x: x.name)
+@pytest.mark.parametrize('options', [dict(), dict(contain_sibling_leaves=True),
+                                     dict(attr_fuzz_ratio=0.7)])
+def test_stream_matches_similar_results_of_fixtures(fixture, backend, options):
+    scraper, _ = build(fixture, backend)
+    args = dict(url=fixture.url, html=fixture.scrape_html, **options)
+    expected = scraper.get_result_similar(grouped=True, unique=False, **args)
+    streamed = {}
+    for stack_id, value in scraper.stream_result_similar(grouped=True, chunk_size=4096,
+                                                         **args):
+        streamed.setdefault(stack_id, []).append(value)
+    assert streamed
+    assert {k: sorted(v) for k, v in streamed.items()} == \
+        {k: sorted(v) for k, v in expected.items() if v}
@@ -0,0 +1,56 @@
+import gc
+
+import pytest
+
+from autoscraper.backends import get_backend
+from autoscraper import text_cache as text_cache_module
+from autoscraper.text_cache import get_text_cache
+
+from conftest import SAMPLE_HTML, read_page
+
+PAGES = [
+    SAMPLE_HTML,
+    '<div>a <b>b <i>c</i></b> d<!-- e --><script>f</script><style>g</style> h</div>',
+    '<pre>  a\n  <b> b </b></pre><textarea> c </textarea><p>d<template>e</template></p>',
+    read_page('books.html'),
+]
+
+
+@pytest.mark.parametrize('html', PAGES)
+@pytest.mark.parametrize('compute_all', [False, True])
+def test_cached_texts_match_the_backend(backend, html, compute_all):
+    backend = get_backend(backend)
+    document = backend.parse(html)
+    texts = get_text_cache(backend, document)
+    if compute_all:
+        texts.compute_all()
+
+    for element in backend.iter_elements(document):
+        assert texts.get_text(element) == backend.get_text(element)
+        assert texts.get_non_rec_text(element) == backend.get_non_rec_text(element)
+        # again from the cache
+        assert texts.get_text(element) == backend.get_text(element)
+
+
+def test_cache_is_shared_and_freed_with_the_document(backend):
+    backend = get_backend(backend)
+    document = backend.parse(SAMPLE_HTML)
+    texts = get_text_cache(backend, document)
+    assert get_text_cache(backend, document) is texts
+    assert get_text_cache(backend, backend.parse(SAMPLE_HTML)) is not texts
+
+    key = id(document)
+    del document
+    gc.collect()
+    assert key not in text_cache_module._text_caches
+
+
+def test_results_use_cached_texts(scraper, monkeypatch):
+    backend = scraper.backend
+    soup = scraper._parse_html(SAMPLE_HTML)
+    expected = scraper.get_result_similar(soup=soup)
+    monkeypatch.setattr(type(backend), 'get_text',
+                        staticmethod(lambda element: pytest.fail('text not cached')))
+    monkeypatch.setattr(type(backend), 'get_non_rec_text',
+                        staticmethod(lambda element: pytest.fail('text not cached')))
+    assert scraper.get_result_similar(soup=soup) == expected
@@ -0,0 +1,63 @@
+import pytest
+
+from lxml import etree, html as lxml_html
+
+from autoscraper import AutoScraper
+from autoscraper.backends import LxmlBackend
+from autoscraper.streaming import get_stream_value
+from autoscraper.xpath import xpath_literal
+
+from conftest import SAMPLE_HTML, SAMPLE_URL, make_listing, read_page
+
+
+def evaluate(compiled, key, html, url):
+    # the queries run with lxml only, as they would without AutoScraper
+    root = lxml_html.fromstring(html)
+    return {x['stack_id']: [get_stream_value(element, x, url) for element in root.xpath(x[key])]
+            for x in compiled}
+
+
+@pytest.mark.parametrize('html', [make_listing(items=4, offset=7), SAMPLE_HTML])
+def test_compiled_rules_select_the_results(scraper, html):
+    compiled = scraper.compile()
+    assert [x['stack_id'] for x in compiled] == [x['stack_id'] for x in scraper.stack_list]
+
+    similar = scraper.get_result_similar(url=SAMPLE_URL, html=html, grouped=True, unique=False)
+    assert evaluate(compiled, 'similar', html, SAMPLE_URL) == similar
+    leaves = scraper.get_result_similar(url=SAMPLE_URL, html=html, grouped=True, unique=False,
+                                        contain_sibling_leaves=True)
+    assert evaluate(compiled, 'similar_with_leaves', html, SAMPLE_URL) == leaves
+    exact = scraper.get_result_exact(url=SAMPLE_URL, html=html, grouped=True, unique=False)
+    assert evaluate(compiled, 'exact', html, SAMPLE_URL) == exact
+
+
+def test_compile_books_page():
+    html = read_page('books.html')
+    scraper = AutoScraper(backend='lxml')
+    scraper.build(html=html, wanted_list=['£51.77', 'A Light in the Attic'])
+    root = LxmlBackend.parse(html).root
+    for item, stack in zip(scraper.compile(), scraper.stack_list):
+        assert [get_stream_value(x, stack, None) for x in root.xpath(item['similar'])] == \
+            scraper.get_result_similar(html=html, grouped=True, unique=False)[item['stack_id']]
+
+
+@pytest.mark.parametrize('value', ['plain', "it's", 'say "hi"', 'both \' and "'])
+def test_xpath_literal(value):
+    assert etree.XPath('string(%s)' % xpath_literal(value))(etree.fromstring('<a/>')) == value
+
+
+def test_documents_unsafe_for_xpath_give_the_same_results():
+    # U+3000 splits class names for bs4 but not for normalize-space
+    html = make_listing(items=3).replace('class="card"', 'class="card　item"')
+    soup_scraper = AutoScraper()
+    soup_scraper.build(url=SAMPLE_URL, html=SAMPLE_HTML, wanted_list=['Product 0'])
+    lxml_scraper = AutoScraper(soup_scraper.stack_list, backend='lxml')
+    assert not LxmlBackend.supports_xpath(LxmlBackend.parse(html))
+    assert lxml_scraper.get_result_similar(url=SAMPLE_URL, html=html) == \
+        soup_scraper.get_result_similar(url=SAMPLE_URL, html=html) == \
+        ['Product 0', 'Product 1', 'Product 2']
+
+
+def test_compile_only_supports_xpath(scraper):
+    with pytest.raises(ValueError):
+        scraper.compile(format='css')